@@ -1,41 +1,397 @@
-# For accessing command line args
-from sys import argv
+# For parsing command line args
+from argparse import ArgumentParser
 
 # For handling file/dir paths
 from pathlib import Path
 
+# For compiling files in parallel
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# For timing each file
+from time import perf_counter
+
 # Import Analyzer components
-from compilation_engine import CompilationEngine
+from compilation_engine import CompilationEngine, optimization_names
 from jack_tokenizer import JackTokenizer
+from mapped_tokenizer import MappedJackTokenizer
+from token_table import TokenCursor, tokenize_file, tokenize_source
+from compile_cache import CompileCache, MemoryCache, DEFAULT_MAX_BYTES
+from build_manifest import BuildManifest
+from tracing import Tracer, trace_engine
+from call_graph import CallGraph
+from inlining import Inliner, DEFAULT_MAX_SIZE
+from watcher import Watcher
+
+# Get command line args
+parser = ArgumentParser(description="Compiles Jack source files")
+parser.add_argument(
+    "in_path", type=Path,
+    help="a .jack file or a directory of .jack files"
+)
+parser.add_argument(
+    "--scanner", choices=("stream", "buffer", "mmap", "table"),
+    default="buffer",
+    help="how the tokenizer reads the source (default: buffer)"
+)
+parser.add_argument(
+    "--emit", choices=("vm", "xml", "both"), default="both",
+    help="which output files to write (default: both)"
+)
+parser.add_argument(
+    "--readable-vm", action="store_true",
+    help="separate the functions of .vm files with a line"
+)
+parser.add_argument(
+    "-O", "--optimize", default="", metavar="NAMES",
+    help="comma separated optimizations to run, or 'all' "
+         f"(choices: {', '.join(sorted(optimization_names))})"
+)
+parser.add_argument(
+    "--opt-report", action="store_true",
+    help="print how often each optimization rule applied, and the "
+         "dead code left out of each subroutine"
+)
+parser.add_argument(
+    "--whole-program", action="store_true",
+    help="leave out the subroutines which Main.main never calls, "
+         "over all files compiled"
+)
+parser.add_argument(
+    "--inline", type=int, nargs="?", const=DEFAULT_MAX_SIZE, metavar="SIZE",
+    help="inline calls of leaf subroutines of at most SIZE instructions, "
+         f"over all files compiled (default SIZE: {DEFAULT_MAX_SIZE})"
+)
+parser.add_argument(
+    "--cache-dir", type=Path,
+    help="reuse tokens and outputs of unchanged files from this directory"
+)
+parser.add_argument(
+    "--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+    help="size bound of the cache directory in MiB (default: %(default)s)"
+)
+parser.add_argument(
+    "--trace", type=Path, metavar="FILE",
+    help="write lookup, declaration and VM command events as JSON lines"
+)
+parser.add_argument(
+    "-j", "--jobs", type=int, nargs="?", const=os.cpu_count(), metavar="N",
+    help="compile the files of a directory in N processes, largest "
+         "first (default N: the CPU count)"
+)
+parser.add_argument(
+    "--incremental", action="store_true",
+    help="compile only the files changed since the last build, and "
+         "those using a class whose subroutines changed"
+)
+parser.add_argument(
+    "--watch", action="store_true",
+    help="compile the .jack files of a directory tree, then again "
+         "whenever they change, until interrupted"
+)
+
+def new_tokenizer(path, scanner):
+    '''creates the tokenizer selected by --scanner'''
+    if scanner == "mmap":
+        return MappedJackTokenizer(path)
+    if scanner == "table":
+        return TokenCursor(tokenize_file(path))
+    return JackTokenizer(path, scanner)
+
+def options_key(args, optimizations):
+    '''returns the options which change the outputs, as text'''
+    return (
+        f"emit={args.emit},readable={args.readable_vm},"
+        f"O={','.join(sorted(optimizations))}"
+    )
+
+def output_paths(path, emit):
+    '''returns the files which compiling `path` writes'''
+    outputs = []
+    if emit != "xml":
+        outputs.append(path.with_suffix(".vm"))
+    if emit != "vm":
+        outputs.append(path.with_suffix(".xml"))
+    return outputs
 
-# Get input path
-in_path = Path(argv[1])
+def compile_file(path, args, optimizations, cache=None, tracer=None):
+    '''compiles one .jack file to .xml and/or .vm files.
+    Returns the hits of each peephole rule and the dead
+    code left out of each subroutine'''
+    xml_path = path.with_suffix(".xml")
+    vm_path = path.with_suffix(".vm")
+    write_vm = args.emit != "xml"
+    write_xml = args.emit != "vm"
+
+    if cache is None:
+        tokenizer = new_tokenizer(path, args.scanner)
+    else:
+        source = path.read_bytes()
+        outputs_key = cache.key(source, options_key(args, optimizations))
+
+        # Unchanged file, reuse its outputs
+        outputs = cache.load_outputs(outputs_key)
+        if outputs is not None:
+            if write_vm:
+                vm_path.write_bytes(outputs[0])
+            if write_xml:
+                xml_path.write_bytes(outputs[1])
+            return {}, {}
+
+        # Tokens do not depend on compile options
+        tokens_key = cache.key(source)
+        text = source.decode("utf-8")
+        table = cache.load_tokens(tokens_key, text, str(path))
+        if table is None:
+            table = tokenize_source(text, str(path))
+            cache.store_tokens(tokens_key, table)
+        tokenizer = TokenCursor(table)
 
-if in_path.is_file():
-    # Path points to a file
-    # Initialize tokenizer
-    tokenizer = JackTokenizer(in_path)
     # Initialize compilation engine
     compilationEngine = CompilationEngine(
-                tokenizer, 
-                in_path.with_suffix(".xml")
-            )
+        tokenizer, xml_path, args.emit, args.readable_vm, optimizations
+    )
+    if tracer is not None:
+        trace_engine(compilationEngine, tracer, str(path))
 
     # Start compilation
     compilationEngine.start_compilation()
+    compilationEngine.close()
+
+    if cache is not None:
+        cache.store_outputs(
+            outputs_key,
+            vm_path.read_bytes() if write_vm else b"",
+            xml_path.read_bytes() if write_xml else b""
+        )
+
+    peephole_hits = {}
+    if compilationEngine.peephole is not None:
+        peephole_hits = compilationEngine.peephole.hits
+    return peephole_hits, compilationEngine.removed_code
+
+def describe_error(error):
+    '''returns the error which stopped a compile as text'''
+    return f"{type(error).__name__}: {error}"
+
+def try_compile(path, args, optimizations, cache=None, tracer=None):
+    '''compile_file, in this process or a worker. Returns
+    its result and None, or None and the error which
+    stopped it, and the seconds taken'''
+    start = perf_counter()
+    try:
+        result = compile_file(path, args, optimizations, cache, tracer)
+    except Exception as error:
+        return None, describe_error(error), 0.0
+    return result, None, perf_counter() - start
+
+def compile_parallel(paths, args, optimizations, jobs):
+    '''compiles files in `jobs` processes, largest first for
+    an even load. Returns (result, error, seconds) of each path, in
+    the order of `paths`'''
+    largest_first = sorted(paths, key=lambda path: -path.stat().st_size)
+    with ProcessPoolExecutor(jobs) as pool:
+        futures = {
+            path: pool.submit(try_compile, path, args, optimizations)
+            for path in largest_first
+        }
+        return [futures[path].result() for path in paths]
+
+def main():
+    args = parser.parse_args()
+
+    # Get input path
+    in_path = args.in_path
+
+    # Get the optimizations to run
+    if args.optimize == "all":
+        optimizations = frozenset(optimization_names)
+    else:
+        optimizations = frozenset(filter(None, args.optimize.split(",")))
+        for name in optimizations - optimization_names:
+            parser.error(f"unknown optimization: {name}")
+
+    if args.jobs is not None:
+        if args.jobs < 1:
+            parser.error("--jobs needs at least 1 process")
+        if args.cache_dir or args.trace:
+            # One cache index and one trace file per process
+            parser.error("--jobs can not be used with --cache-dir or --trace")
+
+    if args.emit == "xml" and (args.whole_program or args.inline is not None):
+        # Linking works on the VM code, which is not written
+        parser.error(
+            "--whole-program and --inline can not be used with --emit xml"
+        )
+
+    if args.incremental and (args.whole_program or args.inline is not None):
+        # Linking rewrites the outputs the manifest checks
+        parser.error(
+            "--incremental can not be used with --whole-program or --inline"
+        )
+
+    if args.watch:
+        if not in_path.is_dir():
+            parser.error("--watch needs a directory")
+        if args.whole_program or args.inline is not None \
+            or args.jobs is not None or args.incremental:
+            parser.error(
+                "--watch can not be used with --whole-program, --inline, "
+                "--jobs or --incremental"
+            )
+
+    # Rule name -> rewrites, over all files
+    peephole_hits = {}
+
+    # Subroutine -> dead VM instructions left out, over all files
+    removed_code = {}
+
+    # Open the cache, if enabled
+    cache = None
+    if args.cache_dir:
+        cache = CompileCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    # Open the trace file, if enabled
+    tracer = None
+    if args.trace:
+        tracer = Tracer(args.trace)
+
+    if args.watch:
+        # Tokens of unchanged files stay in memory
+        if cache is None:
+            cache = MemoryCache()
+        watcher = Watcher(
+            in_path,
+            lambda path: compile_file(path, args, optimizations, cache, tracer),
+            cache
+        )
+        try:
+            watcher.run(partial(print, flush=True))
+        except KeyboardInterrupt:
+            pass
+        if tracer is not None:
+            tracer.close()
+        return
+
+    # The .jack files to compile
+    compiled = []
+
+    if in_path.is_file():
+        # Path points to a file
+        compiled.append(in_path)
+
+    elif in_path.is_dir():
+        # Path points to a directory
+        for item in in_path.iterdir():
+            if item.is_file():
+                # Compile every jack file
+                if item.suffix == ".jack":
+                    compiled.append(item)
+
+    # Ordered by path, for the same reports on every run
+    compiled.sort()
+    sources = compiled
+
+    # Leave out the files unchanged since the last build
+    manifest = None
+    if args.incremental:
+        manifest = BuildManifest(
+            in_path if in_path.is_dir() else in_path.parent,
+            options_key(args, optimizations)
+        )
+        compiled = manifest.plan(sources)
+
+    if args.jobs is None:
+        results = [
+            try_compile(path, args, optimizations, cache, tracer)
+            for path in compiled
+        ]
+    else:
+        results = compile_parallel(compiled, args, optimizations, args.jobs)
+
+    errors = []
+    build_seconds = 0.0
+    for path, (result, error, seconds) in zip(compiled, results):
+        if error is not None:
+            errors.append(f"{path}: {error}")
+            continue
+        for name, hits in result[0].items():
+            peephole_hits[name] = peephole_hits.get(name, 0) + hits
+        removed_code.update(result[1])
+
+        build_seconds += seconds
+        if manifest is not None:
+            manifest.record(path, output_paths(path, args.emit), seconds)
+
+    if manifest is not None:
+        manifest.save()
+        print(
+            f"incremental: compiled {len(compiled)} of {len(sources)} files"
+            f" ({manifest.dependent_count} for changed interfaces), "
+            f"skipped {len(sources) - len(compiled)}, "
+            f"{build_seconds:.3f}s, "
+            f"saved {manifest.skipped_seconds(sources):.3f}s"
+        )
+
+    if errors:
+        for error in errors:
+            print(f"error: {error}", file=sys.stderr)
+        print(
+            f"{len(errors)} of {len(compiled)} files failed to compile",
+            file=sys.stderr
+        )
+        if tracer is not None:
+            tracer.close()
+        sys.exit(1)
+
+    if args.whole_program or args.inline is not None:
+        call_graph = CallGraph()
+        for path in sources:
+            call_graph.add_file(path.with_suffix(".vm"))
+
+        if args.inline is not None:
+            inliner = Inliner(call_graph, args.inline)
+            inliner.inline_all()
+            for caller, callee, decision in inliner.decisions:
+                print(f"inline {caller} -> {callee}: {decision}")
+            inlined = sum(
+                decision.startswith("inlined")
+                for _, _, decision in inliner.decisions
+            )
+            print(
+                f"inlining: inlined {inlined} of {len(inliner.decisions)} "
+                f"call sites, {inliner.added:+d} instructions"
+            )
+
+        if args.whole_program:
+            # Leave out what no call chain from Main.main reaches
+            removed = call_graph.remove_unused()
+            for name in sorted(removed):
+                print(f"unused {name}: {removed[name]} instructions")
+            print(
+                f"whole program: removed {len(removed)} of "
+                f"{len(call_graph.calls)} subroutines, "
+                f"{sum(removed.values())} instructions"
+            )
+
+        call_graph.write()
+
+    if args.opt_report:
+        for name, hits in peephole_hits.items():
+            print(f"peephole {name}: {hits}")
+        for name, count in removed_code.items():
+            print(f"dce {name}: {count}")
+
+    if cache is not None:
+        print(f"cache: {cache.summary()}")
+
+    if tracer is not None:
+        tracer.close()
 
-elif in_path.is_dir():
-    # Path points to a directory
-    for item in in_path.iterdir():
-        if item.is_file():
-            # Compile every jack file
-            if item.suffix == ".jack":
-                tokenizer = JackTokenizer(item)
-                ci = CompilationEngine(
-                    tokenizer, 
-                    item.with_suffix(".xml")
-                )
-                ci.start_compilation()
+if __name__ == "__main__":
+    main()
 
 
 # END OF FILE
@@ -0,0 +1,24 @@
+# Emulated cost of loops and ifs with compound conditions,
+# with and without direct branch compilation
+# Usage: python3 benchmarks/branch_bench.py
+from emulated import run_program
+
+def main():
+    print(f"{'optimizations':<18}{'result':>8}{'commands':>9}"
+          f"{'steps':>11}{'cycles':>12}{'speedup':>9}")
+
+    base = None
+    for optimizations in (
+        frozenset(),
+        frozenset({"branch"}),
+        frozenset({"peephole"}),
+        frozenset({"peephole", "branch"})
+    ):
+        emulator, result, size = run_program("loops", optimizations)
+        base = base or emulator.cycles
+        print(f"{','.join(sorted(optimizations)) or 'none':<18}{result:>8}"
+              f"{size:>9}{emulator.steps:>11,}{emulator.cycles:>12,}"
+              f"{base / emulator.cycles:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Stress test of comment skipping: 100k comment lines
+# Usage: python3 benchmarks/comment_bench.py [lines]
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+# Make the compiler modules importable
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from jack_tokenizer import JackTokenizer
+from mapped_tokenizer import MappedJackTokenizer
+from token_table import TokenCursor, tokenize_file
+
+def doc_heavy_source(lines):
+    '''returns a class whose members are buried in comments'''
+    third = lines // 3
+    parts = ["class Docs {\n"]
+
+    # Consecutive inline comments
+    parts.append("    // documentation line\n" * third)
+    parts.append("    field int a;\n")
+
+    # One long block comment
+    parts.append("    /**\n" + "     * documentation line\n" * third + "     */\n")
+    parts.append("    field int b;\n")
+
+    # Block comments on their own lines, with tabs and \r\n
+    parts.append("\t/* documentation line */\r\n" * third)
+    parts.append("    field int c;\n}\n")
+    return "".join(parts)
+
+def scan(path, mode):
+    '''returns the number of tokens in `path`'''
+    if mode == "mmap":
+        tz = MappedJackTokenizer(path)
+    elif mode == "table":
+        tz = TokenCursor(tokenize_file(path))
+    else:
+        tz = JackTokenizer(path, mode)
+
+    count = 0
+    while tz.has_more_tokens():
+        count += 1
+    return count
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "Docs.jack"
+        path.write_text(doc_heavy_source(lines))
+        size = path.stat().st_size
+
+        print(f"{lines:,} comment lines, {size / 1e6:.1f} MB")
+        print(f"{'mode':<8}{'tokens':>8}{'seconds':>10}{'MB/sec':>10}")
+
+        for mode in ("stream", "buffer", "mmap", "table"):
+            start = perf_counter()
+            count = scan(path, mode)
+            seconds = perf_counter() - start
+            print(f"{mode:<8}{count:>8}{seconds:>10.3f}"
+                  f"{size / seconds / 1e6:>10.1f}")
+
+if __name__ == "__main__":
+    main()
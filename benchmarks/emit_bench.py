@@ -0,0 +1,62 @@
+# Wall time and bytes written per emit mode
+# Usage: python3 benchmarks/emit_bench.py [repeat]
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from pathlib import Path
+from time import perf_counter
+
+# Make the compiler modules importable
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from compilation_engine import CompilationEngine
+from jack_tokenizer import JackTokenizer
+
+def compile_dir(directory, emit):
+    '''compiles every .jack file of `directory`'''
+    for path in sorted(directory.glob("*.jack")):
+        engine = CompilationEngine(
+            JackTokenizer(path), path.with_suffix(".xml"), emit
+        )
+        engine.start_compilation()
+        engine.close()
+
+def output_bytes(directory):
+    '''returns the total size of the .vm and .xml files'''
+    return sum(
+        path.stat().st_size for path in directory.iterdir()
+        if path.suffix in (".vm", ".xml")
+    )
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    print(f"{'emit':<6}{'ms/run':>10}{'bytes':>10}{'files':>7}")
+    with tempfile.TemporaryDirectory() as tmp, \
+        open(os.devnull, "w") as devnull:
+        for emit in ("both", "vm"):
+            directory = Path(tmp) / emit
+            shutil.copytree(root / "tests", directory)
+            for path in directory.iterdir():
+                if path.suffix != ".jack":
+                    path.unlink()
+
+            # Drop the engine's debug prints
+            with redirect_stdout(devnull):
+                start = perf_counter()
+                for _ in range(repeat):
+                    compile_dir(directory, emit)
+                elapsed = perf_counter() - start
+
+            outputs = [
+                path for path in directory.iterdir()
+                if path.suffix in (".vm", ".xml")
+            ]
+            print(f"{emit:<6}{elapsed * 1e3 / repeat:>10.2f}"
+                  f"{output_bytes(directory):>10}{len(outputs):>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# Compiles a benchmark program and runs it in the VM emulator
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# Make the compiler modules importable
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from compilation_engine import CompilationEngine
+from token_table import TokenCursor, tokenize_file
+from vm_emulator import VMEmulator
+
+programs = root / "benchmarks" / "programs"
+
+def compile_program(name, optimizations=frozenset(), link=None):
+    '''compiles programs/<name> with the Jack OS parts of
+    programs/os, returns the loaded emulator and VM size.
+    `link` gets the directory of the .vm files, if given,
+    for whole-program passes before they are loaded'''
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        for source in (programs / "os", programs / name):
+            for path in source.glob("*.jack"):
+                shutil.copy(path, directory)
+
+        for path in sorted(directory.glob("*.jack")):
+            engine = CompilationEngine(
+                TokenCursor(tokenize_file(path)), path.with_suffix(".xml"),
+                "vm", optimizations=optimizations
+            )
+            engine.start_compilation()
+            engine.close()
+
+        if link is not None:
+            link(directory)
+
+        emulator = VMEmulator()
+        emulator.load_dir(directory)
+        return emulator, len(emulator.code)
+
+def run_program(name, optimizations=frozenset(), link=None):
+    '''runs Main.main of a program, returns the
+    emulator after the run, its result and VM size'''
+    emulator, size = compile_program(name, optimizations, link)
+    result = emulator.run("Main.main")
+    return emulator, result, size
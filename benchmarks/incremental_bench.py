@@ -0,0 +1,54 @@
+# Keystroke simulation: full re-tokenization
+# against incremental retokenize()
+# Usage: python3 benchmarks/incremental_bench.py [keystrokes]
+import random
+import sys
+from pathlib import Path
+from time import perf_counter
+
+# Make the compiler modules importable
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from token_table import tokenize_source, retokenize
+
+def main():
+    keystrokes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sources = sorted((root / "tests").glob("*.jack"))
+    source = "".join(path.read_text() for path in sources) * 20
+
+    # Type an identifier character after random tokens
+    rng = random.Random(7)
+    table = tokenize_source(source)
+    print(f"{len(source) / 1e3:.0f} kB, {len(table):,} tokens, "
+          f"{keystrokes} keystrokes")
+
+    edits = []
+    for _ in range(keystrokes):
+        index = rng.randrange(len(table))
+        edits.append((table.ends[index], "x"))
+
+    start = perf_counter()
+    text = source
+    for offset, inserted in edits:
+        text = text[:offset] + inserted + text[offset:]
+        tokenize_source(text)
+    full = perf_counter() - start
+
+    start = perf_counter()
+    reused = rescanned = 0
+    for offset, inserted in edits:
+        result = retokenize(table, offset, 0, inserted)
+        table = result.table
+        reused += result.reused
+        rescanned += result.rescanned
+    incremental = perf_counter() - start
+
+    assert table.source == text
+    print(f"full scan      {full * 1e3 / keystrokes:8.2f} ms/keystroke")
+    print(f"incremental    {incremental * 1e3 / keystrokes:8.2f} ms/keystroke"
+          f"  ({full / incremental:.1f}x)")
+    print(f"tokens reused  {reused:,}, rescanned {rescanned:,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Emulated cost of a program full of getters and small
+# helpers, with leaf subroutines inlined up to each size
+# Usage: python3 benchmarks/inline_bench.py [--sites]
+import sys
+
+from emulated import run_program
+from call_graph import CallGraph
+from inlining import Inliner
+
+def inline_link(max_size, inliners):
+    '''returns a link step inlining up to `max_size`,
+    which keeps its Inliner in `inliners`'''
+    def link(directory):
+        graph = CallGraph()
+        for path in sorted(directory.glob("*.vm")):
+            graph.add_file(path)
+        inliner = Inliner(graph, max_size)
+        inliner.inline_all()
+        graph.write()
+        inliners.append(inliner)
+    return link
+
+def main():
+    print(f"{'max size':<10}{'result':>8}{'inlined':>9}{'commands':>10}"
+          f"{'calls':>8}{'cycles':>10}{'speedup':>9}")
+
+    base = None
+    for max_size in (None, 4, 8, 12, 24):
+        inliners = []
+        link = None if max_size is None else inline_link(max_size, inliners)
+        emulator, result, size = run_program("points", link=link)
+        base = base or emulator.cycles
+
+        inlined = "-"
+        if inliners:
+            inlined = sum(
+                decision.startswith("inlined")
+                for _, _, decision in inliners[0].decisions
+            )
+        print(f"{'none' if max_size is None else max_size:<10}{result:>8}"
+              f"{inlined:>9}{size:>10}{sum(emulator.calls.values()):>8}"
+              f"{emulator.cycles:>10,}{base / emulator.cycles:>8.2f}x")
+
+        if "--sites" in sys.argv and inliners:
+            for caller, callee, decision in inliners[0].decisions:
+                print(f"    {caller} -> {callee}: {decision}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Compiles of source strings through temporary files
+# against compile_source() in memory
+# Usage: python3 benchmarks/memory_bench.py [rounds]
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+# Make the compiler modules importable
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from compilation_engine import CompilationEngine
+from jack_compiler import compile_source
+from token_table import TokenCursor, tokenize_source
+
+def compile_through_files(source: str, class_name: str) -> str:
+    '''writes the source to a temporary file, compiles it
+    and reads the .vm file back'''
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / f"{class_name}.jack"
+        path.write_text(source)
+        engine = CompilationEngine(
+            TokenCursor(tokenize_source(path.read_text())),
+            path.with_suffix(".xml"), "vm"
+        )
+        engine.start_compilation()
+        engine.close()
+        return path.with_suffix(".vm").read_text()
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sources = [
+        (path.read_text(), path.stem)
+        for path in sorted((root / "tests").glob("*.jack"))
+    ]
+    print(f"{rounds} rounds of {len(sources)} classes")
+
+    timings = {}
+    for name, compile_one in (
+        ("temporary files", compile_through_files),
+        ("in memory", lambda text, name: compile_source(text, name).vm)
+    ):
+        start = perf_counter()
+        for _ in range(rounds):
+            outputs = [compile_one(text, name) for text, name in sources]
+        timings[name] = perf_counter() - start
+        assert outputs == [
+            compile_through_files(text, name) for text, name in sources
+        ]
+
+    base = timings["temporary files"]
+    for name, seconds in timings.items():
+        print(f"{name:<17}{seconds * 1e3 / (rounds * len(sources)):7.2f}"
+              f" ms/class  ({base / seconds:.2f}x)")
+
+if __name__ == "__main__":
+    main()
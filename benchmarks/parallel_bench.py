@@ -0,0 +1,82 @@
+# Compile time of a directory of generated classes
+# over 1, 2, 4, 8... worker processes
+# Usage: python3 benchmarks/parallel_bench.py [classes] [max jobs]
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+root = Path(__file__).resolve().parent.parent
+analyzer = root / "SyntaxAnalyzer.py"
+
+def write_corpus(directory: Path, classes: int) -> None:
+    '''writes `classes` classes of varied size, each
+    calling into the previous one'''
+    for i in range(classes):
+        # From a few to some dozens of methods
+        methods = []
+        for m in range(2 + i % 23):
+            methods.append(f"""
+    method int step{m}(int x) {{
+        var int i, sum;
+        let i = 0;
+        let sum = {m};
+        while (i < x) {{
+            if ((i & 1) = 0) {{ let sum = sum + (i * {m + 1}); }}
+            else {{ let sum = sum - value; }}
+            let i = i + 1;
+        }}
+        return sum;
+    }}""")
+        previous = f"C{i - 1}" if i else "Math"
+        (directory / f"C{i}.jack").write_text(f"""class C{i} {{
+    field int value;
+    constructor C{i} new(int v) {{ let value = v; return this; }}
+    function int chain(int x) {{ return {previous}.abs(x); }}
+    function int abs(int x) {{ if (x < 0) {{ return -x; }} return x; }}
+{"".join(methods)}
+}}
+""")
+
+def compile_dir(directory: Path, jobs: int) -> float:
+    '''returns the seconds of one compile of `directory`'''
+    command = [sys.executable, str(analyzer), str(directory), "--emit", "vm"]
+    if jobs > 1:
+        command += ["--jobs", str(jobs)]
+    start = perf_counter()
+    subprocess.run(command, check=True)
+    return perf_counter() - start
+
+def main():
+    classes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        write_corpus(directory, classes)
+        size = sum(path.stat().st_size for path in directory.iterdir())
+        print(f"{classes} classes, {size / 1e6:.1f} MB, "
+              f"{os.cpu_count()} CPUs")
+
+        # Same output at every worker count
+        serial = compile_dir(directory, 1)
+        expected = {
+            path.name: path.read_bytes() for path in directory.glob("*.vm")
+        }
+        print(f"{'jobs':<6}{'seconds':>9}{'speedup':>9}")
+        print(f"{1:<6}{serial:>9.2f}{1:>8.2f}x")
+
+        jobs = 2
+        while jobs <= max_jobs:
+            seconds = compile_dir(directory, jobs)
+            assert expected == {
+                path.name: path.read_bytes()
+                for path in directory.glob("*.vm")
+            }
+            print(f"{jobs:<6}{seconds:>9.2f}{serial / seconds:>8.2f}x")
+            jobs *= 2
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Many small compiles through one compile server process
+# against one SyntaxAnalyzer.py process per compile
+# Usage: python3 benchmarks/server_bench.py [compiles]
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+root = Path(__file__).resolve().parent.parent
+
+def write_classes(directory: Path, count: int) -> list:
+    '''writes `count` small distinct classes, returns their paths'''
+    paths = []
+    for i in range(count):
+        path = directory / f"C{i}.jack"
+        path.write_text(f"""class C{i} {{
+    field int value;
+    constructor C{i} new() {{ let value = {i}; return this; }}
+    method int scaled(int x) {{
+        if (x > {i}) {{ return value * x; }}
+        return value + x;
+    }}
+}}
+""")
+        paths.append(path)
+    return paths
+
+def outputs(paths: list) -> list:
+    '''returns the .vm text of each class'''
+    return [path.with_suffix(".vm").read_text() for path in paths]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_classes(Path(tmp), count)
+
+        start = perf_counter()
+        for path in paths:
+            subprocess.run(
+                [sys.executable, str(root / "SyntaxAnalyzer.py"),
+                 str(path), "--emit", "vm"],
+                check=True
+            )
+        launches = perf_counter() - start
+        expected = outputs(paths)
+
+        start = perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, str(root / "compile_server.py")],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+        )
+        passes = []
+        for _ in range(2):
+            for i, path in enumerate(paths):
+                server.stdin.write(
+                    json.dumps({"id": i, "path": str(path)}) + "\n"
+                )
+                server.stdin.flush()
+                assert json.loads(server.stdout.readline())["ok"]
+            passes.append(perf_counter() - start)
+            start = perf_counter()
+        server.stdin.write('{"op": "shutdown"}\n')
+        server.stdin.close()
+        server.wait()
+        assert outputs(paths) == expected
+
+    print(f"{count} compiles of one small class")
+    print(f"{'':<22}{'seconds':>9}{'ms/compile':>12}{'speedup':>9}")
+    for name, seconds in (
+        ("process per compile", launches),
+        ("server, cold cache", passes[0]),
+        ("server, warm cache", passes[1])
+    ):
+        print(f"{name:<22}{seconds:>9.2f}{seconds * 1e3 / count:>12.2f}"
+              f"{launches / seconds:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
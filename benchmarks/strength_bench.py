@@ -0,0 +1,23 @@
+# Emulated cost of multiplications and divisions by
+# constants, with and without strength reduction
+# Usage: python3 benchmarks/strength_bench.py
+from emulated import run_program
+
+def main():
+    print(f"{'optimizations':<16}{'result':>8}{'commands':>9}"
+          f"{'steps':>11}{'cycles':>12}{'Math calls':>12}{'speedup':>9}")
+
+    base = None
+    for optimizations in (frozenset(), frozenset({"strength"})):
+        emulator, result, size = run_program("arith", optimizations)
+        math_calls = sum(
+            count for name, count in emulator.calls.items()
+            if name.startswith("Math.")
+        )
+        base = base or emulator.cycles
+        print(f"{','.join(optimizations) or 'none':<16}{result:>8}"
+              f"{size:>9}{emulator.steps:>11,}{emulator.cycles:>12,}"
+              f"{math_calls:>12,}{base / emulator.cycles:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
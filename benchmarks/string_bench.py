@@ -0,0 +1,22 @@
+# String allocations of a program printing the same
+# messages in a loop, with and without pooled strings
+# Usage: python3 benchmarks/string_bench.py
+from emulated import run_program
+
+def main():
+    print(f"{'optimizations':<15}{'result':>8}{'commands':>10}"
+          f"{'String.new':>12}{'appendChar':>12}{'cycles':>11}")
+
+    base = None
+    for optimizations in (frozenset(), frozenset({"pool"})):
+        emulator, result, size = run_program("messages", optimizations)
+        allocations = emulator.calls.get("String.new", 0)
+        base = allocations if base is None else base
+        print(f"{','.join(sorted(optimizations)) or 'none':<15}{result:>8}"
+              f"{size:>10}{allocations:>12}"
+              f"{emulator.calls.get('String.appendChar', 0):>12}"
+              f"{emulator.cycles:>11,}")
+    print(f"allocations saved: {base - allocations}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# Throughput of the tokenizer scanner modes, against the
+# original scanner reading one character at a time
+# Usage: python3 benchmarks/tokenizer_bench.py [repeat]
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+# Make the compiler modules importable
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from jack_tokenizer import JackTokenizer, keywords, symbols, xml_escapes
+from mapped_tokenizer import MappedJackTokenizer
+from token_table import TokenCursor, tokenize_file
+from type_enums import TokenType, KeywordType
+
+class CharTokenizer:
+    '''The stream scanner as first written, with a read(1)
+    call per character, kept as the baseline of the
+    speedups. Expects sources with no lexical errors'''
+    def __init__(self, in_path):
+        self.in_stream = in_path.open('r', encoding="utf-8")
+        self.cur_char = self.in_stream.read(1)
+        self.cur_token_type = None
+
+    def has_more_tokens(self):
+        self.cur_symbol = ""
+        self.cur_ident = ""
+        self.cur_intval = ""
+        self.cur_strconst = ""
+
+        while self.cur_char == " " or self.cur_char == "\n":
+            self.cur_char = self.in_stream.read(1)
+
+        if self.cur_char.isalpha():
+            self.cur_ident = self.cur_char
+            self.cur_char = self.in_stream.read(1)
+            while self.cur_char.isalnum() or self.cur_char == "_":
+                self.cur_ident += self.cur_char
+                self.cur_char = self.in_stream.read(1)
+            if self.cur_ident in keywords:
+                self.cur_token_type = TokenType.KEYWORD
+            else:
+                self.cur_token_type = TokenType.IDENTIFIER
+            return True
+
+        if self.cur_char in symbols:
+            self.cur_symbol = xml_escapes.get(self.cur_char, self.cur_char)
+            if self.cur_char == "/":
+                self.cur_char = self.in_stream.read(1)
+                # Line comment
+                if self.cur_char == "/":
+                    while self.cur_char != "\n":
+                        self.cur_char = self.in_stream.read(1)
+                    return self.has_more_tokens()
+                # Block comment
+                if self.cur_char == "*":
+                    self.cur_char = self.in_stream.read(1)
+                    while True:
+                        while self.cur_char != "*":
+                            self.cur_char = self.in_stream.read(1)
+                        self.cur_char = self.in_stream.read(1)
+                        if self.cur_char == "/":
+                            self.cur_char = self.in_stream.read(1)
+                            return self.has_more_tokens()
+            else:
+                self.cur_char = self.in_stream.read(1)
+            self.cur_token_type = TokenType.SYMBOL
+            return True
+
+        if self.cur_char.isdigit():
+            self.cur_intval = self.cur_char
+            self.cur_char = self.in_stream.read(1)
+            while self.cur_char.isdigit():
+                self.cur_intval += self.cur_char
+                self.cur_char = self.in_stream.read(1)
+            self.cur_token_type = TokenType.INT_CONST
+            return True
+
+        if self.cur_char == '"':
+            self.cur_char = self.in_stream.read(1)
+            while self.cur_char != '"':
+                self.cur_strconst += self.cur_char
+                self.cur_char = self.in_stream.read(1)
+            self.cur_char = self.in_stream.read(1)
+            self.cur_token_type = TokenType.STRING_CONST
+            return True
+
+        if self.cur_char == "":
+            self.in_stream.close()
+            return False
+
+        # Any other character, such as a tab, is skipped
+        self.cur_char = self.in_stream.read(1)
+        return self.has_more_tokens()
+
+    def get_token_type(self):
+        return self.cur_token_type
+
+    def get_keyword_type(self):
+        return KeywordType[self.cur_ident.upper()]
+
+    def get_symbol(self):
+        return self.cur_symbol
+
+    def get_int_val(self):
+        return int(self.cur_intval)
+
+    def get_string_val(self):
+        return self.cur_strconst
+
+    def get_cur_ident(self):
+        return self.cur_ident
+
+def scan(path, mode):
+    '''scans `path` reading each token's value like
+    the compilation engine does, returns the token count'''
+    if mode == "read1":
+        tz = CharTokenizer(path)
+    elif mode == "mmap":
+        tz = MappedJackTokenizer(path)
+    elif mode == "table":
+        tz = TokenCursor(tokenize_file(path))
+    else:
+        tz = JackTokenizer(path, mode)
+
+    count = 0
+    while tz.has_more_tokens():
+        count += 1
+        t = tz.get_token_type()
+        if t == TokenType.KEYWORD:
+            tz.get_keyword_type()
+        elif t == TokenType.IDENTIFIER:
+            tz.get_cur_ident()
+        elif t == TokenType.SYMBOL:
+            tz.get_symbol()
+        elif t == TokenType.INT_CONST:
+            tz.get_int_val()
+        else:
+            tz.get_string_val()
+    return count
+
+def run(path, mode, repeat):
+    '''returns (token count, best seconds) of `repeat` full scans'''
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        count = scan(path, mode)
+        elapsed = perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return count, best
+
+def peak_memory(path, mode):
+    '''returns the peak traced allocation of one scan in bytes'''
+    tracemalloc.start()
+    scan(path, mode)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def report(name, path, repeat):
+    '''prints one row per scanner mode for `path`'''
+    size = path.stat().st_size
+    baseline = None
+    for mode in ("read1", "stream", "buffer", "mmap", "table"):
+        count, seconds = run(path, mode, repeat)
+        if baseline is None:
+            baseline = seconds
+        print(f"{name:<20}{mode:<8}{count:>8}"
+              f"{count / seconds:>14,.0f}"
+              f"{size / seconds / 1e6:>10.2f}"
+              f"{baseline / seconds:>8.1f}x"
+              f"{peak_memory(path, mode) / 1024:>12,.0f}")
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sources = sorted((root / "tests").glob("*.jack"))
+
+    print(f"{'file':<20}{'mode':<8}{'tokens':>8}"
+          f"{'tokens/sec':>14}{'MB/sec':>10}{'speedup':>9}{'peak KiB':>12}")
+
+    for path in sources:
+        report(path.name, path, repeat)
+
+    # All test sources repeated, like a large generated class
+    with tempfile.TemporaryDirectory() as tmp:
+        big = Path(tmp) / "Big.jack"
+        text = "".join(path.read_text() for path in sources)
+        big.write_text(text * 200)
+        report("tests/* x200", big, repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Instructions/sec of the buffered VMWriter against
+# the previous unbuffered, per-word writer
+# Usage: python3 benchmarks/vm_writer_bench.py [instructions]
+import os
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+# Make the compiler modules importable
+root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root))
+
+from vm_writer import (
+    VMWriter, SegmentType, ArithmeticCType,
+    segment_type_to_string, arithmetic_ct_to_string
+)
+
+class WordWriter:
+    '''the previous writer: one write() per word,
+    a trailing space on every line'''
+    def __init__(self, file_path):
+        self.out_stream = file_path.open("w")
+
+    def write_push(self, segment, index):
+        self.write_command("push", segment_type_to_string(segment), str(index))
+
+    def write_pop(self, segment, index):
+        self.write_command("pop", segment_type_to_string(segment), str(index))
+
+    def write_arithmetic(self, command):
+        self.write_command(arithmetic_ct_to_string(command))
+
+    def write_label(self, label):
+        self.write_command("label", label)
+
+    def write_if(self, label):
+        self.write_command("if-goto", label)
+
+    def write_call(self, name, nArgs):
+        self.write_command("call", name, str(nArgs))
+
+    def write_function(self, name, nLocals):
+        self.write_command("function", name, str(nLocals))
+
+    def end_function(self):
+        pass
+
+    def write_command(self, *words):
+        for word in words:
+            self.out_stream.write(word + " ")
+        self.out_stream.write("\n")
+
+    def close(self):
+        self.out_stream.close()
+
+def emit(writer, count):
+    '''writes `count` instructions of a typical mix,
+    in functions of about 200 instructions'''
+    for i in range(count // 8):
+        if i % 25 == 0:
+            writer.end_function()
+            writer.write_function(f"Main.f{i}", 8)
+        writer.write_push(SegmentType.LOCAL, i & 7)
+        writer.write_push(SegmentType.CONST, i & 255)
+        writer.write_arithmetic(ArithmeticCType.ADD)
+        writer.write_pop(SegmentType.THAT, 0)
+        writer.write_label("LABEL_WHILE_0_1")
+        writer.write_push(SegmentType.ARG, 1)
+        writer.write_call("Math.multiply", 2)
+        writer.write_if("LABEL_WHILE_0_2")
+    writer.close()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+
+    print(f"{count:,} instructions")
+    print(f"{'writer':<18}{'Minstr/s':>10}{'bytes':>12}{'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        base = None
+        for name, new_writer in (
+            ("per-word", WordWriter),
+            ("buffered 4 KiB", lambda p: VMWriter(p, 1 << 12)),
+            ("buffered 64 KiB", VMWriter),
+            ("buffered 1 MiB", lambda p: VMWriter(p, 1 << 20)),
+        ):
+            path = Path(tmp) / "out.vm"
+            start = perf_counter()
+            emit(new_writer(path), count)
+            elapsed = perf_counter() - start
+            base = base or elapsed
+            print(f"{name:<18}{count / elapsed / 1e6:>10.2f}"
+                  f"{os.path.getsize(path):>12,}{base / elapsed:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
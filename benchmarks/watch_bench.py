@@ -0,0 +1,58 @@
+# Turnaround of --watch, from saving one class of a
+# generated project to its rewritten .vm file
+# Usage: python3 benchmarks/watch_bench.py [classes] [edits]
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter, sleep
+
+from parallel_bench import write_corpus
+
+root = Path(__file__).resolve().parent.parent
+
+def main():
+    classes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        write_corpus(directory, classes)
+        watcher = subprocess.Popen(
+            [sys.executable, str(root / "SyntaxAnalyzer.py"),
+             str(directory), "--watch", "--emit", "vm"],
+            stdout=subprocess.PIPE, text=True
+        )
+        print(watcher.stdout.readline().strip())
+
+        # Seen here, by polling the .vm file, and reported by the watcher
+        seen = []
+        reported = []
+        for i in range(edits):
+            source = directory / f"C{i * 7 % classes}.jack"
+            vm = source.with_suffix(".vm")
+            old_mtime = vm.stat().st_mtime_ns
+
+            text = source.read_text().replace("let sum = 0;", "let sum = 1;")
+            start = perf_counter()
+            source.write_text(text.replace("let sum = 1;", f"let sum = {i};"))
+            while vm.stat().st_mtime_ns == old_mtime:
+                sleep(0.0005)
+            seen.append((perf_counter() - start) * 1e3)
+
+            line = watcher.stdout.readline()
+            reported.append(float(line.split(", ")[-1].split()[0]))
+            # Let the polls settle between edits
+            sleep(0.05)
+
+        watcher.terminate()
+        watcher.wait()
+
+    print(f"{classes} classes, {edits} single-class edits")
+    for name, latencies in (("seen", seen), ("reported", reported)):
+        print(f"{name:<10}median {statistics.median(latencies):6.1f} ms"
+              f"  max {max(latencies):6.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# Compiles conditions straight to branches, following
+# the comparisons and logic operators of the condition
+from vm_ir import Opcode, Instruction
+from vm_writer import SegmentType, ArithmeticCType
+
+# Operations with two operands
+binary_ops = {
+    ArithmeticCType.ADD, ArithmeticCType.SUB,
+    ArithmeticCType.MULT, ArithmeticCType.DIV,
+    ArithmeticCType.AND, ArithmeticCType.OR,
+    ArithmeticCType.EQ, ArithmeticCType.GT, ArithmeticCType.LT
+}
+
+# Operations which give -1 or 0
+comparison_ops = {ArithmeticCType.EQ, ArithmeticCType.GT, ArithmeticCType.LT}
+
+# Operations which keep -1 or 0 operands at -1 or 0
+logic_ops = {ArithmeticCType.NOT, ArithmeticCType.AND, ArithmeticCType.OR}
+
+# Deeper conditions stay one leaf, the branch
+# compilation of a tree recurses down its depth
+MAX_CONDITION_DEPTH = 100
+
+class Condition:
+    '''A node of a condition's expression tree. Leaves
+    have no `op`, `code` is the VM code of the node'''
+    __slots__ = ("op", "children", "code")
+
+    def __init__(self, op, children, code) -> None:
+        self.op = op
+        self.children = children
+        self.code = code
+
+def condition_tree(code: list) -> Condition:
+    '''rebuilds the expression tree of the VM code of a
+    condition. Parts other than comparisons and logic
+    operators stay leaves, as does all code which does
+    not evaluate to one value or nests too deep'''
+    stack = []
+    # Depth of each node on the stack
+    depths = []
+    # Code which consumed a value without giving one
+    prefix = []
+
+    for instruction in code:
+        if instruction.op == Opcode.PUSH:
+            stack.append(Condition(None, (), prefix + [instruction]))
+            depths.append(1)
+            prefix = []
+        elif instruction.op == Opcode.POP and stack:
+            # Part of an array access or a multiplication
+            prefix = stack.pop().code + prefix + [instruction]
+            depths.pop()
+        elif instruction.op == Opcode.CALL and len(stack) >= instruction.arg2:
+            args = stack[len(stack) - instruction.arg2:]
+            del stack[len(stack) - instruction.arg2:]
+            del depths[len(depths) - instruction.arg2:]
+            stack.append(Condition(
+                None, (), [i for a in args for i in a.code]
+                    + prefix + [instruction]
+            ))
+            depths.append(1)
+            prefix = []
+        elif instruction.op == Opcode.ARITHMETIC and not prefix:
+            count = 2 if instruction.arg1 in binary_ops else 1
+            if len(stack) < count:
+                break
+            children = stack[len(stack) - count:]
+            del stack[len(stack) - count:]
+            depth = 1 + max(depths[len(depths) - count:])
+            del depths[len(depths) - count:]
+            if depth > MAX_CONDITION_DEPTH:
+                break
+            depths.append(depth)
+            stack.append(Condition(
+                instruction.arg1, children,
+                [i for c in children for i in c.code] + [instruction]
+            ))
+        else:
+            break
+    else:
+        if len(stack) == 1 and not prefix:
+            return stack[0]
+
+    # Not understood, keep it as it is
+    return Condition(None, (), list(code))
+
+def constant_of(node: Condition):
+    '''returns the value of constant nodes, else None'''
+    if node.op is None and len(node.code) == 1 \
+        and node.code[0].arg1 == SegmentType.CONST:
+        return node.code[0].arg2
+    if node.op == ArithmeticCType.NEG:
+        value = constant_of(node.children[0])
+        return None if value is None else -value
+    return None
+
+def is_boolean(node: Condition) -> bool:
+    '''true for nodes which are always -1 or 0'''
+    if node.op in comparison_ops:
+        return True
+    if node.op in logic_ops:
+        return all(is_boolean(child) for child in node.children)
+    return constant_of(node) in (0, -1)
+
+def is_pure_code(code: list) -> bool:
+    '''true for code which may be skipped: no calls,
+    and no division which may fail'''
+    return not any(
+        i.op == Opcode.CALL or (
+            i.op == Opcode.ARITHMETIC and i.arg1 == ArithmeticCType.DIV
+        )
+        for i in code
+    )
+
+def is_pure(node: Condition) -> bool:
+    '''true for nodes which may be skipped'''
+    return is_pure_code(node.code)
+
+def jump_if(node: Condition, truth: bool, label: str, new_label) -> list:
+    '''returns code which jumps to `label` if the condition
+    is `truth`, else falls through. Like `not`, `if-goto`
+    a condition is true only for -1. `new_label` gives
+    fresh labels for jumps within the condition'''
+    jump = Instruction(Opcode.IF, label)
+
+    if not is_boolean(node):
+        if node.op == ArithmeticCType.NOT:
+            # ~x is true only for x = 0
+            operand = node.children[0].code
+            if not truth:
+                return operand + [jump]
+            return jump_over(operand, label, new_label)
+        if not truth:
+            return node.code + [
+                Instruction(Opcode.ARITHMETIC, ArithmeticCType.NOT), jump
+            ]
+        return jump_over(
+            node.code + [Instruction(Opcode.ARITHMETIC, ArithmeticCType.NOT)],
+            label, new_label
+        )
+
+    # From here on, the condition is -1 or 0
+    value = constant_of(node)
+    if value is not None:
+        if (value != 0) == truth:
+            return [Instruction(Opcode.GOTO, label)]
+        return []
+
+    if node.op == ArithmeticCType.NOT:
+        return jump_if(node.children[0], not truth, label, new_label)
+
+    if node.op == ArithmeticCType.EQ and not truth:
+        # x = y is false when x - y is not 0
+        left, right = node.children
+        if constant_of(right) == 0:
+            return left.code + [jump]
+        return left.code + right.code + [
+            Instruction(Opcode.ARITHMETIC, ArithmeticCType.SUB), jump
+        ]
+
+    if node.op in (ArithmeticCType.AND, ArithmeticCType.OR) \
+        and is_pure(node.children[1]):
+        # Skip the right side once the left side decides
+        left, right = node.children
+        decided = node.op == ArithmeticCType.OR
+        if decided == truth:
+            return jump_if(left, truth, label, new_label) \
+                + jump_if(right, truth, label, new_label)
+        skip = new_label()
+        return jump_if(left, decided, skip, new_label) \
+            + jump_if(right, truth, label, new_label) \
+            + [Instruction(Opcode.LABEL, skip)]
+
+    if truth:
+        return node.code + [jump]
+    return node.code + [
+        Instruction(Opcode.ARITHMETIC, ArithmeticCType.NOT), jump
+    ]
+
+def jump_over(code, label, new_label):
+    '''returns code which jumps to `label` if `code` gives 0'''
+    skip = new_label()
+    return code + [
+        Instruction(Opcode.IF, skip),
+        Instruction(Opcode.GOTO, label),
+        Instruction(Opcode.LABEL, skip)
+    ]
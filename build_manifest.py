@@ -0,0 +1,171 @@
+# Manifest of the last build of a directory, for
+# compiling only the files whose inputs changed
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from token_table import TokenTable, tokenize_source
+from type_enums import TokenType
+from version import COMPILER_VERSION
+
+# File name of the manifest, next to the outputs
+MANIFEST_NAME = ".jack-manifest.json"
+
+# Keywords which start a subroutine declaration
+subroutine_keywords = ("constructor", "function", "method")
+
+def content_hash(data: bytes) -> str:
+    '''returns the hash of file contents'''
+    return hashlib.sha256(data).hexdigest()
+
+def class_interface(table: TokenTable) -> str:
+    '''returns the hash of the subroutine declarations of
+    a class, which is all other classes can use of it'''
+    digest = hashlib.sha256()
+    in_declaration = False
+    for index in range(len(table)):
+        text = table.pool[table.values[index]]
+        if table.types[index] == TokenType.KEYWORD.value \
+            and text in subroutine_keywords:
+            in_declaration = True
+        if in_declaration:
+            digest.update(text.encode())
+            digest.update(b"\0")
+            # The parameter list ends the declaration
+            in_declaration = text != ")"
+    return digest.hexdigest()
+
+def referenced_names(table: TokenTable) -> list:
+    '''returns the identifiers a class uses, a superset of
+    the other classes it depends on'''
+    return sorted({
+        table.pool[table.values[index]] for index in range(len(table))
+        if table.types[index] == TokenType.IDENTIFIER.value
+    })
+
+class BuildManifest:
+    '''Source hash, interface, references, outputs and
+    compile time of each file of the last build of a
+    directory. Entries of another compiler version or
+    other options are dropped'''
+    def __init__(self, directory: Path, options: str) -> None:
+        self.path = directory / MANIFEST_NAME
+        self.options = options
+
+        # Source file name -> its entry
+        self.entries = {}
+        # Path -> (source hash, interface, references)
+        # of each file to compile, from plan()
+        self.inputs = {}
+        # Files compiled only since a class they use changed
+        self.dependent_count = 0
+        try:
+            manifest = json.loads(self.path.read_text())
+            if manifest["version"] == COMPILER_VERSION \
+                and manifest["options"] == options:
+                self.entries = manifest["files"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def is_fresh(self, path: Path, source_hash: str) -> bool:
+        '''true if `path` is unchanged since its last build
+        and its outputs are still as written then'''
+        entry = self.entries.get(path.name)
+        if entry is None or entry["source"] != source_hash:
+            return False
+        for name, output_hash in entry["outputs"].items():
+            try:
+                data = (path.parent / name).read_bytes()
+            except OSError:
+                return False
+            if content_hash(data) != output_hash:
+                return False
+        return True
+
+    def dependents(self, class_names: set) -> set:
+        '''returns the source files which use any of `class_names`'''
+        return {
+            name for name, entry in self.entries.items()
+            if class_names.intersection(entry["references"])
+        }
+
+    def plan(self, paths: list) -> list:
+        '''returns the files of `paths` to compile: those
+        changed since the last build, and those using a
+        class whose interface changed, appeared or left'''
+        changed_classes = set()
+        # Files not in `paths` may still be in the directory
+        for name in list(self.entries):
+            if not (self.path.parent / name).exists():
+                changed_classes.add(Path(name).stem)
+                del self.entries[name]
+
+        stale = []
+        for path in paths:
+            source = path.read_bytes()
+            source_hash = content_hash(source)
+            if self.is_fresh(path, source_hash):
+                continue
+            stale.append(path)
+
+            try:
+                table = tokenize_source(source.decode("utf-8"), str(path))
+            except (SyntaxError, UnicodeDecodeError):
+                # Reported when the file is compiled
+                self.inputs[path] = (source_hash, None, [])
+                changed_classes.add(path.stem)
+                continue
+
+            interface = class_interface(table)
+            self.inputs[path] = (
+                source_hash, interface, referenced_names(table)
+            )
+            entry = self.entries.get(path.name)
+            if entry is None or entry["interface"] != interface:
+                changed_classes.add(path.stem)
+
+        dependents = self.dependents(changed_classes)
+        for path in paths:
+            if path.name in dependents and path not in self.inputs:
+                entry = self.entries[path.name]
+                self.inputs[path] = (
+                    entry["source"], entry["interface"], entry["references"]
+                )
+                stale.append(path)
+                self.dependent_count += 1
+
+        stale.sort()
+        return stale
+
+    def skipped_seconds(self, paths: list) -> float:
+        '''returns the last compile time of the files of
+        `paths` which plan() left out'''
+        return sum(
+            self.entries[path.name]["seconds"]
+            for path in paths if path not in self.inputs
+        )
+
+    def record(self, path: Path, outputs: list, seconds: float) -> None:
+        '''updates the entry of a file just compiled'''
+        source_hash, interface, references = self.inputs[path]
+        self.entries[path.name] = {
+            "source": source_hash,
+            "interface": interface,
+            "references": references,
+            "outputs": {
+                output.name: content_hash(output.read_bytes())
+                for output in outputs
+            },
+            "seconds": seconds
+        }
+
+    def save(self) -> None:
+        '''writes the manifest, replacing the old one at once'''
+        temp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        temp.write_text(json.dumps({
+            "version": COMPILER_VERSION,
+            "options": self.options,
+            "files": self.entries
+        }, indent=1, sort_keys=True))
+        os.replace(temp, self.path)
@@ -0,0 +1,69 @@
+import tempfile
+from pathlib import Path
+
+from build_manifest import BuildManifest, class_interface
+from token_table import tokenize_source
+
+point = """class Point {
+    field int x;
+    method int getX() { return x; }
+}"""
+main = """class Main {
+    function void main() { do Point.getX(); return; }
+}"""
+
+# Bodies are not part of the interface
+assert class_interface(tokenize_source(point)) == class_interface(
+    tokenize_source(point.replace("return x;", "return x + 1;"))
+)
+assert class_interface(tokenize_source(point)) != class_interface(
+    tokenize_source(point.replace("getX()", "getX(int y)"))
+)
+
+def build(directory):
+    '''plans a build, writes the outputs of the files to
+    compile, and returns their names'''
+    manifest = BuildManifest(directory, "emit=vm")
+    stale = manifest.plan(sorted(directory.glob("*.jack")))
+    for path in stale:
+        path.with_suffix(".vm").write_text(path.read_text().upper())
+        manifest.record(path, [path.with_suffix(".vm")], 0.5)
+    manifest.save()
+    return [path.name for path in stale]
+
+with tempfile.TemporaryDirectory() as tmp:
+    directory = Path(tmp)
+    (directory / "Point.jack").write_text(point)
+    (directory / "Main.jack").write_text(main)
+    assert build(directory) == ["Main.jack", "Point.jack"]
+    assert build(directory) == []
+
+    # A new body recompiles only its file
+    (directory / "Point.jack").write_text(point.replace("x;", "x + 1;"))
+    assert build(directory) == ["Point.jack"]
+
+    # A new interface recompiles the classes using it
+    (directory / "Point.jack").write_text(point.replace("()", "(int y)"))
+    assert build(directory) == ["Main.jack", "Point.jack"]
+
+    # Changed or missing outputs are written again
+    (directory / "Main.vm").write_text("")
+    assert build(directory) == ["Main.jack"]
+    (directory / "Point.vm").unlink()
+    assert build(directory) == ["Point.jack"]
+
+    # Planning one file keeps the entries of the others
+    (directory / "Main.jack").write_text(main + " ")
+    manifest = BuildManifest(directory, "emit=vm")
+    assert manifest.plan([directory / "Main.jack"]) == [directory / "Main.jack"]
+    assert set(manifest.entries) == {"Main.jack", "Point.jack"}
+    assert build(directory) == ["Main.jack"]
+
+    # Removing a class builds the classes using it
+    (directory / "Point.jack").unlink()
+    assert build(directory) == ["Main.jack"]
+
+    # Other options build everything
+    assert BuildManifest(directory, "emit=both").entries == {}
+
+print("All assertions are True!")
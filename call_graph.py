@@ -0,0 +1,98 @@
+# Whole-program call graph of compiled VM code, for
+# leaving out subroutines which are never called
+from pathlib import Path
+
+# Subroutines run by the platform, where every call chain starts
+DEFAULT_ROOTS = ("Main.main", "Sys.init")
+
+def split_functions(text: str) -> list:
+    '''splits the VM code of a file into [name, lines] pairs,
+    one per function. Lines before the first function are
+    kept under the name None'''
+    functions = [[None, []]]
+    for line in text.splitlines(keepends=True):
+        if line.startswith("function "):
+            functions.append([line.split()[1], []])
+        functions[-1][1].append(line)
+    if not functions[0][1]:
+        del functions[0]
+    return functions
+
+def is_instruction(line: str) -> bool:
+    '''true for lines holding a VM command, not for
+    comments, blank lines and readable separators'''
+    line = line.strip()
+    return bool(line) and not line.startswith(("//", "-"))
+
+class CallGraph:
+    '''The subroutines of a set of .vm files and the
+    subroutines each of them calls'''
+    def __init__(self) -> None:
+        # Function name -> names of the functions it calls
+        self.calls = {}
+        # .vm file -> its functions as [name, lines] pairs
+        self.files = {}
+        # .vm files whose functions changed
+        self.changed = set()
+
+    def add_file(self, path: Path) -> None:
+        '''adds the functions of a .vm file'''
+        self.add_text(path, path.read_text())
+
+    def add_text(self, key, text: str) -> None:
+        '''adds the functions of VM code held in memory,
+        under `key` in place of a file'''
+        functions = split_functions(text)
+        self.files[key] = functions
+        for name, lines in functions:
+            if name is not None:
+                self.calls[name] = {
+                    line.split()[1] for line in lines
+                    if line.startswith("call ")
+                }
+
+    def reachable(self, roots=DEFAULT_ROOTS) -> set:
+        '''returns the functions called, directly or not,
+        from the `roots` which are in the program'''
+        seen = {root for root in roots if root in self.calls}
+        pending = list(seen)
+        while pending:
+            # Calls of functions outside the program, like
+            # the OS, are not followed
+            for callee in self.calls[pending.pop()]:
+                if callee in self.calls and callee not in seen:
+                    seen.add(callee)
+                    pending.append(callee)
+        return seen
+
+    def remove_unused(self, roots=DEFAULT_ROOTS) -> dict:
+        '''leaves out the functions which are not reachable
+        from `roots`. Returns the name and instruction count
+        of each removed function. Removes nothing if no root
+        is in the program'''
+        used = self.reachable(roots)
+        if not used:
+            return {}
+
+        removed = {}
+        for path, functions in self.files.items():
+            kept = []
+            for name, lines in functions:
+                if name is None or name in used:
+                    kept.append([name, lines])
+                else:
+                    removed[name] = sum(map(is_instruction, lines))
+            if len(kept) != len(functions):
+                self.files[path] = kept
+                self.changed.add(path)
+        return removed
+
+    def text(self, key) -> str:
+        '''returns the VM code of a file, as it is now'''
+        return "".join(line for _, lines in self.files[key] for line in lines)
+
+    def write(self) -> None:
+        '''rewrites the .vm files whose functions changed'''
+        for path in self.changed:
+            path.write_text(self.text(path))
+        self.changed.clear()
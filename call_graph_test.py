@@ -0,0 +1,75 @@
+import tempfile
+from pathlib import Path
+
+from call_graph import CallGraph, split_functions
+
+main_vm = """function Main.main 0
+push constant 2
+call Point.new 1
+call Point.norm 1
+pop temp 0
+push constant 0
+return
+function Main.unused 0
+call Point.new 1
+return
+"""
+
+point_vm = """function Point.new 0
+push constant 1
+call Memory.alloc 1
+pop pointer 0
+push pointer 0
+return
+--------------
+function Point.norm 0
+push argument 0
+pop pointer 0
+push pointer 0
+call Point.square 1
+return
+--------------
+function Point.square 0
+// if statement
+push constant 0
+return
+--------------
+function Point.dispose 0
+push constant 0
+return
+--------------
+"""
+
+# Lines stay with the function they follow
+assert [name for name, _ in split_functions(point_vm)] == [
+    "Point.new", "Point.norm", "Point.square", "Point.dispose"
+]
+assert "".join(
+    line for _, lines in split_functions(point_vm) for line in lines
+) == point_vm
+
+with tempfile.TemporaryDirectory() as tmp:
+    main_path = Path(tmp) / "Main.vm"
+    point_path = Path(tmp) / "Point.vm"
+    main_path.write_text(main_vm)
+    point_path.write_text(point_vm)
+
+    graph = CallGraph()
+    graph.add_file(main_path)
+    graph.add_file(point_path)
+    assert graph.calls["Main.main"] == {"Point.new", "Point.norm"}
+    assert graph.reachable() == {
+        "Main.main", "Point.new", "Point.norm", "Point.square"
+    }
+
+    # Functions which no reachable function calls are removed
+    assert graph.remove_unused() == {"Main.unused": 3, "Point.dispose": 3}
+    graph.write()
+    assert main_path.read_text() == main_vm[:main_vm.index("function Main.unused")]
+    assert "Point.dispose" not in point_path.read_text()
+    assert "Point.square" in point_path.read_text()
+
+    # Without Main.main, nothing is known to be unused
+    assert graph.remove_unused(roots=("Other.main",)) == {}
+
+print("All assertions are True!")
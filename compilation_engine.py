@@ -1,6 +1,3 @@
-# Import enums
-from vm_writer import VMWriter
-from type_enums import TokenType, KeywordType
 
 # Import jack tokenizer
 from jack_tokenizer import JackTokenizer
@@ -9,30 +6,24 @@ from jack_tokenizer import JackTokenizer
 from symbol_table import SymbolKind, SymbolTable
 
 from vm_writer import VMWriter, SegmentType, ArithmeticCType
+from peephole import PeepholeOptimizer
+from strength_reduction import multiply_code, MAX_MULTIPLY_CODE
+from branches import condition_tree, jump_if, is_pure_code
+from vm_ir import Opcode, Instruction
+from jack_parser import JackParser
+from jack_ast import (
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    Expression, IntegerConstant, StringConstant, KeywordConstant,
+    VarTerm, ArrayTerm, SubroutineCall, ParenTerm, UnaryTerm
+)
+from xml_generator import XMLGenerator
 from pathlib import Path
 
-# Supported built-in data type keywords
-data_types = {
-    KeywordType.INT,
-    KeywordType.BOOLEAN,
-    KeywordType.CHAR
-}
-
-# Supported keyword constants
-keyword_constants = {
-    KeywordType.TRUE,
-    KeywordType.FALSE,
-    KeywordType.NULL,
-    KeywordType.THIS
-}
-
-# Supported statement type keywords
-statement_types = {
-    KeywordType.LET,
-    KeywordType.IF,
-    KeywordType.WHILE,
-    KeywordType.DO,
-    KeywordType.RETURN
+# Supported output modes
+emit_modes = {
+    "vm",       # only the .vm file
+    "xml",      # only the .xml parse tree
+    "both"
 }
 
 # Supported binary operations
@@ -51,6 +42,53 @@ allowed_op = {
     "=": ArithmeticCType.EQ
 }
 
+# Operations with a cheaper form for constant operands
+strength_ops = {
+    ArithmeticCType.MULT,
+    ArithmeticCType.DIV
+}
+
+# Supported optimizations
+optimization_names = {
+    "peephole",     # rewrite wasteful instruction sequences
+    "fold",         # evaluate constant expressions at compile time
+    "strength",     # multiply and divide by constants without calls
+    "branch",       # branch on the structure of if/while conditions
+    "dce",          # leave out code after returns, and constant branches
+    "pool"          # build each string constant of a class only once
+}
+
+def to_word(value):
+    '''wraps an integer to a 16-bit two's complement value'''
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+def divide(x, y):
+    '''Math.divide, rounding toward zero. None for
+    division by zero, which is left to fail at run time'''
+    if y == 0:
+        return None
+    quotient = abs(x) // abs(y)
+    return -quotient if (x < 0) != (y < 0) else quotient
+
+# Compile time evaluation of the binary operations
+constant_ops = {
+    ArithmeticCType.ADD:  lambda x, y: x + y,
+    ArithmeticCType.SUB:  lambda x, y: x - y,
+    ArithmeticCType.MULT: lambda x, y: x * y,
+    ArithmeticCType.DIV:  divide,
+    ArithmeticCType.AND:  lambda x, y: x & y,
+    ArithmeticCType.OR:   lambda x, y: x | y,
+    ArithmeticCType.LT:   lambda x, y: -1 if x < y else 0,
+    ArithmeticCType.GT:   lambda x, y: -1 if x > y else 0,
+    ArithmeticCType.EQ:   lambda x, y: -1 if x == y else 0
+}
+
+# Compile time evaluation of the unary operations
+constant_unary_ops = {
+    ArithmeticCType.NEG: lambda x: -x,
+    ArithmeticCType.NOT: lambda x: ~x
+}
+
 # Supported unary operations
 allowed_unary_op = { 
     "-": ArithmeticCType.NEG, 
@@ -58,10 +96,22 @@ allowed_unary_op = {
 }
 
 class CompilationEngine:
-    '''The brain of the Jack syntax analyzer'''
+    '''The brain of the Jack syntax analyzer. Parses a class
+    into a syntax tree, then visits the tree to write the
+    XML parse tree and the VM code. Output goes to files
+    next to `out_path`, or to `xml_stream` and `vm_stream`
+    if given. `ir` collects the VM instructions written'''
     # Constructor
-    def __init__(self, tokenizer: JackTokenizer, out_path : Path):
+    def __init__(self, tokenizer: JackTokenizer, out_path : Path,
+        emit="both", readable_vm=False, optimizations=frozenset(),
+        xml_stream=None, vm_stream=None, ir=None):
+        if emit not in emit_modes:
+            raise ValueError(f"Unknown emit mode: {emit}")
+        for name in set(optimizations) - optimization_names:
+            raise ValueError(f"Unknown optimization: {name}")
+
         self.tokenizer = tokenizer
+        self.emit = emit
         
         # Create symbol tables
         self.class_level_st = SymbolTable()
@@ -72,16 +122,90 @@ class CompilationEngine:
         self.func_name = None
         self.sub_type = None
 
-        # Open the output file for writing
-        self.out_stream = out_path.open('w')
+        # Streams given by the caller stay open
+        self.owns_out_stream = xml_stream is None
+        if emit == "vm":
+            # No XML file, and no XML formatting work at all
+            self.out_stream = None
+        else:
+            # Open the output file for writing
+            self.out_stream = xml_stream
+            if xml_stream is None:
+                self.out_stream = out_path.open('w')
+            self.write_xml = self.out_stream.write
+
+        # Evaluate constant expressions while compiling
+        self.fold = "fold" in optimizations
+
+        # Replace Math.multiply/divide calls by constants
+        self.strength = "strength" in optimizations
+
+        # Compile conditions to branches, rotate while loops
+        self.branch = "branch" in optimizations
+
+        # Leave out statements which can not run
+        self.dead_code = "dce" in optimizations
+
+        # Subroutine -> dead VM instructions left out
+        self.removed_code = {}
+
+        # Keep string constants in statics, built on first use
+        self.pool_strings = "pool" in optimizations
+
+        # String constant -> static holding it
+        self.string_pool = {}
+
+        # Optimization passes run on every subroutine
+        passes = []
+        self.peephole = None
+        if "peephole" in optimizations:
+            self.peephole = PeepholeOptimizer()
+            passes.append(self.peephole.optimize)
 
         # Create a new VM writer for writing
-        self.vm_writer = VMWriter(out_path.with_suffix(".vm"))
+        if emit == "xml":
+            self.vm_writer = VMWriter(None)
+        else:
+            if vm_stream is None:
+                vm_stream = out_path.with_suffix(".vm")
+            self.vm_writer = VMWriter(
+                vm_stream,
+                readable=readable_vm, passes=tuple(passes), ir=ir
+            )
 
         # For generating labels
         self.label_count = {
             "if": 0,
-            "while": 0
+            "while": 0,
+            "branch": 0,
+            "string": 0
+        }
+
+        # Statement type -> method compiling it
+        self.statement_compilers = {
+            LetStatement: self.compile_let,
+            IfStatement: self.compile_if,
+            WhileStatement: self.compile_while_statement,
+            DoStatement: self.compile_do,
+            ReturnStatement: self.compile_return
+        }
+
+        # Term type -> method compiling it, for terms
+        # without expressions
+        self.leaf_compilers = {
+            IntegerConstant: self.compile_integer_constant,
+            StringConstant: self.compile_string_constant,
+            KeywordConstant: self.compile_keyword_constant,
+            VarTerm: self.compile_var_term
+        }
+
+        # Node type -> generator compiling it, for nodes
+        # holding expressions
+        self.nested_compilers = {
+            Expression: self.expression_steps,
+            ArrayTerm: self.array_steps,
+            UnaryTerm: self.unary_steps,
+            SubroutineCall: self.call_steps
         }
     
     def get_if_labels(self):
@@ -98,193 +222,59 @@ class CompilationEngine:
             f"LABEL_WHILE_{self.label_count['while'] - 1}_2"
         )
 
-    def start_compilation(self):
-        # Read the first token into memory
-        self.tokenizer.has_more_tokens()
-
-        # Start analyzing syntax
-        if self.tokenizer.get_token_type() == TokenType.KEYWORD:
-            if self.tokenizer.get_keyword_type() == KeywordType.CLASS:
-                self.compile_class()
-        else:
-            raise AttributeError("Not starting with a class")
-
-    # Helper method to write terminal XML tags
-    def write_terminal_tag(self, t, v):
-        if t == TokenType.KEYWORD:
-            self.out_stream.write(f"<keyword> {v} </keyword>\n")
-        elif t == TokenType.IDENTIFIER:
-            self.out_stream.write(f"<identifier> {v} </identifier>\n")
-        elif t == TokenType.SYMBOL:
-            self.out_stream.write(f"<symbol> {v} </symbol>\n")
-        elif t == TokenType.INT_CONST:
-            self.out_stream.write(f"<integerConstant> {v} </integerConstant>\n")
-        elif t == TokenType.STRING_CONST:
-            self.out_stream.write(f"<stringConstant> {v} </stringConstant>\n")
-
-    # 'class' className '{' classVarDec* subroutineDec* '}'
-    def compile_class(self):
-        # Write opening tag
-        self.out_stream.write("<class>\n")
-        self.write_terminal_tag(self.tokenizer.get_token_type(), 'class')
-
-        # Read the next token
-        self.tokenizer.has_more_tokens()
-
-        if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            self.class_name = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                self.tokenizer.get_token_type(), 
-                self.class_name
-            )
-            self.out_stream.write("\n===DECLARED===\nclass name\n=======")
-        else:
-            raise AttributeError("Not a valid class name!")
-        
-        # Read the next token
-        self.tokenizer.has_more_tokens()
-
-        self.eat('{')
-        self.write_terminal_tag(self.tokenizer.get_token_type(), self.tokenizer.get_symbol())
-
-        # Handle class variable declaration (classVarDec*)
-        # Proceed to next token
-        self.tokenizer.has_more_tokens()
-
-        # While there are field/static declarations
-        while \
-        (self.tokenizer.get_token_type() == TokenType.KEYWORD) and\
-        (
-            self.tokenizer.get_keyword_type() in (KeywordType.FIELD, KeywordType.STATIC) 
-        ):
-            self.compile_class_var_dec()
-
-        while \
-        (self.tokenizer.get_token_type() == TokenType.KEYWORD) and\
-        (
-            self.tokenizer.get_keyword_type() in (KeywordType.CONSTRUCTOR, KeywordType.FUNCTION, KeywordType.METHOD)
-        ):
-            self.compile_subroutine_dec()
-
-        # Class ending curly brackets
-        self.eat("}")
-        self.write_terminal_tag(TokenType.SYMBOL, "}")
-
-        # At the end of function call
-        self.out_stream.write("</class>\n")
-
-    # ('static'|'field') type varName (',' varName)* ';'
-    def compile_class_var_dec(self):
-        # Write opening tag
-        self.out_stream.write("<classVarDec>\n")
-
-        # Write static/field
-        self.write_terminal_tag(
-            TokenType.KEYWORD, 
-            self.tokenizer.get_cur_ident())
-
-        # To store variable properties
-        var_kind = None
-        var_type = None
-        var_index = None
-        var_name = None
-
-        if self.tokenizer.get_cur_ident() == "static":
-            var_kind = SymbolKind.STATIC
-        elif self.tokenizer.get_cur_ident() == "field":
-            var_kind = SymbolKind.FEILD
-        else:
-            raise Exception(
-                "Other than static or feild:" +  
-                self.tokenizer.get_cur_ident()
-            )
-
-        # Read the next token
-        self.tokenizer.has_more_tokens()
-
-        if self.is_valid_type():
-            self.write_terminal_tag(
-                self.tokenizer.get_token_type(), 
-                self.tokenizer.get_cur_ident())
-
-            var_type = self.tokenizer.get_cur_ident()
-        else:
-            raise AssertionError("Invalid class variable type!")
-        
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            var_name = self.tokenizer.get_cur_ident()
-
-            # Write varible tag to XML file
-            self.write_terminal_tag(
-                self.tokenizer.get_token_type(), 
-                var_name)
-
-            # Define new class level variable
-            self.class_level_st.define(var_name, var_type, var_kind)
-            var_index = self.class_level_st.get_index_of(var_name)
-
-            # Write variable properties
-            self.out_stream.write(
-                f"\n===DECLARED===\nkind: {var_kind}, type: {var_type}, index: {var_index}\n=======")
-        else:
-            raise AssertionError("Invalid class variable name!")
-
-        # Move to the next token
-        self.tokenizer.has_more_tokens()
-
-        # If has more than one varibles: E.g. field int x, y, z;
-        while self.tokenizer.get_token_type() == TokenType.SYMBOL \
-            and self.tokenizer.get_symbol() == ",":
-            self.write_terminal_tag(TokenType.SYMBOL, ",")
+    def get_branch_label(self):
+        self.label_count["branch"] += 1
+        return f"LABEL_BRANCH_{self.label_count['branch'] - 1}"
+
+    def get_string_label(self):
+        self.label_count["string"] += 1
+        return f"LABEL_STRING_{self.label_count['string'] - 1}"
+
+    def write_jump_if(self, start, truth, label):
+        '''replaces the condition code from `start` on with
+        a jump to `label` if the condition is `truth`'''
+        code = self.vm_writer.function
+        condition = condition_tree(code[start:])
+        code[start:] = jump_if(
+            condition, truth, label, self.get_branch_label
+        )
 
-            # Move to next token
-            self.tokenizer.has_more_tokens()
+    def start_compilation(self):
+        # Build the syntax tree of the class
+        tree = JackParser(self.tokenizer).parse()
+        if tree is None:
+            return
 
-            if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-                var_name = self.tokenizer.get_cur_ident()
+        if self.out_stream is not None:
+            XMLGenerator(self.write_xml).write_class(tree)
 
-                # Write varible tag to XML file
-                self.write_terminal_tag(
-                    self.tokenizer.get_token_type(), 
-                    var_name)
+        if self.emit != "xml":
+            self.compile_class(tree)
 
-                # Define new class level variable
-                self.class_level_st.define(var_name, var_type, var_kind)
-                var_index = self.class_level_st.get_index_of(var_name)
+    # Close the output files
+    def close(self):
+        if self.out_stream is not None and self.owns_out_stream:
+            self.out_stream.close()
+        self.vm_writer.close()
 
-                # Write variable properties
-                self.out_stream.write(
-                    f"\n===DECLARED===\nkind: {var_kind}, type: {var_type}, index: {var_index}\n=======")
-            else:
-                raise AssertionError("Invalid Syntax for class varible declaration!")
-
-            # Move to next token
-            self.tokenizer.has_more_tokens()
+    # 'class' className '{' classVarDec* subroutineDec* '}'
+    def compile_class(self, node):
+        self.class_name = node.name
 
-        # Must end with ";"
-        self.eat(";")
-        self.write_terminal_tag(TokenType.SYMBOL, ";")
+        for var_dec in node.var_decs:
+            var_kind = SymbolKind.STATIC
+            if var_dec.kind == "field":
+                var_kind = SymbolKind.FEILD
+            for var_name in var_dec.names:
+                self.class_level_st.define(var_name, var_dec.type, var_kind)
 
-        # Move to next token
-        self.tokenizer.has_more_tokens()
+        for subroutine in node.subroutines:
+            self.compile_subroutine_dec(subroutine)
 
-        # Write closing tag
-        self.out_stream.write("</classVarDec>\n")
-    
     # ('constructor' | 'function' | 'method') ('void' | 'type') subroutineName
-    def compile_subroutine_dec(self):
-        # Opening tag
-        self.out_stream.write("<subroutineDec>\n")
-        
-        # To store function parameters 
-        func_params = {}
-
-        # Write subroutine type
-        self.sub_type = self.tokenizer.get_cur_ident()
-        self.write_terminal_tag(TokenType.KEYWORD, self.sub_type)
+    def compile_subroutine_dec(self, node):
+        self.sub_type = node.kind
+        self.func_name = node.name
 
         # Reset subroutine level symbol table
         self.subroutine_level_st.reset_table()
@@ -295,979 +285,482 @@ class CompilationEngine:
                 "this", self.class_name, SymbolKind.ARG
             )
 
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        if self.is_valid_type() or \
-            (self.tokenizer.get_token_type() == TokenType.KEYWORD \
-            and self.tokenizer.get_keyword_type() == KeywordType.VOID):
-            self.write_terminal_tag(
-                self.tokenizer.get_token_type(), 
-                self.tokenizer.get_cur_ident()
-            )
-        else:
-            raise AssertionError("Not a valid subroutine return type!")
-
-         # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            func_params["name"] = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                TokenType.IDENTIFIER, 
-                func_params["name"]
-            )
-
-        else:
-            raise AssertionError("Invalid Syntax for function name!")
-        
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        self.eat('(')
-        self.write_terminal_tag(TokenType.SYMBOL, "(")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # If there are some parameters
-        self.out_stream.write("<parameterList>\n")
-        if not (self.tokenizer.get_token_type() == TokenType.SYMBOL):
-            self.compile_parameter_list()
-        self.out_stream.write("</parameterList>\n")
-
-        # Move to next token
-        self.eat(')')
-        self.write_terminal_tag(TokenType.SYMBOL, ")")
-        
-        # Write function VM command
-        self.func_name = func_params['name']
-
-        # Move to the next token
-        self.tokenizer.has_more_tokens()
-        self.compile_subroutine_body()    
-
-        # Closing tag
-        self.out_stream.write("</subroutineDec>\n")
-
-    # ((type varName) (',' type varName)*)?
-    def compile_parameter_list(self):
-        # For storing varible params
-        var_name = None
-        var_type = None
-        var_kind = SymbolKind.ARG  # Argument list
-        var_index = None
-
-        if self.is_valid_type():
-            var_type = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                self.tokenizer.get_token_type(), 
-                var_type)
-        else:
-            raise AssertionError("Invalid syntax in parameter list!")
-        
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            var_name = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                TokenType.IDENTIFIER, 
-                var_name)
-        else:
-            raise AssertionError(
-                "Invalid Syntax for function parameter name name!")
-
-        # Define the argument variable
-        self.subroutine_level_st.define(
-            var_name, var_type, var_kind
-        )
-
-        # Get the index of the newly created variable
-        var_index = self.subroutine_level_st.get_index_of(var_name)
-
-        # Write variable properties
-        self.out_stream.write(
-            f"\n===DECLARED===\nkind: {var_kind}, type: {var_type}, index: {var_index}\n=======")
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # Handle more than one parameters
-        while self.tokenizer.get_token_type() == TokenType.SYMBOL \
-            and self.tokenizer.get_symbol() == ",":
-            self.write_terminal_tag(TokenType.SYMBOL, ",")
-
-            # Read the next token
-            self.tokenizer.has_more_tokens()
-
-            # If the current token is a valid type name
-            if self.is_valid_type():
-                var_type = self.tokenizer.get_cur_ident()
-                self.write_terminal_tag(
-                    self.tokenizer.get_token_type(), 
-                    var_type)
-            else:
-                raise AssertionError("Invalid variable type in parameter list")
-            
-            # Read the next token
-            self.tokenizer.has_more_tokens()
-
-            # If current token is a valid identifier
-            if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-                var_name = self.tokenizer.get_cur_ident()
-                self.write_terminal_tag(
-                    TokenType.IDENTIFIER, 
-                    var_name)
-            else:
-                raise AssertionError(
-                        "Invalid variable name in parameter list!!")
-
-            self.subroutine_level_st.define(
-                var_name, var_type, var_kind
-            )
-
-            var_index = self.subroutine_level_st.get_index_of(var_name)
-
-             # Write variable properties
-            self.out_stream.write(
-                f"\n===DECLARED===\nkind: {var_kind}, type: {var_type}, index: {var_index}\n=======")
-            # Read the next token
-            self.tokenizer.has_more_tokens()
-        
-    # '{' varDec* statements '}'
-    def compile_subroutine_body(self):
-        # Write opening tag
-        self.out_stream.write("<subroutineBody>\n")
-
-        # Eat opening curly bracket
-        self.eat("{")
-        self.write_terminal_tag(TokenType.SYMBOL, "{")
-        
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # Handle variable declarations
-        while self.tokenizer.get_token_type() == TokenType.KEYWORD  \
-        and self.tokenizer.get_keyword_type() == KeywordType.VAR:
-            
-            # Current token is the 'var' keyword
-            self.compile_var_dec()
-            
-        # Get number of local variables 
-        # for the current compiling function
-        nVars = self.subroutine_level_st.get_var_count(
-                                    SymbolKind.VAR
-                                )
+        for var_type, var_name in node.parameters:
+            self.subroutine_level_st.define(var_name, var_type, SymbolKind.ARG)
+        for var_dec in node.var_decs:
+            for var_name in var_dec.names:
+                self.subroutine_level_st.define(
+                    var_name, var_dec.type, SymbolKind.VAR
+                )
 
         # Write function     
         self.vm_writer.write_function(
-                f"{self.class_name}.{self.func_name}",
-                nVars
-            )
+            f"{self.class_name}.{self.func_name}",
+            self.subroutine_level_st.get_var_count(SymbolKind.VAR)
+        )
         
         if self.sub_type == "constructor":
-            nFeilds = self.class_level_st.get_var_count(
-                SymbolKind.FEILD
-            )
-
-            # write "push constant nFeilds"
+            # Allocate the fields, and make them this
             self.vm_writer.write_push(
                 SegmentType.CONST, 
-                nFeilds
-            )
-
-            self.vm_writer.write_call(
-                "Memory.alloc",
-                1
-            )
-
-            self.vm_writer.write_pop(
-                SegmentType.POINTER,
-                0
+                self.class_level_st.get_var_count(SymbolKind.FEILD)
             )
+            self.vm_writer.write_call("Memory.alloc", 1)
+            self.vm_writer.write_pop(SegmentType.POINTER, 0)
 
         elif self.sub_type == "method":
-            # push argument 0
-            self.vm_writer.write_push(
-                SegmentType.ARG,
-                0
-            )
-
-            # pop pointer 0
-            self.vm_writer.write_pop(
-                SegmentType.POINTER,
-                0
-            )
-
-        # Handle statements
-        self.compile_statements()
-
-        # Eat closing curly bracker
-        self.eat("}")
-        self.write_terminal_tag(TokenType.SYMBOL, "}")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # Write closing tag
-        self.out_stream.write("</subroutineBody>\n")
-
-    # 'var' type varName (',' varName)* ';'
-    def compile_var_dec(self):
-        # Write opening tag
-        self.out_stream.write("<varDec>\n")
-
-        # Write var keyword tag
-        self.write_terminal_tag(TokenType.KEYWORD, "var")
-
-        # For storing variable params
-        var_name = None
-        var_type = None
-        var_kind = SymbolKind.VAR
-        var_index = None
+            # push argument 0, pop pointer 0
+            self.vm_writer.write_push(SegmentType.ARG, 0)
+            self.vm_writer.write_pop(SegmentType.POINTER, 0)
 
-        # Move to next token
-        self.tokenizer.has_more_tokens()
+        self.compile_statements(node.statements)
 
-        # Write the type of variables
-        if self.is_valid_type():
-            var_type = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                self.tokenizer.get_token_type(), 
-                var_type)
-        else:
-            raise AssertionError("Not a valid var type!")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            var_name = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                TokenType.IDENTIFIER, 
-                var_name)
-        else:
-            raise AssertionError("Invalid Syntax for var name!")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        self.subroutine_level_st.define(
-            var_name, var_type, var_kind
-        )
-
-        var_index = self.subroutine_level_st.get_index_of(var_name)
-
-        # Write variable properties
-        self.out_stream.write(
-            f"\n===DECLARED===\nkind: {var_kind}, type: {var_type}, index: {var_index}\n=======")
-
-        while self.tokenizer.get_token_type() == TokenType.SYMBOL and self.tokenizer.get_symbol() == ",":
-            # Write this symbol
-            self.write_terminal_tag(TokenType.SYMBOL, ",")
+        # Subroutine done, write out its VM code
+        self.vm_writer.end_function()
 
-            # Move to the next token
-            self.tokenizer.has_more_tokens()
-
-            if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-                var_name = self.tokenizer.get_cur_ident()
-                self.write_terminal_tag(
-                    TokenType.IDENTIFIER, 
-                    var_name)
-            else:
-                raise AssertionError("Invalid Syntax for var name!")
-            
-            self.subroutine_level_st.define(var_name, var_type, var_kind)
-            var_index = self.subroutine_level_st.get_index_of(var_name)
-
-            # Write variable properties
-            self.out_stream.write(
-                f"\n===DECLARED===\nkind: {var_kind}, type: {var_type}, index: {var_index}\n=======")
-
-            # Move to the next token
-            self.tokenizer.has_more_tokens()
-
-        self.eat(";")
-        self.write_terminal_tag(TokenType.SYMBOL, ";")
-
-        # Move to the next token
-        self.tokenizer.has_more_tokens()
-        
-        # Write closing tag
-        self.out_stream.write("</varDec>\n")
-    
     # statement*
-    def compile_statements(self):
-        # Write open tag
-        self.out_stream.write("<statements>\n")
-        # Process statements
-        while self.tokenizer.get_token_type() == TokenType.KEYWORD and self.tokenizer.get_keyword_type() in statement_types:
-            # Statment type is based on the starting keyword
-            statement_type = self.tokenizer.get_keyword_type()
-
-            # Call compile method based on type
-            if statement_type == KeywordType.LET:
-                self.compile_let()
-            elif statement_type == KeywordType.IF:
-                self.compile_if()
-            elif statement_type == KeywordType.WHILE:
-                self.compile_while_statement()
-            elif statement_type == KeywordType.DO:
-                self.compile_do()
-            elif statement_type == KeywordType.RETURN:
-                self.compile_return()
-        
-        self.out_stream.write("</statements>\n")
+    def compile_statements(self, statements):
+        '''returns True if the statements never finish, as
+        after a return. With dead code elimination, the
+        statements after that are left out'''
+        for i, statement in enumerate(statements):
+            if self.statement_compilers[type(statement)](statement) \
+                and self.dead_code:
+                self.discard(statements[i + 1:])
+                return True
+        return False
+
+    def discard(self, statements):
+        '''compiles statements which can not run, only to
+        count and drop their VM code'''
+        code = self.vm_writer.function
+        start = len(code)
+        self.compile_statements(statements)
+        self.count_removed(code[start:])
+        del code[start:]
+
+    def count_removed(self, code):
+        '''adds the instructions of `code` to the dead
+        code removed from the current subroutine'''
+        count = sum(1 for i in code if i.op != Opcode.COMMENT)
+        if count:
+            name = f"{self.class_name}.{self.func_name}"
+            self.removed_code[name] = self.removed_code.get(name, 0) + count
     
     # 'let' varName ('[' expression ']')? '=' expression ';'
-    def compile_let(self):
-        self.out_stream.write("<letStatement>\n")
-
-        self.write_terminal_tag(TokenType.KEYWORD, "let")
-
-        # Is Array?
-        is_array_access = False
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            var_name = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                TokenType.IDENTIFIER, 
-                var_name)
-            
-            var_props = self.lookup_st(var_name)
-            # Write variable properties
-            self.out_stream.write(
-                f"\n===USED===\nkind: {var_props['kind']}, type: {var_props['type']}, index: {var_props['index']}\n=======")
-            
-            # Finding segment type
-            var_props["seg_type"] = self.var_t_to_segment_t(
-                                        var_props["kind"]
-                                    )
-            
-        else:
-            raise AssertionError("Invalid Syntax for varName!")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # Optional bracket syntax
-        if self.tokenizer.get_token_type() == TokenType.SYMBOL \
-        and self.tokenizer.get_symbol() == "[":
-            is_array_access = True
-
-            # push arr
-            self.vm_writer.write_push(
-                self.var_t_to_segment_t(var_props["kind"]),
-                var_props["index"]
-            )
-
-            self.write_terminal_tag(TokenType.SYMBOL, "[")
-
-            # Move to next token
-            self.tokenizer.has_more_tokens()
-            
-            # Compile the expression
-            self.compile_expression()
-
-            self.eat("]")
-            self.write_terminal_tag(TokenType.SYMBOL, "]")
-
-            # add
-            self.vm_writer.write_arithmetic(ArithmeticCType.ADD)
-
-            # Move to the next token
-            self.tokenizer.has_more_tokens()
-
-        # Eat assignment operator
-        self.eat("=")
-        self.write_terminal_tag(TokenType.SYMBOL, "=")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
+    def compile_let(self, node):
+        var_props = self.lookup_st(node.name)
+        if not var_props:
+            raise AssertionError(f"Undeclared variable: {node.name}")
+        seg_type = self.var_t_to_segment_t(var_props["kind"])
 
-        self.compile_expression()
+        if node.index is None:
+            self.compile_expression(node.value)
+            self.vm_writer.write_pop(seg_type, var_props["index"])
+            return
 
-        self.eat(";")
-        self.write_terminal_tag(TokenType.SYMBOL, ";")
+        # push arr, the index, add
+        self.vm_writer.write_push(seg_type, var_props["index"])
+        self.compile_expression(node.index)
+        self.vm_writer.write_arithmetic(ArithmeticCType.ADD)
 
-        # Move to next token
-        self.tokenizer.has_more_tokens()
+        self.compile_expression(node.value)
 
-        if not is_array_access:
-            self.vm_writer.write_pop(
-                    var_props["seg_type"], 
-                    var_props["index"])
-        else:
-            # pop temp 0
-            self.vm_writer.write_pop(
-                SegmentType.TEMP,
-                0
-            )
-
-            # pop pointer 1
-            self.vm_writer.write_pop(
-                SegmentType.POINTER,
-                1
-            )
-
-            # push temp 0
-            self.vm_writer.write_push(
-                SegmentType.TEMP,
-                0
-            )
-
-            # pop that 0
-            self.vm_writer.write_pop(
-                SegmentType.THAT,
-                0
-            )
-
-
-        self.out_stream.write("</letStatement>\n")
+        # pop temp 0, pop pointer 1, push temp 0, pop that 0
+        self.vm_writer.write_pop(SegmentType.TEMP, 0)
+        self.vm_writer.write_pop(SegmentType.POINTER, 1)
+        self.vm_writer.write_push(SegmentType.TEMP, 0)
+        self.vm_writer.write_pop(SegmentType.THAT, 0)
     
     # 'if' '(' expression ')' '{' statements '}' ('else' '{' statements '}')?
-    def compile_if(self):
-        self.out_stream.write("<ifStatement>\n")
+    def compile_if(self, node):
         self.vm_writer.write_comment("if statement")
 
-        self.write_terminal_tag(TokenType.KEYWORD, "if")
-
         # get the next labels
         L1, L2 = self.get_if_labels()
 
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        self.eat("(")
-        self.write_terminal_tag(TokenType.SYMBOL, "(")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
         # write code for the expression
-        self.compile_expression()
-
-        self.eat(")")
-        self.write_terminal_tag(TokenType.SYMBOL, ")")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # not, the condition inside if
-        self.vm_writer.write_arithmetic(ArithmeticCType.NOT)
-
-        self.vm_writer.write_if(L1)
-
-        self.eat("{")
-        self.write_terminal_tag(TokenType.SYMBOL, "{")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
+        code = self.vm_writer.function
+        start = len(code)
+        value = self.compile_expression(node.condition)
+        else_statements = node.else_statements or []
+
+        if self.dead_code and value is not None:
+            # Constant condition, only one block can run.
+            # Like if-goto, only -1 is true
+            self.count_removed(code[start:])
+            del code[start:]
+            if value == -1:
+                self.discard(else_statements)
+                return self.compile_statements(node.statements)
+            self.discard(node.statements)
+            return self.compile_statements(else_statements)
+
+        if self.branch:
+            # Jump to L1 if the condition is false
+            self.write_jump_if(start, False, L1)
+        else:
+            # not, the condition inside if
+            self.vm_writer.write_arithmetic(ArithmeticCType.NOT)
+            self.vm_writer.write_if(L1)
 
         # Compile if-block body
-        self.compile_statements()
-
-        self.vm_writer.write_goto(L2)
+        finished = self.compile_statements(node.statements)
 
+        if self.dead_code and finished:
+            # Never reached
+            self.count_removed([Instruction(Opcode.GOTO, L2)])
+        else:
+            self.vm_writer.write_goto(L2)
         self.vm_writer.write_label(L1)
 
-        self.eat("}")
-        self.write_terminal_tag(TokenType.SYMBOL, "}")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # If there is an else statement
-        # Handle else block
-        if self.tokenizer.get_token_type() == TokenType.KEYWORD \
-        and self.tokenizer.get_keyword_type() == KeywordType.ELSE:
-            self.write_terminal_tag(TokenType.KEYWORD, "else")
-            
-            # Move to next token
-            self.tokenizer.has_more_tokens()
-
-            self.eat("{")
-            self.write_terminal_tag(TokenType.SYMBOL, "{")
-
-            # Move to next token
-            self.tokenizer.has_more_tokens()
-
-            self.compile_statements()
-
-            self.eat("}")
-            self.write_terminal_tag(TokenType.SYMBOL, "}")
-
-            # Move to next token
-            self.tokenizer.has_more_tokens()
+        if node.else_statements is not None:
+            finished = self.compile_statements(node.else_statements) \
+                and finished
+        else:
+            finished = False
 
         self.vm_writer.write_label(L2)
-
-        # Write closing tag
-        self.out_stream.write("</ifStatement>\n")
+        return finished
     
     # 'while' '(' expression ')' '{' statements '}'
-    def compile_while_statement(self):
-        self.out_stream.write("<whileStatement>\n")
-
-        self.write_terminal_tag(TokenType.KEYWORD, "while")
+    def compile_while_statement(self, node):
         L1, L2 = self.get_while_labels()
+        code = self.vm_writer.function
+
+        if not self.branch:
+            self.vm_writer.write_label(L1)
+        start = len(code)
+        value = self.compile_expression(node.condition)
+
+        if self.dead_code and value is not None:
+            self.count_removed(code[start:])
+            del code[start:]
+            if value != -1:
+                # The body never runs
+                if not self.branch:
+                    code.pop()
+                self.discard(node.statements)
+                return False
 
-        self.vm_writer.write_label(L1)
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        self.eat("(")
-        self.write_terminal_tag(TokenType.SYMBOL, "(")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        self.compile_expression()
-
-        self.eat(")")
-        self.write_terminal_tag(TokenType.SYMBOL, ")")
-
-        self.vm_writer.write_arithmetic(ArithmeticCType.NOT)
-        self.vm_writer.write_if(L2)
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        self.eat("{")
-        self.write_terminal_tag(TokenType.SYMBOL, "{")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
+            # Loops for ever, only a return leaves it
+            if self.branch:
+                self.vm_writer.write_label(L1)
+            self.compile_statements(node.statements)
+            self.vm_writer.write_goto(L1)
+            return True
 
-        # Compile block body
-        self.compile_statements()
+        if not self.branch:
+            self.vm_writer.write_arithmetic(ArithmeticCType.NOT)
+            self.vm_writer.write_if(L2)
+            self.compile_statements(node.statements)
+            self.vm_writer.write_goto(L1)
+            self.vm_writer.write_label(L2)
+            return False
 
-        self.eat("}")
-        self.write_terminal_tag(TokenType.SYMBOL, "}")
+        # Test at the bottom: goto L1, label L2, body,
+        # label L1, jump to L2 if the condition is true
+        condition = code[start:]
+        del code[start:]
 
-        # Move to next token
-        self.tokenizer.has_more_tokens()
         self.vm_writer.write_goto(L1)
         self.vm_writer.write_label(L2)
-        # Write closing tag
-        self.out_stream.write("</whileStatement>\n")
-
-    # 'do' subroutineCall ';'
-    def compile_do(self):
-        # To store first and second parts of subroutine call
-        first_part, second_part = None, None
-        # To store nArgs passed to the subroutine
-        nArgs = 0
-
-        # Write opening tag
-        self.out_stream.write("<doStatement>\n")
-
-        # Write do keyword tag
-        self.write_terminal_tag(TokenType.KEYWORD, "do")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # Handle subroutineCall
-        if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            first_part = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                TokenType.IDENTIFIER, 
-                first_part
-            )
-        else:
-            raise AssertionError("Not a valid subroutine/class name!!!")
-        
-        var_props = self.lookup_st(first_part)
-
-        if var_props:
-            self.vm_writer.write_push(
-                self.var_t_to_segment_t(var_props["kind"]),
-                var_props["index"]
-            )
-            
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        # Is is a method call
-        if self.tokenizer.get_token_type() == TokenType.SYMBOL \
-            and self.tokenizer.get_symbol() == ".":
-            self.write_terminal_tag(TokenType.SYMBOL, ".")
-
-            # Move to next token
-            self.tokenizer.has_more_tokens()
-
-            # Handle subroutineCall
-            if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-                second_part = self.tokenizer.get_cur_ident()
-                self.write_terminal_tag(
-                    TokenType.IDENTIFIER, 
-                    second_part
-                )
-            else:
-                raise AssertionError(
-                    "Not a valid subroutine/class name!!!"
-                )
-
-            # Move to next token
-            self.tokenizer.has_more_tokens()
-
-        self.eat("(")
-        self.write_terminal_tag(TokenType.SYMBOL, "(")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        self.out_stream.write("<expressionList>\n")
-        if not (self.tokenizer.get_token_type() == TokenType.SYMBOL \
-            and self.tokenizer.get_symbol() == ")"):
-            nArgs = self.compile_expression_list()
-        self.out_stream.write("</expressionList>\n")
-
-        self.eat(")")
-        self.write_terminal_tag(TokenType.SYMBOL, ")")
+        self.compile_statements(node.statements)
+        self.vm_writer.write_label(L1)
 
-        # Move to next token
-        self.tokenizer.has_more_tokens()
+        start = len(code)
+        code += condition
+        self.write_jump_if(start, True, L2)
+        return False
 
-        self.eat(";")
-        self.write_terminal_tag(TokenType.SYMBOL, ";")
+    # 'do' subroutineCall ';'
+    def compile_do(self, node):
+        self.compile_expression(node.call)
 
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-        
-        if var_props:
-            if second_part:
-                self.vm_writer.write_call(
-                    f"{var_props['type']}.{second_part}",
-                    nArgs + 1
-                )
-        else:
-            # Write method call
-            if second_part:
-                # Of some other class
-                self.vm_writer.write_call(
-                    f"{first_part}.{second_part}",
-                    nArgs
-                )
-            else:
-                # Of this class
-                self.vm_writer.write_call(
-                    f"{self.class_name}.{first_part}",
-                    nArgs
-                )
-        
         # call-and-return contract
         self.vm_writer.write_pop(SegmentType.TEMP, 0)
-
-        # Write closing tag
-        self.out_stream.write("</doStatement>\n")
     
     # 'return' expression? ';'
-    def compile_return(self):
-        # Write opening tag
-        self.out_stream.write("<returnStatement>\n")
-
-        # Write do keyword tag
-        self.write_terminal_tag(TokenType.KEYWORD, "return")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
-
-        if self.tokenizer.get_token_type() == TokenType.SYMBOL \
-            and self.tokenizer.get_symbol() == ";":
-            self.write_terminal_tag(TokenType.SYMBOL, ";")
+    def compile_return(self, node):
+        if node.value is None:
             # the subroutine void return type
             self.vm_writer.write_push(SegmentType.CONST, 0)
         else:
-            self.compile_expression()
-            self.eat(";")
-            self.write_terminal_tag(TokenType.SYMBOL, ";")
-
-        # Move to next token
-        self.tokenizer.has_more_tokens()
+            self.compile_expression(node.value)
 
         # Write return command
         self.vm_writer.write_return()
-        # Write closing tag
-        self.out_stream.write("</returnStatement>\n")
+        return True
 
     # term (op term)*
-    def compile_expression(self):
-        self.out_stream.write("<expression>\n")
+    def compile_expression(self, node):
+        '''compiles an expression or a call. Returns the value
+        of the expression if it is a constant, else None. Terms
+        holding expressions compile as generators, which yield
+        those expressions and get back their values. They wait
+        on an explicit stack, so any nesting depth compiles'''
+        # Generators waiting for the value of a node
+        stack = []
+
+        while True:
+            # Compile leaves at once, start generators for the rest
+            while type(node) is ParenTerm:
+                node = node.expression
+            compile_leaf = self.leaf_compilers.get(type(node))
+            if compile_leaf is None:
+                stack.append(self.nested_compilers[type(node)](node))
+                value = None
+            else:
+                value = compile_leaf(node)
+
+            # Resume the innermost generator until it yields a node
+            while True:
+                if not stack:
+                    return value
+                try:
+                    node = stack[-1].send(value)
+                    break
+                except StopIteration as done:
+                    stack.pop()
+                    value = done.value
+
+    def expression_steps(self, node):
+        # Start of the expression's VM code
+        start = len(self.vm_writer.function)
 
         # Compile term
-        self.compile_term()
+        value = yield node.terms[0]
 
         # Handle (op term)*
-        while self.tokenizer.get_token_type() == TokenType.SYMBOL \
-            and self.tokenizer.get_symbol() in allowed_op:
-            symbol = self.tokenizer.get_symbol()
-            # Write tag for operation symbol
-            self.write_terminal_tag(
-                TokenType.SYMBOL, 
-                self.tokenizer.get_symbol())
-
-            # Move to next token 
-            self.tokenizer.has_more_tokens()
+        for symbol, term in zip(node.ops, node.terms[1:]):
+            op = allowed_op[symbol]
 
             # Compile term
-            self.compile_term()
+            right_start = len(self.vm_writer.function)
+            right = yield term
+
+            # Both sides constant, replace their code with the result
+            if self.fold and value is not None and right is not None:
+                result = constant_ops[op](value, right)
+                if result is not None:
+                    value = to_word(result)
+                    self.write_constant(value, start)
+                    continue
+
+            # One side constant, multiply or divide inline
+            if self.strength and op in strength_ops \
+                and self.reduce_strength(
+                    op, start, right_start, value, right
+                ):
+                value = None
+                continue
 
             # Apply operation
-            self.vm_writer.write_arithmetic(
-                allowed_op[symbol]
-            )
-        
-        # Write closing tag
-        self.out_stream.write("</expression>\n")
-
-    # integerConstant | stringConstant | keywordConstant | varName | 
-    # varName '[' expression ']' | subroutineCall | '(' expression ')' 
-    # | unaryOp term
-    def compile_term(self):
-        self.out_stream.write("<term>\n")
+            self.vm_writer.write_arithmetic(op)
+            value = None
         
-        if self.tokenizer.get_token_type() == TokenType.INT_CONST:
-            self.write_terminal_tag(
-                TokenType.INT_CONST, 
-                self.tokenizer.get_int_val()
-            )
-            self.vm_writer.write_push(
-                SegmentType.CONST, 
-                self.tokenizer.get_int_val()
-            )
-            self.tokenizer.has_more_tokens()
-        
-        elif self.tokenizer.get_token_type() == TokenType.STRING_CONST:
-            self.write_terminal_tag(
-                TokenType.STRING_CONST, 
-                self.tokenizer.get_string_val()
-            )
-            self.tokenizer.has_more_tokens()
-        
-        elif self.tokenizer.get_token_type() == TokenType.KEYWORD \
-            and self.tokenizer.get_keyword_type() in keyword_constants:
-            # keyword constant
-            kc = self.tokenizer.get_cur_ident()
-            self.write_terminal_tag(
-                TokenType.KEYWORD, 
-                kc
-            )
-
-            if kc == "null" or kc == "false":
-                # push const 0
-                self.vm_writer.write_push(SegmentType.CONST, 0)
-            
-            elif kc == "true":
-                # push const -1
-                self.vm_writer.write_push(SegmentType.CONST, 1)
-                self.vm_writer.write_arithmetic(ArithmeticCType.NEG)
-
-            elif kc == "this":
-                # push pointer 0
-                self.vm_writer.write_push(
-                    SegmentType.POINTER,
-                    0
+        return value
+
+    def reduce_strength(self, op, start, right_start, left, right):
+        '''replaces a multiplication or division with a
+        constant operand by cheaper code. Returns False if
+        the Math call is the cheapest way'''
+        code = self.vm_writer.function
+
+        if right is not None:
+            factor = right
+            constant = slice(right_start, len(code))
+        elif left is not None and op == ArithmeticCType.MULT:
+            factor = left
+            constant = slice(start, right_start)
+        else:
+            return False
+
+        if op == ArithmeticCType.DIV and factor not in (1, -1):
+            # No shifts in the VM, so only x / 1 and x / -1
+            return False
+
+        # Code of the other operand, without the constant
+        operand = code[start:constant.start] + code[constant.stop:]
+
+        if factor == 0:
+            if not is_pure_code(operand):
+                # Keep the calls and divisions, drop their result
+                replacement = operand + [
+                    Instruction(Opcode.POP, SegmentType.TEMP, 1),
+                    Instruction(Opcode.PUSH, SegmentType.CONST, 0)
+                ]
+            else:
+                replacement = [Instruction(Opcode.PUSH, SegmentType.CONST, 0)]
+        elif factor in (1, -1):
+            replacement = operand
+            if factor == -1:
+                replacement.append(
+                    Instruction(Opcode.ARITHMETIC, ArithmeticCType.NEG)
                 )
+        elif len(operand) == 1 and operand[0].op == Opcode.PUSH:
+            # A single push can be repeated instead of kept in temp 1
+            replacement = multiply_code(factor, operand[0])
+        else:
+            replacement = operand + multiply_code(factor)
 
-            self.tokenizer.has_more_tokens()
-        
-        elif self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            first_part, second_part = None, None
-            nArgs = 0
-            var_name = self.tokenizer.get_cur_ident()
-            first_part = var_name
-            var_props = self.lookup_st(var_name)
-
-            self.write_terminal_tag(
-                TokenType.IDENTIFIER, 
-                var_name)
-
-            if var_props:
-                self.vm_writer.write_push(
-                    self.var_t_to_segment_t(var_props["kind"]),
-                    var_props["index"]
-                )
+        if len(replacement) - len(operand) > MAX_MULTIPLY_CODE:
+            return False
 
-            # Move to next token
-            self.tokenizer.has_more_tokens()
-
-            if self.tokenizer.get_token_type() == TokenType.SYMBOL:
-                # Handle varName '[' expression ']'
-                if self.tokenizer.get_symbol() == "[":
-                    self.eat("[")
-                    self.write_terminal_tag(TokenType.SYMBOL, "[")
-                    self.tokenizer.has_more_tokens()
-
-                    self.compile_expression()
-
-                    self.eat(']')
-                    self.write_terminal_tag(TokenType.SYMBOL, "]")
-
-                    # add
-                    self.vm_writer.write_arithmetic(ArithmeticCType.ADD)
-                    
-                    # pop pointer 1
-                    self.vm_writer.write_pop(
-                        SegmentType.POINTER,
-                        1
-                    )
-
-                    # push that 0
-                    self.vm_writer.write_push(
-                        SegmentType.THAT, 
-                        0
-                    )
-
-                    # Move to next token
-                    self.tokenizer.has_more_tokens()
-
-                # Handle subroutineCall
-                elif self.tokenizer.get_symbol() == "(" \
-                    or self.tokenizer.get_symbol() == ".":
-                    # Is a method call
-                    if self.tokenizer.get_symbol() == ".":
-                        self.write_terminal_tag(TokenType.SYMBOL, ".")
-                        # Move to next token
-                        self.tokenizer.has_more_tokens()
-
-                        # Handle subroutineCall
-                        if self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-                            second_part = self.tokenizer.get_cur_ident()
-                            self.write_terminal_tag(
-                                TokenType.IDENTIFIER, 
-                                second_part
-                            )
-                        else:
-                            raise AssertionError(
-                                "Not a valid subroutine/class name!!!"
-                            )
-                        
-                        # Move to next token
-                        self.tokenizer.has_more_tokens()
-                    
-                    self.eat("(")
-                    self.write_terminal_tag(TokenType.SYMBOL, "(")
-
-                    # Move to next token
-                    self.tokenizer.has_more_tokens()
-                    self.out_stream.write("<expressionList>\n")
-                    if not (self.tokenizer.get_token_type() == TokenType.SYMBOL \
-                        and self.tokenizer.get_symbol() == ")"):
-                        nArgs = self.compile_expression_list()
-                    self.out_stream.write("</expressionList>\n")
-
-                    self.eat(")")
-                    self.write_terminal_tag(TokenType.SYMBOL, ")")
-
-                    # Move to next token
-                    self.tokenizer.has_more_tokens()
-
-            if var_props:
-                print("Looked up: ", var_name)
-                # Is it a method call?
-                if second_part:
-                    # Of some other class
-                    self.vm_writer.write_call(
-                        f"{var_props['type']}.{second_part}",
-                        nArgs + 1
-                    )
-            # This is no variable with given name        
-            else:
-                if second_part:
-                    # Of some other class
-                    self.vm_writer.write_call(
-                    f"{first_part}.{second_part}",
-                    nArgs
-                    )
-                else:
-                    # Of this class
-                    self.vm_writer.write_call(
-                    f"{self.class_name}.{first_part}",
-                    nArgs
-                    )  
-        
-        elif self.tokenizer.get_token_type() == TokenType.SYMBOL:
-            # Handle '(' expression ')'
-            if self.tokenizer.get_symbol() == '(':
-                self.eat("(")
-                self.write_terminal_tag(TokenType.SYMBOL, "(")
-                self.tokenizer.has_more_tokens()
-
-                self.compile_expression()
-
-                self.eat(")")
-                self.write_terminal_tag(TokenType.SYMBOL, ")")
-                self.tokenizer.has_more_tokens()
-            # Handle unaryOp term
-            elif self.tokenizer.get_symbol() in allowed_unary_op:
-                unary_op = self.tokenizer.get_symbol()
-                self.write_terminal_tag(
-                    TokenType.SYMBOL, 
-                    self.tokenizer.get_symbol()
-                )
+        code[start:] = replacement
+        return True
 
-                self.tokenizer.has_more_tokens()
-                self.compile_term()
+    def write_constant(self, value, start):
+        '''replaces the VM code from `start` on with a
+        push of the 16-bit constant `value`'''
+        del self.vm_writer.function[start:]
 
-                self.vm_writer.write_arithmetic(
-                    allowed_unary_op[unary_op]
-                )
-            else:
-                raise AssertionError("( or unary Op expected!!")
+        if value >= 0:
+            self.vm_writer.write_push(SegmentType.CONST, value)
+        elif value > -0x8000:
+            self.vm_writer.write_push(SegmentType.CONST, -value)
+            self.vm_writer.write_arithmetic(ArithmeticCType.NEG)
+        else:
+            # 32768 is no valid constant, use ~32767
+            self.vm_writer.write_push(SegmentType.CONST, 0x7FFF)
+            self.vm_writer.write_arithmetic(ArithmeticCType.NOT)
+
+    def compile_integer_constant(self, node):
+        self.vm_writer.write_push(SegmentType.CONST, node.value)
+        return node.value
+
+    def compile_string_constant(self, node):
+        if not self.pool_strings:
+            self.write_string(node.value)
+            return None
+
+        # Pooled strings follow the declared statics
+        index = self.string_pool.setdefault(
+            node.value,
+            self.class_level_st.get_var_count(SymbolKind.STATIC)
+                + len(self.string_pool)
+        )
 
-        self.out_stream.write("</term>\n")
+        # Build the string if the static is still 0
+        label = self.get_string_label()
+        self.vm_writer.write_push(SegmentType.STATIC, index)
+        self.vm_writer.write_if(label)
+        self.write_string(node.value)
+        self.vm_writer.write_pop(SegmentType.STATIC, index)
+        self.vm_writer.write_label(label)
+        self.vm_writer.write_push(SegmentType.STATIC, index)
+        return None
+
+    def write_string(self, text):
+        '''writes code building a new String of `text`'''
+        self.vm_writer.write_push(SegmentType.CONST, len(text))
+        self.vm_writer.write_call("String.new", 1)
+        for char in text:
+            self.vm_writer.write_push(SegmentType.CONST, ord(char))
+            self.vm_writer.write_call("String.appendChar", 2)
+
+    def compile_keyword_constant(self, node):
+        if node.keyword == "null" or node.keyword == "false":
+            # push const 0
+            self.vm_writer.write_push(SegmentType.CONST, 0)
+            return 0
 
-    # expression (',' expression)*
-    def compile_expression_list(self):
-        self.compile_expression()
-        arg_count = 1
+        if node.keyword == "true":
+            # push const -1
+            self.vm_writer.write_push(SegmentType.CONST, 1)
+            self.vm_writer.write_arithmetic(ArithmeticCType.NEG)
+            return -1
 
-        while (self.tokenizer.get_token_type() == TokenType.SYMBOL) \
-            and (self.tokenizer.get_symbol() == ","):
-            self.write_terminal_tag(TokenType.SYMBOL, ",")
-            self.tokenizer.has_more_tokens()
-            self.compile_expression()
-            arg_count += 1
+        # this, push pointer 0
+        self.vm_writer.write_push(SegmentType.POINTER, 0)
+        return None
 
-        return arg_count
+    def compile_var_term(self, node):
+        var_props = self.lookup_st(node.name)
+        if var_props:
+            self.vm_writer.write_push(
+                self.var_t_to_segment_t(var_props["kind"]),
+                var_props["index"]
+            )
+        else:
+            # No variable with given name, a call of this class
+            self.vm_writer.write_call(f"{self.class_name}.{node.name}", 0)
+        return None
 
-    # eat the given string, else raise error
-    def eat(self, string):
-        if self.tokenizer.get_token_type() == TokenType.SYMBOL:
-            if not (self.tokenizer.get_symbol() == string):
-                raise AssertionError(f"Expected symbol {string}, found: {self.tokenizer.get_symbol()}")
+    # varName '[' expression ']'
+    def array_steps(self, node):
+        var_props = self.lookup_st(node.name)
+        if var_props:
+            self.vm_writer.write_push(
+                self.var_t_to_segment_t(var_props["kind"]),
+                var_props["index"]
+            )
+
+        # index, add, pop pointer 1, push that 0
+        yield node.index
+        self.vm_writer.write_arithmetic(ArithmeticCType.ADD)
+        self.vm_writer.write_pop(SegmentType.POINTER, 1)
+        self.vm_writer.write_push(SegmentType.THAT, 0)
+
+        if not var_props:
+            self.vm_writer.write_call(f"{self.class_name}.{node.name}", 0)
+        return None
+
+    # unaryOp term
+    def unary_steps(self, node):
+        op = allowed_unary_op[node.op]
+        start = len(self.vm_writer.function)
+        operand = yield node.term
+
+        value = None
+        if operand is not None:
+            value = to_word(constant_unary_ops[op](operand))
+
+        if self.fold and value is not None:
+            # Replace the operand's code with the result
+            self.write_constant(value, start)
         else:
-            raise AssertionError("Symbol not found!!")
-
-    # Utility method to check weather 
-    # the current token is a valid data type 
-    def is_valid_type(self):
-        # If built-in data type
-        if self.tokenizer.get_token_type() == TokenType.KEYWORD:
-            # if int, char, boolean
-            if self.tokenizer.get_keyword_type() in data_types:
-                return True
-        
-        # If custom data type
-        elif self.tokenizer.get_token_type() == TokenType.IDENTIFIER:
-            return True
+            self.vm_writer.write_arithmetic(op)
+        return value
 
-         # Invalid data type        
-        return False
+    # subroutineName '(' expressionList ')' |
+    # (className | varName) '.' subroutineName '(' expressionList ')'
+    def call_steps(self, node):
+        first_part, second_part = node.name, None
+        if node.receiver is not None:
+            first_part, second_part = node.receiver, node.name
+
+        var_props = self.lookup_st(first_part)
+        if var_props:
+            # push the object
+            self.vm_writer.write_push(
+                self.var_t_to_segment_t(var_props["kind"]),
+                var_props["index"]
+            )
+
+        # expression (',' expression)*
+        for arg in node.args:
+            yield arg
+        nArgs = len(node.args)
+
+        if var_props:
+            # Is it a method call?
+            if second_part:
+                self.vm_writer.write_call(
+                    f"{var_props['type']}.{second_part}",
+                    nArgs + 1
+                )
+        elif second_part:
+            # Of some other class
+            self.vm_writer.write_call(f"{first_part}.{second_part}", nArgs)
+        else:
+            # Of this class
+            self.vm_writer.write_call(f"{self.class_name}.{first_part}", nArgs)
+        return None
 
     # Lookup variable in symbol table
     def lookup_st(self, v_name):
         '''return variable properties'''
-        # FOR DEBUGGING
-        from pprint import pprint
-        pprint(self.subroutine_level_st.hash_map)
-        pprint(self.class_level_st.hash_map)
-
         # To store looked up props
         v_props = {}
 
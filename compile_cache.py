@@ -0,0 +1,228 @@
+# For content hashing
+import hashlib
+
+# For atomic writes and timestamps
+import os
+import struct
+import zlib
+from pathlib import Path
+from time import time
+
+from token_table import TokenTable, table_from_bytes
+from version import COMPILER_VERSION
+
+# Binary outputs format: magic, vm size, xml size
+outputs_header = struct.Struct("<4sII")
+OUTPUTS_MAGIC = b"JTO1"
+
+# Default size bound of a cache directory
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Default entry bound of an in-memory cache
+DEFAULT_MAX_ENTRIES = 4096
+
+class CompileCache:
+    '''On-disk cache of token tables and compiled outputs,
+    keyed by a hash of the source and the compiler version.
+    Least recently used entries are evicted past `max_bytes`'''
+    def __init__(self, cache_dir: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        # Lookup statistics per kind of entry
+        self.hits = {"tokens": 0, "outputs": 0}
+        self.misses = {"tokens": 0, "outputs": 0}
+
+        # Entry name -> (last use, size)
+        self.entries = {}
+        for entry in self.cache_dir.iterdir():
+            if entry.suffix in (".tokens", ".outputs"):
+                stat = entry.stat()
+                self.entries[entry.name] = (stat.st_mtime, stat.st_size)
+        self.total_bytes = sum(size for _, size in self.entries.values())
+
+        # The bound may be lower than on the last run
+        self.evict()
+
+    def key(self, source: bytes, options: str = "") -> str:
+        '''returns the cache key of a source compiled with `options`'''
+        digest = hashlib.sha256()
+        digest.update(COMPILER_VERSION.encode())
+        digest.update(b"\0")
+        digest.update(options.encode())
+        digest.update(b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def load(self, name: str) -> bytes:
+        '''returns the payload of an entry, None on a miss'''
+        path = self.cache_dir / name
+        kind = path.suffix[1:]
+        try:
+            raw = path.read_bytes()
+            data = zlib.decompress(raw)
+        except (OSError, zlib.error):
+            self.misses[kind] += 1
+            return None
+
+        # Mark as most recently used, the file
+        # time keeps the order across runs
+        os.utime(path)
+        if name not in self.entries:
+            self.total_bytes += len(raw)
+        self.entries[name] = (time(), len(raw))
+
+        self.hits[kind] += 1
+        return data
+
+    def store(self, name: str, data: bytes) -> None:
+        '''writes an entry, evicting old ones past the size bound'''
+        data = zlib.compress(data)
+        path = self.cache_dir / name
+
+        # Write to a temporary file first, so readers
+        # never see a partially written entry
+        temp = path.with_name(f"{name}.{os.getpid()}.tmp")
+        temp.write_bytes(data)
+        os.replace(temp, path)
+
+        if name in self.entries:
+            self.total_bytes -= self.entries[name][1]
+        self.entries[name] = (time(), len(data))
+        self.total_bytes += len(data)
+        self.evict()
+
+    def evict(self) -> None:
+        '''removes least recently used entries past the size bound'''
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        for name in sorted(self.entries, key=lambda n: self.entries[n][0]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.total_bytes -= self.entries.pop(name)[1]
+            try:
+                (self.cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def discard(self, name: str) -> None:
+        '''removes an entry which can not be read, counting
+        its lookup as a miss'''
+        kind = name.rsplit(".", 1)[1]
+        self.hits[kind] -= 1
+        self.misses[kind] += 1
+        if name in self.entries:
+            self.total_bytes -= self.entries.pop(name)[1]
+        try:
+            (self.cache_dir / name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def summary(self) -> str:
+        '''returns the hit and miss counts as text'''
+        return ", ".join(
+            f"{kind}: {self.hits[kind]} hits, {self.misses[kind]} misses"
+            for kind in self.hits
+        )
+
+    def load_tokens(self, key: str, source: str,
+        source_name: str = "<string>") -> TokenTable:
+        '''returns the cached token table of a source, None on a miss'''
+        data = self.load(f"{key}.tokens")
+        if data is None:
+            return None
+        try:
+            return table_from_bytes(data, source, source_name)
+        except (ValueError, struct.error):
+            # Truncated, or not a token table
+            self.discard(f"{key}.tokens")
+            return None
+
+    def store_tokens(self, key: str, table: TokenTable) -> None:
+        '''caches the token table of a source'''
+        self.store(f"{key}.tokens", table.to_bytes())
+
+    def load_outputs(self, key: str) -> tuple:
+        '''returns the cached (vm, xml) outputs, None on a miss'''
+        data = self.load(f"{key}.outputs")
+        if data is None:
+            return None
+
+        try:
+            magic, vm_size, xml_size = outputs_header.unpack_from(data)
+        except struct.error:
+            magic = None
+        if magic != OUTPUTS_MAGIC or len(data) \
+            != outputs_header.size + vm_size + xml_size:
+            # Truncated, or not outputs
+            self.discard(f"{key}.outputs")
+            return None
+
+        pos = outputs_header.size
+        vm = data[pos:pos + vm_size]
+        xml = data[pos + vm_size:pos + vm_size + xml_size]
+        return (vm, xml)
+
+    def store_outputs(self, key: str, vm: bytes, xml: bytes) -> None:
+        '''caches the compiled outputs of a source'''
+        self.store(
+            f"{key}.outputs",
+            outputs_header.pack(OUTPUTS_MAGIC, len(vm), len(xml)) + vm + xml
+        )
+
+class MemoryCache:
+    '''In-memory cache with the CompileCache API, for a
+    process which compiles many times. Least recently
+    used entries are evicted past `max_entries`'''
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+
+        # Lookup statistics per kind of entry
+        self.hits = {"tokens": 0, "outputs": 0}
+        self.misses = {"tokens": 0, "outputs": 0}
+
+        # Entry name -> token table or outputs,
+        # least recently used first
+        self.entries = {}
+
+    key = CompileCache.key
+    summary = CompileCache.summary
+
+    def load(self, name: str, kind: str):
+        '''returns an entry, None on a miss'''
+        entry = self.entries.pop(name, None)
+        if entry is None:
+            self.misses[kind] += 1
+            return None
+
+        # Mark as most recently used
+        self.entries[name] = entry
+        self.hits[kind] += 1
+        return entry
+
+    def store(self, name: str, entry) -> None:
+        '''adds an entry, evicting the oldest past the bound'''
+        self.entries.pop(name, None)
+        self.entries[name] = entry
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+
+    def load_tokens(self, key: str, source: str,
+        source_name: str = "<string>") -> TokenTable:
+        '''returns the cached token table of a source, None on a miss'''
+        return self.load(f"{key}.tokens", "tokens")
+
+    def store_tokens(self, key: str, table: TokenTable) -> None:
+        '''caches the token table of a source'''
+        self.store(f"{key}.tokens", table)
+
+    def load_outputs(self, key: str) -> tuple:
+        '''returns the cached (vm, xml) outputs, None on a miss'''
+        return self.load(f"{key}.outputs", "outputs")
+
+    def store_outputs(self, key: str, vm: bytes, xml: bytes) -> None:
+        '''caches the compiled outputs of a source'''
+        self.store(f"{key}.outputs", (vm, xml))
@@ -0,0 +1,27 @@
+import tempfile
+import zlib
+from pathlib import Path
+
+from compile_cache import CompileCache
+from token_table import tokenize_source
+
+source = "class A { function void f() { return; } }"
+
+with tempfile.TemporaryDirectory() as tmp:
+    cache = CompileCache(Path(tmp))
+    key = cache.key(source.encode())
+    cache.store_tokens(key, tokenize_source(source))
+    assert len(cache.load_tokens(key, source)) == 13
+
+    # Corrupt entries are misses, and are removed
+    cache.store(f"{key}.tokens", b"JTT0" + bytes(12))
+    assert cache.load_tokens(key, source) is None
+    assert not (Path(tmp) / f"{key}.tokens").exists()
+
+    (Path(tmp) / f"{key}.outputs").write_bytes(zlib.compress(b"JTO1"))
+    assert cache.load_outputs(key) is None
+    assert cache.hits == {"tokens": 1, "outputs": 0}
+    assert cache.misses == {"tokens": 1, "outputs": 1}
+    assert cache.entries == {} and cache.total_bytes == 0
+
+print("All assertions are True!")
@@ -0,0 +1,200 @@
+# Long-lived compiler process answering JSON-lines compile
+# requests on stdin or a Unix socket, with warm caches
+# Usage: python3 compile_server.py [--socket PATH]
+import io
+import json
+import socketserver
+import sys
+from argparse import ArgumentParser, Namespace
+from pathlib import Path
+from time import perf_counter
+
+from compilation_engine import emit_modes, optimization_names
+from compile_cache import MemoryCache, DEFAULT_MAX_ENTRIES
+from jack_compiler import compile_source
+from SyntaxAnalyzer import compile_file, describe_error
+
+# Type of each field of a compile request
+field_types = {
+    "path": str,
+    "source": str,
+    "name": str,
+    "emit": str,
+    "optimize": str,
+    "readable_vm": bool
+}
+
+def compile_options(request: dict) -> tuple:
+    '''returns the compile_file arguments and optimizations
+    a request asks for. Raises ValueError for fields of
+    the wrong type or value'''
+    for field, field_type in field_types.items():
+        value = request.get(field)
+        if value is not None and not isinstance(value, field_type):
+            raise ValueError(f"{field} must be a {field_type.__name__}")
+
+    emit = request.get("emit", "vm")
+    if emit not in emit_modes:
+        raise ValueError(f"unknown emit mode: {emit}")
+
+    optimize = request.get("optimize", "")
+    if optimize == "all":
+        optimizations = frozenset(optimization_names)
+    else:
+        optimizations = frozenset(filter(None, optimize.split(",")))
+        for name in optimizations - optimization_names:
+            raise ValueError(f"unknown optimization: {name}")
+
+    args = Namespace(
+        emit=emit, readable_vm=request.get("readable_vm", False),
+        scanner="table"
+    )
+    return args, optimizations
+
+class CompileServer:
+    '''Answers compile requests, one JSON object per line.
+    A request names a .jack file or directory in "path", or
+    holds the code of one class in "source". Token tables
+    and outputs of sources seen before are reused'''
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.cache = MemoryCache(max_entries)
+
+        # False after a shutdown request
+        self.running = True
+
+    def handle(self, line: str) -> dict:
+        '''returns the reply to one request line'''
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("not an object")
+        except ValueError as error:
+            return {"id": None, "ok": False, "error": f"bad request: {error}"}
+
+        reply = {"id": request.get("id")}
+        op = request.get("op", "compile")
+        if op == "shutdown":
+            self.running = False
+            reply["ok"] = True
+            return reply
+        if op == "stats":
+            reply.update(ok=True, cache=self.cache.summary())
+            return reply
+        if op != "compile":
+            reply.update(ok=False, error=f"unknown op: {op}")
+            return reply
+
+        start = perf_counter()
+        try:
+            args, optimizations = compile_options(request)
+        except ValueError as error:
+            reply.update(ok=False, error=str(error))
+            return reply
+
+        if "source" in request:
+            reply.update(self.compile_source(
+                request["source"], request.get("name"),
+                args, optimizations
+            ))
+        elif "path" in request:
+            reply.update(self.compile_path(
+                Path(request["path"]), args, optimizations
+            ))
+        else:
+            reply.update(ok=False, error="needs a path or a source")
+        reply["seconds"] = perf_counter() - start
+        return reply
+
+    def compile_path(self, in_path, args, optimizations) -> dict:
+        '''compiles a .jack file or the .jack files of a
+        directory, next to their sources'''
+        if in_path.is_dir():
+            paths = sorted(in_path.glob("*.jack"))
+        elif in_path.is_file():
+            paths = [in_path]
+        else:
+            return {"ok": False, "error": f"no such file: {in_path}"}
+
+        files = []
+        for path in paths:
+            try:
+                compile_file(path, args, optimizations, self.cache)
+                files.append({"path": str(path), "ok": True})
+            except Exception as error:
+                files.append({
+                    "path": str(path), "ok": False,
+                    "error": describe_error(error)
+                })
+        return {"ok": all(file["ok"] for file in files), "files": files}
+
+    def compile_source(self, source, name, args, optimizations) -> dict:
+        '''compiles the code of class `name`, returning its outputs'''
+        try:
+            result = compile_source(
+                source, name, args.emit, optimizations,
+                args.readable_vm, self.cache
+            )
+        except Exception as error:
+            return {"ok": False, "error": describe_error(error)}
+
+        reply = {"ok": True}
+        if args.emit != "xml":
+            reply["vm"] = result.vm
+        if result.xml is not None:
+            reply["xml"] = result.xml
+        return reply
+
+    def serve_stream(self, in_stream, out_stream) -> None:
+        '''answers the request lines of `in_stream` until
+        its end or a shutdown request'''
+        for line in in_stream:
+            if not line.strip():
+                continue
+            out_stream.write(json.dumps(self.handle(line)) + "\n")
+            out_stream.flush()
+            if not self.running:
+                break
+
+    def serve_socket(self, socket_path: Path) -> None:
+        '''answers the connections to a Unix socket, one at
+        a time, until a shutdown request'''
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                in_stream = io.TextIOWrapper(self.rfile, encoding="utf-8")
+                out_stream = io.TextIOWrapper(self.wfile, encoding="utf-8")
+                server.serve_stream(in_stream, out_stream)
+                # The socket files are closed by the handler
+                in_stream.detach()
+                out_stream.detach()
+
+        # A socket left by a server which did not shut down
+        socket_path.unlink(missing_ok=True)
+        with socketserver.UnixStreamServer(str(socket_path), Handler) as unix:
+            try:
+                while self.running:
+                    unix.handle_request()
+            finally:
+                socket_path.unlink(missing_ok=True)
+
+def main():
+    parser = ArgumentParser(description="Answers JSON-lines compile requests")
+    parser.add_argument(
+        "--socket", type=Path, metavar="PATH",
+        help="listen on this Unix socket instead of stdin and stdout"
+    )
+    parser.add_argument(
+        "--cache-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+        help="cached token tables and outputs kept (default: %(default)s)"
+    )
+    args = parser.parse_args()
+
+    server = CompileServer(args.cache_entries)
+    if args.socket is None:
+        server.serve_stream(sys.stdin, sys.stdout)
+    else:
+        server.serve_socket(args.socket)
+
+if __name__ == "__main__":
+    main()
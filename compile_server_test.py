@@ -0,0 +1,56 @@
+import io
+import json
+
+from compile_server import CompileServer
+
+requests = [
+    {"id": 1, "source": "class A { function int f() { return 2 * 3; } }",
+     "name": "A", "optimize": "fold"},
+    {"id": 2, "source": "class A { function int f() { return 2 * 3; } }",
+     "name": "A", "optimize": "fold", "emit": "both"},
+    {"id": 3, "source": "class A { function int f() { return 1 + ; } }",
+     "name": "A"},
+    {"id": 4, "source": "class A {}", "optimize": "fast"},
+    {"id": 5, "op": "stats"},
+    {"id": 6, "op": "shutdown"},
+    {"id": 7, "op": "stats"}
+]
+out_stream = io.StringIO()
+CompileServer().serve_stream(
+    io.StringIO("".join(json.dumps(r) + "\n\n" for r in requests)), out_stream
+)
+replies = [json.loads(line) for line in out_stream.getvalue().splitlines()]
+
+# One reply per request, up to the shutdown
+assert [reply["id"] for reply in replies] == [1, 2, 3, 4, 5, 6]
+assert replies[0]["vm"] == "function A.f 0\npush constant 6\nreturn\n"
+assert replies[1]["vm"] == replies[0]["vm"]
+assert replies[1]["xml"].startswith("<class>")
+assert not replies[2]["ok"] and replies[2]["error"]
+assert replies[3] == {"id": 4, "ok": False, "error": "unknown optimization: fast"}
+
+# The second request reuses the tokens of the first
+assert replies[4]["cache"].startswith("tokens: 1 hits")
+
+# Fields of the wrong type are answered, and serving goes on
+malformed = [
+    {"id": 1, "source": "class A {}", "optimize": 5},
+    {"id": 2, "source": "class A {}", "emit": ["vm"]},
+    {"id": 3, "path": 3},
+    {"id": 4, "source": ["class A {}"]},
+    {"id": 5, "source": "class A {}", "name": "A"}
+]
+out_stream = io.StringIO()
+server = CompileServer()
+server.serve_stream(
+    io.StringIO("".join(json.dumps(r) + "\n" for r in malformed)), out_stream
+)
+replies = [json.loads(line) for line in out_stream.getvalue().splitlines()]
+assert [reply["id"] for reply in replies] == [1, 2, 3, 4, 5]
+assert replies[0] == {"id": 1, "ok": False, "error": "optimize must be a str"}
+assert replies[1] == {"id": 2, "ok": False, "error": "emit must be a str"}
+assert replies[2] == {"id": 3, "ok": False, "error": "path must be a str"}
+assert replies[3] == {"id": 4, "ok": False, "error": "source must be a str"}
+assert replies[4]["ok"] and server.running
+
+print("All assertions are True!")
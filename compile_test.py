@@ -0,0 +1,167 @@
+import tempfile
+from pathlib import Path
+
+from compilation_engine import CompilationEngine, to_word
+from token_table import TokenCursor, tokenize_source
+from vm_emulator import VMEmulator
+
+def compile_vm(source, optimizations=frozenset()):
+    '''compiles a class and returns its VM code lines'''
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = Path(tmp) / "Main.xml"
+        engine = CompilationEngine(
+            TokenCursor(tokenize_source(source)), out_path, "vm",
+            optimizations=optimizations
+        )
+        engine.start_compilation()
+        engine.close()
+        return out_path.with_suffix(".vm").read_text().splitlines()
+
+def compile_let(expression, optimizations=frozenset({"fold"})):
+    '''returns the VM code of `let a = expression;`'''
+    lines = compile_vm(
+        "class Main { function void f(int x) { var int a; "
+        f"let a = {expression}; return; }} }}",
+        optimizations
+    )
+    return lines[1:lines.index("pop local 0")]
+
+# 16-bit two's complement wrap around
+assert to_word(32767 + 1) == -32768
+assert to_word(200 * 200) == -25536
+assert to_word(-32768 - 1) == 32767
+
+# Constant folding
+assert compile_let("8 * 32") == ["push constant 256"]
+assert compile_let("8 * 32", frozenset()) == [
+    "push constant 8", "push constant 32", "call Math.multiply 2"
+]
+assert compile_let("2 - 5") == ["push constant 3", "neg"]
+assert compile_let("-(1 + 2) & ~0") == ["push constant 3", "neg"]
+assert compile_let("16383 + 16384 + 1") == ["push constant 32767", "not"]
+assert compile_let("-7 / 2") == ["push constant 3", "neg"]
+assert compile_let("(1 < 2) | (3 = 4)") == ["push constant 1", "neg"]
+assert compile_let("~true") == ["push constant 0"]
+
+# Only constant operands fold, division by zero is left alone
+assert compile_let("x * (2 + 3)") == [
+    "push argument 0", "push constant 5", "call Math.multiply 2"
+]
+assert compile_let("7 / 0") == [
+    "push constant 7", "push constant 0", "call Math.divide 2"
+]
+
+# Strength reduction
+strength = frozenset({"strength"})
+assert compile_let("x * 1", strength) == ["push argument 0"]
+assert compile_let("1 * x", strength) == ["push argument 0"]
+assert compile_let("x / -1", strength) == ["push argument 0", "neg"]
+assert compile_let("x * 0", strength) == ["push constant 0"]
+assert compile_let("x * 2", strength) == [
+    "push argument 0", "push argument 0", "add"
+]
+assert compile_let("Main.g() * 0", strength) == [
+    "call Main.g 0", "pop temp 1", "push constant 0"
+]
+# A division may fail, so it stays
+assert compile_let("(x / x) * 0", strength) == [
+    "push argument 0", "push argument 0", "call Math.divide 2",
+    "pop temp 1", "push constant 0"
+]
+assert compile_let("x / 2", strength)[-1] == "call Math.divide 2"
+assert compile_let("x * 12345", strength)[-1] == "call Math.multiply 2"
+
+# Reduced code computes the same 16-bit products
+for factor in (-16, -3, 2, 3, 5, 7, 10, 32, 63, 100, 1024):
+    emulator = VMEmulator()
+    emulator.load("\n".join(compile_vm(
+        f"class Main {{ function int f(int x) {{ return (x + 0) * {factor}; }}"
+        f" function int g(int x) {{ return x * {factor}; }} }}",
+        strength
+    )))
+    for x in (0, 1, -1, 7, -300, 1000, 32767, -32768):
+        assert emulator.run("Main.f", x) == to_word(x * factor), (x, factor)
+        assert emulator.run("Main.g", x) == to_word(x * factor), (x, factor)
+    assert "Math.multiply" not in emulator.calls
+
+# Branch compilation keeps the meaning of every condition
+conditions = (
+    "x", "~x", "x = 0", "~(x = y)", "(x < y) & (y > 3)",
+    "(x = y) | ~(x > 2)", "~((x < 0) | (y < 0)) & (x = 1)",
+    "(x < 5) & (Main.g(y) = 2)", "true", "false", "x & y"
+)
+for condition in conditions:
+    source = (
+        "class Main { function int g(int y) { return y; } "
+        "function int f(int x, int y) { var int n; "
+        f"if ({condition}) {{ let n = 100; }} else {{ let n = 200; }} "
+        f"while (({condition}) & (n < 205)) {{ let n = n + 1; }} "
+        "return n; } }"
+    )
+    plain, branched = VMEmulator(), VMEmulator()
+    plain.load("\n".join(compile_vm(source)))
+    branched.load("\n".join(compile_vm(source, frozenset({"branch"}))))
+    for x in (-1, 0, 1, 2, 3, 7):
+        for y in (-1, 0, 2, 4):
+            assert branched.run("Main.f", x, y) == plain.run("Main.f", x, y), \
+                (condition, x, y)
+
+# Dead code elimination
+dce = frozenset({"dce"})
+assert compile_vm(
+    "class Main { function int f(int x) { return x; let x = 2; return 3; } }",
+    dce
+) == ["function Main.f 0", "push argument 0", "return"]
+assert compile_vm(
+    "class Main { function int f(int x) { "
+    "if (false) { let x = 1; } else { let x = 2; } "
+    "while (false) { let x = x + 1; } return x; } }",
+    dce
+) == [
+    "function Main.f 0", "// if statement",
+    "push constant 2", "pop argument 0", "push argument 0", "return"
+]
+
+# Code after if blocks which both return, and after endless loops
+source = (
+    "class Main { function int f(int x) { "
+    "if (x > 2) { return 1; } else { return 2; } return 3; } "
+    "function int g(int x) { while (true) { let x = x + 1; "
+    "if (x > 100) { return x; } } return 0; } }"
+)
+with tempfile.TemporaryDirectory() as tmp:
+    out_path = Path(tmp) / "Main.xml"
+    engine = CompilationEngine(
+        TokenCursor(tokenize_source(source)), out_path, "vm",
+        optimizations=dce
+    )
+    engine.start_compilation()
+    engine.close()
+    assert engine.removed_code == {"Main.f": 3, "Main.g": 5}
+    emulator = VMEmulator()
+    emulator.load(out_path.with_suffix(".vm").read_text())
+assert emulator.run("Main.f", 3) == 1
+assert emulator.run("Main.f", 0) == 2
+assert emulator.run("Main.g", 7) == 101
+
+# String constants, built on every use or pooled in statics
+assert compile_let('"Hi"', frozenset()) == [
+    "push constant 2", "call String.new 1",
+    "push constant 72", "call String.appendChar 2",
+    "push constant 105", "call String.appendChar 2"
+]
+source = (
+    "class Main { static int count; "
+    'function int f() { return "ab"; } '
+    'function int g() { var int a; let a = "cd"; return "ab"; } }'
+)
+pooled = compile_vm(source, frozenset({"pool"}))
+assert "pop static 1" in pooled and "pop static 2" in pooled
+emulator = VMEmulator()
+emulator.load("\n".join(pooled))
+first = emulator.run("Main.f")
+assert emulator.string_at(first) == "ab"
+assert emulator.run("Main.g") == emulator.run("Main.f") == first
+assert emulator.calls["String.new"] == 2
+
+print("All assertions are True!")
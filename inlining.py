@@ -0,0 +1,181 @@
+# Inlines calls of small leaf subroutines over a
+# whole program, given as a CallGraph
+from call_graph import CallGraph, is_instruction
+
+# Default size bound of inlined subroutines, in instructions
+DEFAULT_MAX_SIZE = 12
+
+# Pointer of each segment, restored after inlined code
+# which moves it if the caller uses the segment
+segment_pointers = {
+    "this": "0",
+    "that": "1"
+}
+
+def used_segments(code: list) -> set:
+    '''returns the segments of this and that which `code`
+    accesses, directly or through their pointer'''
+    used = set()
+    for command in code:
+        if command[0] in ("push", "pop"):
+            if command[1] in segment_pointers:
+                used.add(command[1])
+            elif command[1] == "pointer" and command[0] == "push":
+                used.add("that" if command[2] == "1" else "this")
+    return used
+
+class Inliner:
+    '''Replaces calls of leaf subroutines of at most
+    `max_size` instructions by their code. Arguments and
+    locals of the inlined code move to new locals of the
+    caller, the caller's this and that are kept'''
+    def __init__(self, graph: CallGraph,
+        max_size: int = DEFAULT_MAX_SIZE) -> None:
+        self.graph = graph
+        self.max_size = max_size
+
+        # (caller, callee, decision) of each call site
+        # of a subroutine in the program
+        self.decisions = []
+        # Instructions added, negative if fewer
+        self.added = 0
+
+        # Function name -> its commands, as split lines
+        self.bodies = {}
+        for functions in graph.files.values():
+            for name, lines in functions:
+                if name is not None:
+                    self.bodies[name] = [
+                        line.split() for line in lines if is_instruction(line)
+                    ]
+
+    def inline_all(self) -> None:
+        '''inlines every call which fits, in every function'''
+        for path, functions in self.graph.files.items():
+            for function in functions:
+                if function[0] is not None and self.inline_calls(function):
+                    self.graph.changed.add(path)
+
+    def reason_to_keep(self, caller, callee, n_args):
+        '''returns why a call can not be inlined, None if it can'''
+        body = self.bodies[callee]
+        size = len(body) - 1
+
+        if any(command[0] == "call" for command in body):
+            return "calls other subroutines"
+        if size > self.max_size:
+            return f"{size} instructions, over {self.max_size}"
+        if caller.split(".")[0] != callee.split(".")[0] \
+            and any(len(c) > 1 and c[1] == "static" for c in body):
+            # Statics belong to the file of their class
+            return "uses statics of another class"
+        if any(len(c) > 1 and c[1] == "argument" and int(c[2]) >= n_args
+            for c in body):
+            return "uses more arguments than given"
+        return None
+
+    def inline_calls(self, function) -> bool:
+        '''inlines the calls of one [name, lines] function.
+        Returns True if any call was inlined'''
+        caller, lines = function
+        header = lines[0].split()
+        n_locals = int(header[2])
+        used = used_segments(
+            line.split() for line in lines[1:] if is_instruction(line)
+        )
+
+        new_lines = [lines[0]]
+        # Locals the inlined code needs, reused at every site
+        extra = 0
+        sites = 0
+
+        for line in lines[1:]:
+            if not line.startswith("call ") \
+                or line.split()[1] not in self.bodies:
+                new_lines.append(line)
+                continue
+
+            _, callee, n_args = line.split()
+            reason = self.reason_to_keep(caller, callee, int(n_args))
+            if reason is not None:
+                self.decisions.append((caller, callee, f"kept, {reason}"))
+                new_lines.append(line)
+                continue
+
+            code, slots = self.inline_code(
+                callee, int(n_args), n_locals, sites, used
+            )
+            new_lines.extend(f"{' '.join(command)}\n" for command in code)
+            extra = max(extra, slots)
+            sites += 1
+
+            self.added += len(code) - 1
+            self.decisions.append(
+                (caller, callee, f"inlined, {len(code) - 1:+d} instructions")
+            )
+
+        if not sites:
+            return False
+
+        new_lines[0] = f"function {caller} {n_locals + extra}\n"
+        function[1] = new_lines
+        self.graph.calls[caller] = {
+            line.split()[1] for line in new_lines if line.startswith("call ")
+        }
+        return True
+
+    def inline_code(self, callee, n_args, base, site, used):
+        '''returns the code replacing a call of `callee`, and
+        the number of locals from `base` on which it uses.
+        `site` numbers the inlined calls of the caller, for
+        unique labels'''
+        body = self.bodies[callee]
+        n_callee_locals = int(body[0][2])
+        locals_base = base + n_args
+
+        # The arguments are on the stack, last on top
+        code = [
+            ["pop", "local", str(base + i)] for i in reversed(range(n_args))
+        ]
+
+        # Locals start at 0
+        for i in range(n_callee_locals):
+            code.append(["push", "constant", "0"])
+            code.append(["pop", "local", str(locals_base + i)])
+
+        # Keep the pointers the caller needs
+        slot = locals_base + n_callee_locals
+        saved = []
+        for segment, pointer in segment_pointers.items():
+            if segment in used and ["pop", "pointer", pointer] in body:
+                code.append(["push", "pointer", pointer])
+                code.append(["pop", "local", str(slot)])
+                saved.append((pointer, slot))
+                slot += 1
+
+        end = f"INLINE_{site}_END"
+        jumps_to_end = False
+        for i, command in enumerate(body[1:], 1):
+            op = command[0]
+            if op in ("push", "pop") and command[1] == "argument":
+                command = [op, "local", str(base + int(command[2]))]
+            elif op in ("push", "pop") and command[1] == "local":
+                command = [op, "local", str(locals_base + int(command[2]))]
+            elif op in ("label", "goto", "if-goto"):
+                command = [op, f"{command[1]}_INLINE_{site}"]
+            elif op == "return":
+                # The return value is on top of the stack
+                if i == len(body) - 1:
+                    continue
+                command = ["goto", end]
+                jumps_to_end = True
+            code.append(command)
+
+        if jumps_to_end:
+            code.append(["label", end])
+
+        for pointer, slot_of_pointer in saved:
+            code.append(["push", "local", str(slot_of_pointer)])
+            code.append(["pop", "pointer", pointer])
+
+        return code, slot - base
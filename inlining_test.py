@@ -0,0 +1,88 @@
+import tempfile
+from pathlib import Path
+
+from call_graph import CallGraph
+from compilation_engine import CompilationEngine
+from inlining import Inliner
+from token_table import TokenCursor, tokenize_source
+from vm_emulator import VMEmulator
+
+sources = {
+    "Box": """class Box {
+        field int size;
+        constructor Box new(int s) { let size = s; return this; }
+        method int getSize() { return size; }
+        method int grow(Counter c) {
+            let size = size + c.getCount();
+            return size + c.getCount();
+        }
+        function int clamp(int v, int low) {
+            var int result;
+            let result = v;
+            while (result < low) { let result = result + 10; }
+            if (result > 50) { return 50; }
+            return result;
+        }
+    }""",
+    "Counter": """class Counter {
+        field int count;
+        constructor Counter new() { let count = 3; return this; }
+        method int getCount() { return count; }
+    }""",
+    "Main": """class Main {
+        function int main() {
+            var Box b;
+            var Counter c;
+            let b = Box.new(4);
+            let c = Counter.new();
+            return b.grow(c) + Box.clamp(b.getSize(), 25)
+                + Box.clamp(-3, 0) + Box.clamp(99, 0);
+        }
+    }"""
+}
+
+def run(max_size=None):
+    '''compiles the classes, inlines up to `max_size`, and
+    returns the result of Main.main and the Inliner'''
+    with tempfile.TemporaryDirectory() as tmp:
+        graph = CallGraph()
+        for name, source in sources.items():
+            out_path = Path(tmp) / f"{name}.xml"
+            engine = CompilationEngine(
+                TokenCursor(tokenize_source(source)), out_path, "vm"
+            )
+            engine.start_compilation()
+            engine.close()
+            graph.add_file(out_path.with_suffix(".vm"))
+
+        inliner = None
+        if max_size is not None:
+            inliner = Inliner(graph, max_size)
+            inliner.inline_all()
+            graph.write()
+
+        emulator = VMEmulator()
+        emulator.load_dir(Path(tmp))
+        return emulator.run("Main.main"), inliner
+
+expected, _ = run()
+assert expected == 10 + 27 + 7 + 50
+
+# A method inlined into a method keeps the caller's this
+result, inliner = run(32)
+assert result == expected
+assert ("Box.grow", "Counter.getCount", "inlined, +7 instructions") \
+    in inliner.decisions
+assert ("Main.main", "Box.new", "kept, calls other subroutines") \
+    in inliner.decisions
+assert ("Main.main", "Box.grow", "kept, calls other subroutines") \
+    in inliner.decisions
+assert sum(d.startswith("inlined") for _, _, d in inliner.decisions) == 6
+
+# Over the size bound, calls stay
+result, inliner = run(3)
+assert result == expected
+assert ("Main.main", "Box.clamp", "kept, 26 instructions, over 3") \
+    in inliner.decisions
+
+print("All assertions are True!")
@@ -0,0 +1,157 @@
+# Abstract syntax tree of a Jack class
+
+class ClassNode:
+    '''class className '{' classVarDec* subroutineDec* '}' '''
+    __slots__ = ("name", "var_decs", "subroutines")
+
+    def __init__(self, name: str, var_decs: list, subroutines: list) -> None:
+        self.name = name
+        self.var_decs = var_decs
+        self.subroutines = subroutines
+
+class ClassVarDec:
+    '''('static' | 'field') type varName (',' varName)* ';' '''
+    __slots__ = ("kind", "type", "names")
+
+    def __init__(self, kind: str, type: str, names: list) -> None:
+        self.kind = kind
+        self.type = type
+        self.names = names
+
+class Subroutine:
+    '''('constructor' | 'function' | 'method') ('void' | type)
+    subroutineName '(' parameterList ')' subroutineBody.
+    `parameters` holds (type, name) pairs'''
+    __slots__ = (
+        "kind", "return_type", "name", "parameters",
+        "var_decs", "statements"
+    )
+
+    def __init__(self, kind: str, return_type: str, name: str,
+        parameters: list, var_decs: list, statements: list) -> None:
+        self.kind = kind
+        self.return_type = return_type
+        self.name = name
+        self.parameters = parameters
+        self.var_decs = var_decs
+        self.statements = statements
+
+class VarDec:
+    '''var type varName (',' varName)* ';' '''
+    __slots__ = ("type", "names")
+
+    def __init__(self, type: str, names: list) -> None:
+        self.type = type
+        self.names = names
+
+class LetStatement:
+    '''let varName ('[' expression ']')? '=' expression ';' '''
+    __slots__ = ("name", "index", "value")
+
+    def __init__(self, name: str, index, value) -> None:
+        self.name = name
+        self.index = index
+        self.value = value
+
+class IfStatement:
+    '''if '(' expression ')' '{' statements '}'
+    ('else' '{' statements '}')?, `else_statements`
+    is None without an else block'''
+    __slots__ = ("condition", "statements", "else_statements")
+
+    def __init__(self, condition, statements: list,
+        else_statements: list) -> None:
+        self.condition = condition
+        self.statements = statements
+        self.else_statements = else_statements
+
+class WhileStatement:
+    '''while '(' expression ')' '{' statements '}' '''
+    __slots__ = ("condition", "statements")
+
+    def __init__(self, condition, statements: list) -> None:
+        self.condition = condition
+        self.statements = statements
+
+class DoStatement:
+    '''do subroutineCall ';' '''
+    __slots__ = ("call",)
+
+    def __init__(self, call) -> None:
+        self.call = call
+
+class ReturnStatement:
+    '''return expression? ';', `value` is None without one'''
+    __slots__ = ("value",)
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+class Expression:
+    '''term (op term)*, `ops` holds the operator
+    symbols as given by the tokenizer'''
+    __slots__ = ("terms", "ops")
+
+    def __init__(self, terms: list, ops: list) -> None:
+        self.terms = terms
+        self.ops = ops
+
+class IntegerConstant:
+    __slots__ = ("value",)
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+class StringConstant:
+    __slots__ = ("value",)
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+class KeywordConstant:
+    '''true, false, null or this'''
+    __slots__ = ("keyword",)
+
+    def __init__(self, keyword: str) -> None:
+        self.keyword = keyword
+
+class VarTerm:
+    '''a lone identifier'''
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+class ArrayTerm:
+    '''varName '[' expression ']' '''
+    __slots__ = ("name", "index")
+
+    def __init__(self, name: str, index) -> None:
+        self.name = name
+        self.index = index
+
+class SubroutineCall:
+    '''subroutineName '(' expressionList ')' or
+    (className | varName) '.' subroutineName '(' expressionList ')',
+    `receiver` is None for the first form'''
+    __slots__ = ("receiver", "name", "args")
+
+    def __init__(self, receiver: str, name: str, args: list) -> None:
+        self.receiver = receiver
+        self.name = name
+        self.args = args
+
+class ParenTerm:
+    '''( expression )'''
+    __slots__ = ("expression",)
+
+    def __init__(self, expression) -> None:
+        self.expression = expression
+
+class UnaryTerm:
+    '''unaryOp term'''
+    __slots__ = ("op", "term")
+
+    def __init__(self, op: str, term) -> None:
+        self.op = op
+        self.term = term
@@ -0,0 +1,95 @@
+# Compiles Jack source held in memory, with no files
+# read or written
+import io
+from typing import NamedTuple
+
+from call_graph import CallGraph
+from compilation_engine import CompilationEngine
+from inlining import Inliner
+from token_table import TokenCursor, tokenize_source
+
+class CompileResult(NamedTuple):
+    '''Outputs of one compiled class. `xml` is None unless
+    emitted, `ir` holds the instructions of `vm` as the
+    class compiled, before any whole-program pass'''
+    class_name: str
+    vm: str
+    xml: str
+    ir: list
+
+def read_source(source) -> str:
+    '''returns the text of a string or a readable text stream'''
+    if isinstance(source, str):
+        return source
+    return source.read()
+
+def compile_source(source, class_name: str = None, emit: str = "vm",
+    optimizations=frozenset(), readable_vm: bool = False,
+    cache=None) -> CompileResult:
+    '''compiles the class in `source`, a string or a text
+    stream. The class must be named `class_name` if given.
+    Token tables are reused from `cache`, a CompileCache
+    or MemoryCache, if given'''
+    text = read_source(source)
+    source_name = f"{class_name or '<string>'}.jack"
+
+    table = None
+    if cache is not None:
+        key = cache.key(text.encode("utf-8"))
+        table = cache.load_tokens(key, text, source_name)
+    if table is None:
+        table = tokenize_source(text, source_name)
+        if cache is not None:
+            cache.store_tokens(key, table)
+
+    xml_stream = io.StringIO() if emit != "vm" else None
+    vm_stream = io.StringIO()
+    ir = []
+    engine = CompilationEngine(
+        TokenCursor(table), None, emit, readable_vm, optimizations,
+        xml_stream=xml_stream, vm_stream=vm_stream, ir=ir
+    )
+    engine.start_compilation()
+    engine.close()
+
+    if class_name is not None and engine.class_name not in (None, class_name):
+        raise ValueError(
+            f"Class {engine.class_name} found in the source of {class_name}"
+        )
+    return CompileResult(
+        engine.class_name or class_name,
+        vm_stream.getvalue(),
+        xml_stream.getvalue() if xml_stream is not None else None,
+        ir
+    )
+
+def compile_sources(sources: dict, emit: str = "vm",
+    optimizations=frozenset(), readable_vm: bool = False,
+    whole_program: bool = False, inline: int = None,
+    cache=None) -> dict:
+    '''compiles the classes of a program, given as class name
+    -> string or text stream. Returns class name -> result.
+    `whole_program` and `inline` link the VM code of all
+    classes as the --whole-program and --inline options do'''
+    results = {
+        class_name: compile_source(
+            source, class_name, emit, optimizations, readable_vm, cache
+        )
+        for class_name, source in sources.items()
+    }
+    if emit == "xml" or (not whole_program and inline is None):
+        return results
+
+    call_graph = CallGraph()
+    for class_name, result in results.items():
+        call_graph.add_text(class_name, result.vm)
+    if inline is not None:
+        Inliner(call_graph, inline).inline_all()
+    if whole_program:
+        call_graph.remove_unused()
+
+    for class_name in call_graph.changed:
+        results[class_name] = results[class_name]._replace(
+            vm=call_graph.text(class_name)
+        )
+    return results
@@ -0,0 +1,55 @@
+import io
+import tempfile
+from pathlib import Path
+
+from compilation_engine import CompilationEngine
+from jack_compiler import compile_source, compile_sources
+from token_table import TokenCursor, tokenize_source
+from vm_writer import VMWriter
+
+# Same outputs as compiling through files
+for path in sorted(Path("tests").glob("*.jack")):
+    source = path.read_text()
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = Path(tmp) / f"{path.stem}.xml"
+        engine = CompilationEngine(
+            TokenCursor(tokenize_source(source)), out_path, "both"
+        )
+        engine.start_compilation()
+        engine.close()
+
+        result = compile_source(io.StringIO(source), path.stem, "both")
+        assert result.class_name == path.stem
+        assert result.vm == out_path.with_suffix(".vm").read_text()
+        assert result.xml == out_path.read_text()
+        assert len(result.ir) == result.vm.count("\n")
+
+# XML only opens no VM output, and a class under another name
+assert compile_source("class A { }", emit="xml").vm == ""
+assert VMWriter(None).out_stream is None
+try:
+    compile_source("class A { }", "B")
+    assert False
+except ValueError:
+    pass
+
+sources = {
+    "Main": """class Main {
+        function int main() { return Util.twice(4); }
+    }""",
+    "Util": """class Util {
+        function int twice(int x) { return x + x; }
+        function int unused() { return 0; }
+    }"""
+}
+results = compile_sources(sources)
+assert "call Util.twice 1" in results["Main"].vm
+assert "function Util.unused" in results["Util"].vm
+
+# Linking rewrites the VM code, the IR is as compiled
+results = compile_sources(sources, whole_program=True, inline=12)
+assert "call" not in results["Main"].vm
+assert "function Util.unused" not in results["Util"].vm
+assert len(results["Util"].ir) == 8
+
+print("All assertions are True!")
@@ -0,0 +1,461 @@
+# Parser building the syntax tree of a class, by recursive
+# descent down to expressions, which use an explicit stack
+from type_enums import TokenType, KeywordType
+from jack_ast import (
+    ClassNode, ClassVarDec, Subroutine, VarDec,
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    Expression, IntegerConstant, StringConstant, KeywordConstant,
+    VarTerm, ArrayTerm, SubroutineCall, ParenTerm, UnaryTerm
+)
+
+# Supported built-in data type keywords
+data_types = {
+    KeywordType.INT,
+    KeywordType.BOOLEAN,
+    KeywordType.CHAR
+}
+
+# Supported keyword constants
+keyword_constants = {
+    KeywordType.TRUE,
+    KeywordType.FALSE,
+    KeywordType.NULL,
+    KeywordType.THIS
+}
+
+# Binary operator symbols, as given by the tokenizer
+op_symbols = {
+    "+", "-", "*", "/", "&", "&amp;", "|",
+    "<", "&lt;", ">", "&gt;", "="
+}
+
+# Unary operator symbols
+unary_op_symbols = {"-", "~"}
+
+class JackParser:
+    '''Builds the syntax tree of a class from a tokenizer'''
+    def __init__(self, tokenizer) -> None:
+        self.tokenizer = tokenizer
+
+    def parse(self) -> ClassNode:
+        '''returns the tree of the class, None if the
+        source starts with a keyword other than class'''
+        # Read the first token into memory
+        self.tokenizer.has_more_tokens()
+
+        if self.tokenizer.get_token_type() == TokenType.KEYWORD:
+            if self.tokenizer.get_keyword_type() == KeywordType.CLASS:
+                return self.parse_class()
+            return None
+        raise AttributeError("Not starting with a class")
+
+    # 'class' className '{' classVarDec* subroutineDec* '}'
+    def parse_class(self):
+        self.advance()
+
+        if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+            raise AttributeError("Not a valid class name!")
+        name = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        self.eat("{")
+        self.advance()
+
+        var_decs = []
+        while self.is_keyword(KeywordType.FIELD, KeywordType.STATIC):
+            var_decs.append(self.parse_class_var_dec())
+
+        subroutines = []
+        while self.is_keyword(
+            KeywordType.CONSTRUCTOR, KeywordType.FUNCTION, KeywordType.METHOD
+        ):
+            subroutines.append(self.parse_subroutine_dec())
+
+        self.eat("}")
+        return ClassNode(name, var_decs, subroutines)
+
+    # ('static'|'field') type varName (',' varName)* ';'
+    def parse_class_var_dec(self):
+        kind = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        if not self.is_valid_type():
+            raise AssertionError("Invalid class variable type!")
+        var_type = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+            raise AssertionError("Invalid class variable name!")
+        names = [self.tokenizer.get_cur_ident()]
+        self.advance()
+
+        while self.is_symbol(","):
+            self.advance()
+            if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+                raise AssertionError(
+                    "Invalid Syntax for class varible declaration!"
+                )
+            names.append(self.tokenizer.get_cur_ident())
+            self.advance()
+
+        self.eat(";")
+        self.advance()
+        return ClassVarDec(kind, var_type, names)
+
+    # ('constructor' | 'function' | 'method') ('void' | type)
+    # subroutineName '(' parameterList ')' subroutineBody
+    def parse_subroutine_dec(self):
+        kind = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        if not (self.is_valid_type() or self.is_keyword(KeywordType.VOID)):
+            raise AssertionError("Not a valid subroutine return type!")
+        return_type = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+            raise AssertionError("Invalid Syntax for function name!")
+        name = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        self.eat("(")
+        self.advance()
+
+        parameters = []
+        if self.tokenizer.get_token_type() != TokenType.SYMBOL:
+            parameters = self.parse_parameter_list()
+
+        self.eat(")")
+        self.advance()
+
+        # '{' varDec* statements '}'
+        self.eat("{")
+        self.advance()
+
+        var_decs = []
+        while self.is_keyword(KeywordType.VAR):
+            var_decs.append(self.parse_var_dec())
+
+        statements = self.parse_statements()
+
+        self.eat("}")
+        self.advance()
+        return Subroutine(
+            kind, return_type, name, parameters, var_decs, statements
+        )
+
+    # ((type varName) (',' type varName)*)?
+    def parse_parameter_list(self):
+        parameters = []
+        while True:
+            if not self.is_valid_type():
+                raise AssertionError("Invalid syntax in parameter list!")
+            var_type = self.tokenizer.get_cur_ident()
+            self.advance()
+
+            if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+                raise AssertionError("Invalid variable name in parameter list!!")
+            parameters.append((var_type, self.tokenizer.get_cur_ident()))
+            self.advance()
+
+            if not self.is_symbol(","):
+                return parameters
+            self.advance()
+
+    # 'var' type varName (',' varName)* ';'
+    def parse_var_dec(self):
+        self.advance()
+
+        if not self.is_valid_type():
+            raise AssertionError("Not a valid var type!")
+        var_type = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        names = []
+        while True:
+            if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+                raise AssertionError("Invalid Syntax for var name!")
+            names.append(self.tokenizer.get_cur_ident())
+            self.advance()
+
+            if not self.is_symbol(","):
+                break
+            self.advance()
+
+        self.eat(";")
+        self.advance()
+        return VarDec(var_type, names)
+
+    # statement*
+    def parse_statements(self):
+        statements = []
+        while True:
+            if self.is_keyword(KeywordType.LET):
+                statements.append(self.parse_let())
+            elif self.is_keyword(KeywordType.IF):
+                statements.append(self.parse_if())
+            elif self.is_keyword(KeywordType.WHILE):
+                statements.append(self.parse_while())
+            elif self.is_keyword(KeywordType.DO):
+                statements.append(self.parse_do())
+            elif self.is_keyword(KeywordType.RETURN):
+                statements.append(self.parse_return())
+            else:
+                return statements
+
+    # 'let' varName ('[' expression ']')? '=' expression ';'
+    def parse_let(self):
+        self.advance()
+
+        if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+            raise AssertionError("Invalid Syntax for varName!")
+        name = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        index = None
+        if self.is_symbol("["):
+            self.advance()
+            index = self.parse_expression()
+            self.eat("]")
+            self.advance()
+
+        self.eat("=")
+        self.advance()
+        value = self.parse_expression()
+
+        self.eat(";")
+        self.advance()
+        return LetStatement(name, index, value)
+
+    # 'if' '(' expression ')' '{' statements '}' ('else' '{' statements '}')?
+    def parse_if(self):
+        condition, statements = self.parse_block()
+
+        else_statements = None
+        if self.is_keyword(KeywordType.ELSE):
+            self.advance()
+            self.eat("{")
+            self.advance()
+            else_statements = self.parse_statements()
+            self.eat("}")
+            self.advance()
+
+        return IfStatement(condition, statements, else_statements)
+
+    # 'while' '(' expression ')' '{' statements '}'
+    def parse_while(self):
+        return WhileStatement(*self.parse_block())
+
+    def parse_block(self):
+        '''parses '(' expression ')' '{' statements '}'
+        after if or while'''
+        self.advance()
+        self.eat("(")
+        self.advance()
+        condition = self.parse_expression()
+        self.eat(")")
+        self.advance()
+
+        self.eat("{")
+        self.advance()
+        statements = self.parse_statements()
+        self.eat("}")
+        self.advance()
+        return condition, statements
+
+    # 'do' subroutineCall ';'
+    def parse_do(self):
+        self.advance()
+
+        if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+            raise AssertionError("Not a valid subroutine/class name!!!")
+        name = self.tokenizer.get_cur_ident()
+        self.advance()
+
+        # expression (',' expression)*
+        call = self.parse_call_start(name)
+        if not self.is_symbol(")"):
+            call.args.append(self.parse_expression())
+            while self.is_symbol(","):
+                self.advance()
+                call.args.append(self.parse_expression())
+        self.eat(")")
+        self.advance()
+
+        self.eat(";")
+        self.advance()
+        return DoStatement(call)
+
+    # 'return' expression? ';'
+    def parse_return(self):
+        self.advance()
+
+        value = None
+        if not self.is_symbol(";"):
+            value = self.parse_expression()
+            self.eat(";")
+        self.advance()
+        return ReturnStatement(value)
+
+    # term (op term)*
+    def parse_expression(self):
+        '''parses an expression. Expressions within its terms
+        wait on an explicit stack instead of the Python stack,
+        so any nesting depth parses'''
+        # Expressions being parsed, innermost last. Each holds
+        # its terms, its ops, the unary ops before its next term
+        # and the term it belongs to, None for the outermost
+        stack = [([], [], [], None)]
+
+        while True:
+            term = self.parse_term(stack)
+            if term is None:
+                # Opened a nested expression
+                continue
+
+            # Add the term, closing the expressions it completes
+            while True:
+                terms, ops, unary_ops, outer = stack[-1]
+                while unary_ops:
+                    term = UnaryTerm(unary_ops.pop(), term)
+                terms.append(term)
+
+                if self.tokenizer.get_token_type() == TokenType.SYMBOL \
+                    and self.tokenizer.get_symbol() in op_symbols:
+                    ops.append(self.tokenizer.get_symbol())
+                    self.advance_in_expression()
+                    break
+
+                stack.pop()
+                expression = Expression(terms, ops)
+                if outer is None:
+                    return expression
+
+                if type(outer) is SubroutineCall:
+                    outer.args.append(expression)
+                    if self.is_symbol(","):
+                        # Next argument
+                        self.advance_in_expression()
+                        stack.append(([], [], [], outer))
+                        break
+                    self.eat(")")
+                elif type(outer) is ArrayTerm:
+                    outer.index = expression
+                    self.eat("]")
+                else:
+                    outer.expression = expression
+                    self.eat(")")
+                self.advance()
+                term = outer
+
+    # integerConstant | stringConstant | keywordConstant | varName |
+    # varName '[' expression ']' | subroutineCall | '(' expression ')'
+    # | unaryOp term
+    def parse_term(self, stack):
+        '''returns the next term of the innermost expression on
+        `stack`. Returns None if the term holds an expression,
+        which is pushed on `stack` to be parsed first'''
+        # Unary ops wait for their term on the stack
+        while self.tokenizer.get_token_type() == TokenType.SYMBOL \
+            and self.tokenizer.get_symbol() in unary_op_symbols:
+            stack[-1][2].append(self.tokenizer.get_symbol())
+            self.advance_in_expression()
+
+        token_type = self.tokenizer.get_token_type()
+        if token_type is None:
+            raise SyntaxError("Unexpected end of file, term expected")
+
+        if token_type == TokenType.INT_CONST:
+            term = IntegerConstant(self.tokenizer.get_int_val())
+            self.advance()
+            return term
+
+        if token_type == TokenType.STRING_CONST:
+            term = StringConstant(self.tokenizer.get_string_val())
+            self.advance()
+            return term
+
+        if token_type == TokenType.KEYWORD \
+            and self.tokenizer.get_keyword_type() in keyword_constants:
+            term = KeywordConstant(self.tokenizer.get_cur_ident())
+            self.advance()
+            return term
+
+        if token_type == TokenType.IDENTIFIER:
+            name = self.tokenizer.get_cur_ident()
+            self.advance()
+
+            if self.is_symbol("["):
+                self.advance_in_expression()
+                stack.append(([], [], [], ArrayTerm(name, None)))
+                return None
+
+            if self.is_symbol("(") or self.is_symbol("."):
+                call = self.parse_call_start(name)
+                if self.is_symbol(")"):
+                    self.advance()
+                    return call
+                stack.append(([], [], [], call))
+                return None
+
+            return VarTerm(name)
+
+        if token_type == TokenType.SYMBOL:
+            if self.tokenizer.get_symbol() == "(":
+                self.advance_in_expression()
+                stack.append(([], [], [], ParenTerm(None)))
+                return None
+
+            raise AssertionError("( or unary Op expected!!")
+
+        raise AssertionError("Not a valid term!")
+
+    def parse_call_start(self, name):
+        '''parses a subroutine call after its first identifier,
+        up to its '('. Returns the call without arguments'''
+        receiver = None
+        if self.is_symbol("."):
+            self.advance()
+            if self.tokenizer.get_token_type() != TokenType.IDENTIFIER:
+                raise AssertionError("Not a valid subroutine/class name!!!")
+            receiver, name = name, self.tokenizer.get_cur_ident()
+            self.advance()
+
+        self.eat("(")
+        self.advance()
+        return SubroutineCall(receiver, name, [])
+
+    def advance(self):
+        '''moves to the next token'''
+        self.tokenizer.has_more_tokens()
+
+    def advance_in_expression(self):
+        '''moves to the next token, which an unfinished
+        expression needs'''
+        if not self.tokenizer.has_more_tokens():
+            raise SyntaxError("Unexpected end of file in expression")
+
+    # eat the given string, else raise error
+    def eat(self, string):
+        if self.tokenizer.get_token_type() == TokenType.SYMBOL:
+            if not (self.tokenizer.get_symbol() == string):
+                raise AssertionError(f"Expected symbol {string}, found: {self.tokenizer.get_symbol()}")
+        else:
+            raise AssertionError("Symbol not found!!")
+
+    def is_symbol(self, symbol):
+        '''true if the current token is `symbol`'''
+        return self.tokenizer.get_token_type() == TokenType.SYMBOL \
+            and self.tokenizer.get_symbol() == symbol
+
+    def is_keyword(self, *keyword_types):
+        '''true if the current token is one of the keywords'''
+        return self.tokenizer.get_token_type() == TokenType.KEYWORD \
+            and self.tokenizer.get_keyword_type() in keyword_types
+
+    # Utility method to check weather
+    # the current token is a valid data type
+    def is_valid_type(self):
+        if self.tokenizer.get_token_type() == TokenType.KEYWORD:
+            return self.tokenizer.get_keyword_type() in data_types
+        return self.tokenizer.get_token_type() == TokenType.IDENTIFIER
@@ -1,3 +1,6 @@
+# For the whole-buffer scanner
+import re
+
 # Token type constants
 from type_enums import TokenType, KeywordType
 
@@ -49,15 +52,140 @@ symbols = {
     "~"
 }
 
+# Symbols which must be escaped in XML output
+xml_escapes = {
+    "<": "&lt;",
+    ">": "&gt;",
+    "&": "&amp;"
+}
+
+# Characters skipped between tokens
+whitespace = {" ", "\t", "\r", "\n"}
+
+# Characters read at once in stream mode
+chunk_size = 1 << 16
+
+# Supported scanner modes
+scanner_modes = {
+    "stream",   # character loop over chunks of the file
+    "buffer"    # whole file at once, master regex
+}
+
+# Splits a whole source buffer into lexemes.
+# Whitespace and comments match with an empty
+# group, unknown characters are never matched.
+# Unterminated strings and comments are kept
+# as lexemes so they can be reported
+lexeme_re = re.compile(r'''
+      [ \t\r\n]+
+    | //[^\n]*
+    | /\*.*?\*/
+    | ( "[^"]*"?
+      | /\*
+      | [^\W\d_]\w*
+      | \d+
+      | [{}()\[\].,;+\-*/&|<>=~]
+      )
+''', re.S | re.X)
+
+def classify_lexeme(lexeme):
+    '''returns the token params of a lexeme as
+    (type, ident, symbol, intval, strconst),
+    None if it is an unterminated string or comment'''
+    first = lexeme[0]
+
+    if first == '"':
+        if len(lexeme) < 2 or lexeme[-1] != '"':
+            return None
+        return (TokenType.STRING_CONST, "", "", "", lexeme[1:-1])
+
+    if lexeme == "/*":
+        return None
+
+    if first.isdigit():
+        return (TokenType.INT_CONST, "", "", lexeme, "")
+
+    if first.isalpha():
+        if lexeme in keywords:
+            return (TokenType.KEYWORD, lexeme, "", "", "")
+        return (TokenType.IDENTIFIER, lexeme, "", "", "")
+
+    return (TokenType.SYMBOL, "", xml_escapes.get(lexeme, lexeme), "", "")
+
+def lexical_error(source, pos, source_name):
+    '''returns a positioned SyntaxError for the unterminated
+    string or comment starting at source[pos]'''
+    if source.startswith('"', pos):
+        message = "Unterminated string"
+    else:
+        message = "Unterminated comment"
+
+    line = source.count("\n", 0, pos) + 1
+    line_start = source.rfind("\n", 0, pos) + 1
+    line_end = source.find("\n", pos)
+    if line_end < 0:
+        line_end = len(source)
+
+    return SyntaxError(message, (
+        source_name, line, pos - line_start + 1, source[line_start:line_end]
+    ))
+
+def unterminated_error(source, source_name):
+    '''returns a positioned SyntaxError for the first
+    unterminated string or comment in `source`'''
+    for match in lexeme_re.finditer(source):
+        lexeme = match.group(1)
+        if lexeme and classify_lexeme(lexeme) is None:
+            return lexical_error(source, match.start(1), source_name)
+
 class JackTokenizer:
     '''Tokenizes the given Jack Source File'''
     # Constructor
-    def __init__(self, in_path):
-        # Open file for reading
-        self.in_stream = in_path.open('r', encoding="utf-8")
-        
-        # Store the current character 
-        self.cur_char = self.in_stream.read(1)
+    def __init__(self, in_path, mode="buffer"):
+        if mode not in scanner_modes:
+            raise ValueError(f"Unknown scanner mode: {mode}")
+
+        self.mode = mode
+
+        # Source name for error messages
+        self.source_name = str(in_path)
+
+        if mode == "buffer":
+            # Load the whole file once
+            with in_path.open('r', encoding="utf-8") as in_stream:
+                source = in_stream.read()
+
+            # Split it into lexemes in one pass
+            lexemes = [
+                lexeme for lexeme in lexeme_re.findall(source) if lexeme
+            ]
+
+            # Classify each distinct lexeme only once
+            classified = {
+                lexeme: classify_lexeme(lexeme) for lexeme in set(lexemes)
+            }
+            if None in classified.values():
+                raise unterminated_error(source, self.source_name)
+
+            self.tokens = list(map(classified.__getitem__, lexemes))
+
+            # Index of the next token
+            self.pos = 0
+        else:
+            # Open file for reading
+            self.in_stream = in_path.open('r', encoding="utf-8")
+
+            # Source text read so far but not yet consumed
+            self.chunk = ""
+            self.chunk_pos = -1
+
+            # Position of the start of the chunk,
+            # for reporting errors
+            self.lines_before = 0
+            self.col_base = 0
+
+            # Store the current character 
+            self.advance()
 
         # Current token type
         self.cur_token_type = None
@@ -67,110 +195,200 @@ class JackTokenizer:
     # Also, updates the current 
     # token params
     def has_more_tokens(self):
+        if self.mode == "buffer":
+            if self.pos >= len(self.tokens):
+                self.cur_symbol = ""
+                self.cur_ident = ""
+                self.cur_intval = ""
+                self.cur_strconst = ""
+                return False
+
+            (
+                self.cur_token_type,
+                self.cur_ident,
+                self.cur_symbol,
+                self.cur_intval,
+                self.cur_strconst
+            ) = self.tokens[self.pos]
+            self.pos += 1
+            return True
+
         # Reset value variables
         self.cur_symbol = ""
         self.cur_ident = ""
         self.cur_intval = ""
         self.cur_strconst = ""
 
-        # Eat the white spaces
-        while (self.cur_char == " " or self.cur_char == "\n"):
-            self.cur_char = self.in_stream.read(1)
-
-        # If current character is alphabet
-        if self.cur_char.isalpha():
-            self.cur_ident = self.cur_char
-            # Eat all consecutive alpha numeric characters
-            self.cur_char = self.in_stream.read(1)
-            while(self.cur_char.isalnum() or self.cur_char == "_"):
-                self.cur_ident += self.cur_char
-                self.cur_char = self.in_stream.read(1)
-
-            if self.cur_ident in keywords:
-                self.cur_token_type = TokenType.KEYWORD
-            else:
-                self.cur_token_type = TokenType.IDENTIFIER
-
-
-            return True
-        
-        if self.cur_char in symbols:
-            self.cur_symbol = self.cur_char
-            if self.cur_symbol == "<":
-                self.cur_symbol = "&lt;"
-            elif self.cur_symbol == ">":
-                self.cur_symbol = "&gt;"
-            elif self.cur_symbol == "&":
-                self.cur_symbol = "&amp;"
-            
-        
-            if (self.cur_char == "/"):
-                # Read the character ahead
-                self.cur_char = self.in_stream.read(1)
-
-                # Handle inline comments
-                if (self.cur_char == "/"):
-                    while self.cur_char != "\n":
-                        self.cur_char = self.in_stream.read(1)
-
-                    return self.has_more_tokens()
-
-                # Handle block comments
-                elif (self.cur_char == "*"):
-                    self.cur_char = self.in_stream.read(1)
-                    while True:
-                        while self.cur_char != "*":
-                            self.cur_char = self.in_stream.read(1)
-                        
-                        self.cur_char = self.in_stream.read(1)
-
-                        if self.cur_char == "/":
-                            self.cur_char = self.in_stream.read(1)
-                            return self.has_more_tokens()
-                        else:
-                            continue
-                
+        while True:
+            # Eat the white spaces and comments
+            self.skip_blanks()
+
+            # If current character is alphabet
+            if self.cur_char.isalpha():
+                self.cur_ident = self.cur_char
+                # Eat all consecutive alpha numeric characters
+                self.advance()
+                while(self.cur_char.isalnum() or self.cur_char == "_"):
+                    self.cur_ident += self.cur_char
+                    self.advance()
+
+                if self.cur_ident in keywords:
+                    self.cur_token_type = TokenType.KEYWORD
                 else:
-                    self.cur_char = self.in_stream.read(1)
-                    self.cur_token_type = TokenType.SYMBOL
-                    return True
+                    self.cur_token_type = TokenType.IDENTIFIER
 
-            else:
-                self.cur_char = self.in_stream.read(1)
+                return True
+
+            if self.cur_char in symbols:
+                self.cur_symbol = xml_escapes.get(self.cur_char, self.cur_char)
+                self.advance()
                 self.cur_token_type = TokenType.SYMBOL
                 return True
-        
-        if self.cur_char.isdigit():
-            self.cur_intval = self.cur_char
-            # Eat all consecutive numeric characters
-            self.cur_char = self.in_stream.read(1)
-            while(self.cur_char.isdigit()):
-                self.cur_intval += self.cur_char
-                self.cur_char = self.in_stream.read(1)
-            
-            self.cur_token_type = TokenType.INT_CONST
-            return True
 
-        if self.cur_char == '"':
-            self.cur_char = self.in_stream.read(1)
-            while (self.cur_char != '"'):
-                self.cur_strconst += self.cur_char
-                self.cur_char = self.in_stream.read(1)
-            
-            # Closing `"` occurs 
-            # Move one character ahead
-            self.cur_char = self.in_stream.read(1)
-            self.cur_token_type = TokenType.STRING_CONST
-            return True
-        
-        if self.cur_char == "":
-            return False
-        
-        self.cur_char = self.in_stream.read(1)
+            if self.cur_char.isdigit():
+                self.cur_intval = self.cur_char
+                # Eat all consecutive numeric characters
+                self.advance()
+                while(self.cur_char.isdigit()):
+                    self.cur_intval += self.cur_char
+                    self.advance()
+
+                self.cur_token_type = TokenType.INT_CONST
+                return True
 
-        return self.has_more_tokens()
+            if self.cur_char == '"':
+                self.cur_strconst = self.read_string()
+                self.cur_token_type = TokenType.STRING_CONST
+                return True
 
-    
+            if self.cur_char == "":
+                return False
+
+            # Skip the unknown character
+            self.advance()
+
+    # Stream mode: reads the next chunk of the file
+    # after the unconsumed text, False at the end
+    def fill(self):
+        data = self.in_stream.read(chunk_size)
+        if not data:
+            return False
+
+        # Track the position of the dropped text
+        consumed = self.chunk[:self.chunk_pos]
+        newlines = consumed.count("\n")
+        if newlines:
+            self.lines_before += newlines
+            self.col_base = len(consumed) - consumed.rfind("\n") - 1
+        else:
+            self.col_base += len(consumed)
+
+        self.chunk = self.chunk[self.chunk_pos:] + data
+        self.chunk_pos = 0
+        return True
+
+    # Stream mode: moves to the next character
+    def advance(self):
+        self.chunk_pos += 1
+        if self.chunk_pos >= len(self.chunk) and not self.fill():
+            self.chunk_pos = len(self.chunk)
+            self.cur_char = ""
+            return
+        self.cur_char = self.chunk[self.chunk_pos]
+
+    # Stream mode: returns the character after
+    # the current one, "" at the end
+    def peek(self):
+        if self.chunk_pos + 1 >= len(self.chunk) and not self.fill():
+            return ""
+        return self.chunk[self.chunk_pos + 1]
+
+    # Stream mode: moves to the first character after
+    # the next `terminator`, searching from `skip`
+    # characters ahead. If the file ends first, returns
+    # the (line, column) where the search started
+    def skip_past(self, terminator, skip=0):
+        where = None
+        index = self.chunk.find(terminator, self.chunk_pos + skip)
+        while index < 0:
+            if where is None:
+                where = self.position(self.chunk_pos)
+
+            # Keep a partial terminator at the chunk end
+            self.chunk_pos = max(
+                self.chunk_pos + skip,
+                len(self.chunk) - len(terminator) + 1
+            )
+            skip = 0
+            if not self.fill():
+                return where
+            index = self.chunk.find(terminator, self.chunk_pos)
+
+        self.chunk_pos = index + len(terminator) - 1
+        self.advance()
+        return None
+
+    # Stream mode: eats white spaces and comments
+    def skip_blanks(self):
+        while True:
+            while self.cur_char in whitespace:
+                self.advance()
+
+            if self.cur_char != "/":
+                return
+
+            next_char = self.peek()
+            if next_char == "/":
+                # Inline comment, may end the file
+                if self.skip_past("\n") is not None:
+                    self.advance()
+            elif next_char == "*":
+                # Block comment, must be closed
+                where = self.skip_past("*/", 2)
+                if where is not None:
+                    raise self.error("Unterminated comment", where)
+            else:
+                # Division symbol
+                return
+
+    # Stream mode: reads a string constant,
+    # the current character is the opening `"`
+    def read_string(self):
+        where = None
+        start = self.chunk_pos + 1
+        index = self.chunk.find('"', start)
+        while index < 0:
+            if where is None:
+                where = self.position(self.chunk_pos)
+
+            # Keep the string read so far
+            searched = len(self.chunk) - start
+            self.chunk_pos = start
+            if not self.fill():
+                raise self.error("Unterminated string", where)
+            start = self.chunk_pos
+            index = self.chunk.find('"', start + searched)
+
+        text = self.chunk[start:index]
+
+        # Move past the closing `"`
+        self.chunk_pos = index
+        self.advance()
+        return text
+
+    # Stream mode: returns (line, column)
+    # of the character at chunk[index]
+    def position(self, index):
+        line = self.lines_before + self.chunk.count("\n", 0, index) + 1
+        newline = self.chunk.rfind("\n", 0, index)
+        if newline >= 0:
+            return (line, index - newline)
+        return (line, self.col_base + index + 1)
+
+    # Returns a positioned syntax error
+    def error(self, message, where):
+        line, column = where
+        return SyntaxError(message, (self.source_name, line, column, None))
 
     # Returns the type of token
     def get_token_type(self):
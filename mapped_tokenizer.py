@@ -0,0 +1,218 @@
+# For memory mapping the source file
+import mmap
+import re
+
+# Token type constants
+from type_enums import TokenType, KeywordType
+
+# Reserved keywords and XML escaped symbols
+from jack_tokenizer import keywords, xml_escapes, lexical_error
+from jack_tokenizer import lexeme_re, classify_lexeme
+
+# One named group per keyword, so the match
+# itself tells the keyword without a lookup
+keyword_alternatives = "|".join(
+    f"(?P<kw_{keyword}>{keyword})" for keyword in sorted(keywords)
+)
+
+# Whitespace and comments match without a group,
+# unknown characters are never matched. Unterminated
+# strings and comments match the `bad` group. Bytes
+# patterns only know ASCII letters, so runs of word
+# characters holding other UTF-8 text match the `wide`
+# group, to be split like the str scanners do
+mapped_lexeme_re = re.compile(rb'''
+      [ \t\r\n]+
+    | //[^\n]*
+    | /\*.*?\*/
+    | (?:''' + keyword_alternatives.encode() + rb''')(?![\w\x80-\xff])
+    | (?P<ident>[A-Za-z]\w*+)(?![\x80-\xff])
+    | (?P<int>\d+)
+    | (?P<wide>[\w\x80-\xff]+)
+    | "(?P<str>[^"]*)"
+    | (?P<bad>/\*|")
+    | (?P<sym>[{}()\[\].,;+\-*/&|<>=~])
+''', re.S | re.X)
+
+# Token type of each group
+group_types = {
+    "ident": TokenType.IDENTIFIER,
+    "int": TokenType.INT_CONST,
+    "str": TokenType.STRING_CONST,
+    "sym": TokenType.SYMBOL
+}
+
+# Keyword type and text of each keyword group
+keyword_types = {}
+keyword_names = {}
+
+for keyword in keywords:
+    group_types[f"kw_{keyword}"] = TokenType.KEYWORD
+    keyword_types[f"kw_{keyword}"] = KeywordType[keyword.upper()]
+    keyword_names[f"kw_{keyword}"] = keyword
+
+# Symbol strings by byte value, built once
+symbol_strings = {
+    ord(symbol): xml_escapes.get(symbol, symbol)
+    for symbol in "{}()[].,;+-*/&|<>=~"
+}
+
+class MappedJackTokenizer:
+    '''Tokenizes a memory mapped Jack source file.
+    Tokens are kept as (kind, start, end) offsets into
+    the mapping, lexemes become strings only on demand'''
+    # Constructor
+    def __init__(self, in_path):
+        # Source name for error messages
+        self.source_name = str(in_path)
+
+        self.in_stream = in_path.open('rb')
+
+        try:
+            self.buffer = mmap.mmap(
+                self.in_stream.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        except ValueError:
+            # Empty files cannot be mapped
+            self.buffer = b""
+
+        # Lazily scans the mapping
+        self.matches = mapped_lexeme_re.finditer(self.buffer)
+
+        # Current token type
+        self.cur_token_type = None
+
+        # Current token as offsets into the buffer
+        self.cur_kind = None
+        self.cur_start = 0
+        self.cur_end = 0
+
+        # Materialized lexeme of the current token
+        self.cur_text = None
+
+        # (kind, start, end, text) of the tokens
+        # left from a `wide` match
+        self.pending = []
+
+    # Are there more tokens?
+    # Also, updates the current
+    # token params
+    def has_more_tokens(self):
+        if self.pending:
+            self.set_token(*self.pending.pop())
+            return True
+
+        for match in self.matches:
+            kind = match.lastgroup
+
+            # Whitespace or comment
+            if kind is None:
+                continue
+
+            if kind == "bad":
+                raise self.error(match.start())
+
+            if kind == "wide":
+                self.pending = self.wide_tokens(*match.span())
+                if not self.pending:
+                    continue
+                self.set_token(*self.pending.pop())
+                return True
+
+            self.cur_kind = kind
+            self.cur_start, self.cur_end = match.span(kind)
+            self.cur_token_type = group_types[kind]
+            self.cur_text = None
+            return True
+
+        self.cur_kind = None
+        self.cur_text = None
+        self.close()
+        return False
+
+    # Sets the current token
+    def set_token(self, kind, start, end, text):
+        self.cur_kind = kind
+        self.cur_start, self.cur_end = start, end
+        self.cur_token_type = group_types[kind]
+        self.cur_text = text
+
+    # Returns the tokens of buffer[start:end] as the str
+    # scanners split it, last first
+    def wide_tokens(self, start, end):
+        text = self.buffer[start:end].decode("utf-8")
+        tokens = []
+        for match in lexeme_re.finditer(text):
+            lexeme = match.group(1)
+            if not lexeme:
+                continue
+            token_type = classify_lexeme(lexeme)[0]
+            if token_type == TokenType.KEYWORD:
+                kind = f"kw_{lexeme}"
+            elif token_type == TokenType.INT_CONST:
+                kind = "int"
+            else:
+                kind = "ident"
+            # Offsets count bytes, not characters
+            lexeme_start = start + len(text[:match.start(1)].encode("utf-8"))
+            lexeme_end = lexeme_start + len(lexeme.encode("utf-8"))
+            tokens.append((kind, lexeme_start, lexeme_end, lexeme))
+        tokens.reverse()
+        return tokens
+
+    # Releases the mapping and the file
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.matches = iter(())
+            self.buffer.close()
+            self.buffer = b""
+        self.in_stream.close()
+
+    # Returns a positioned error for the unterminated
+    # string or comment at byte offset `pos`
+    def error(self, pos):
+        prefix = self.buffer[:pos].decode("utf-8", "replace")
+        source = self.buffer[:].decode("utf-8", "replace")
+        return lexical_error(source, len(prefix), self.source_name)
+
+    # Decodes the current lexeme, once per token
+    def materialize(self):
+        if self.cur_text is None:
+            self.cur_text = self.buffer[self.cur_start:self.cur_end] \
+                .decode("utf-8")
+        return self.cur_text
+
+    # Returns the type of token
+    def get_token_type(self):
+        return self.cur_token_type
+
+    # Returns the keyword which in current token
+    def get_keyword_type(self):
+        return keyword_types.get(self.cur_kind)
+
+    # Returns the character which
+    # is the current token
+    def get_symbol(self):
+        if self.cur_kind == "sym":
+            return symbol_strings[self.buffer[self.cur_start]]
+        return ""
+
+    # Returns the integer value
+    # of the current token
+    def get_int_val(self):
+        if self.cur_kind != "int":
+            raise ValueError("Current token is not an integer constant")
+        return int(self.buffer[self.cur_start:self.cur_end])
+
+    # Returns the string value
+    # of the current token
+    def get_string_val(self):
+        if self.cur_kind == "str":
+            return self.materialize()
+        return ""
+
+    def get_cur_ident(self):
+        if self.cur_kind == "ident":
+            return self.materialize()
+        # Keyword text is a shared constant
+        return keyword_names.get(self.cur_kind, "")
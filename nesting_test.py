@@ -0,0 +1,83 @@
+import sys
+import tempfile
+from pathlib import Path
+
+from compilation_engine import CompilationEngine
+from token_table import TokenCursor, tokenize_source
+from vm_emulator import VMEmulator
+
+# Far deeper than the Python stack allows
+DEPTH = 10_000
+assert DEPTH > sys.getrecursionlimit()
+
+def compile_both(source, optimizations=frozenset()):
+    '''compiles a class and returns its VM code lines and XML'''
+    with tempfile.TemporaryDirectory() as tmp:
+        out_path = Path(tmp) / "Main.xml"
+        engine = CompilationEngine(
+            TokenCursor(tokenize_source(source)), out_path,
+            optimizations=optimizations
+        )
+        engine.start_compilation()
+        engine.close()
+        return (
+            out_path.with_suffix(".vm").read_text().splitlines(),
+            out_path.read_text()
+        )
+
+def compile_return(expression, optimizations=frozenset()):
+    '''compiles `return expression;` in Main.f, next to
+    Main.g with one expression of two terms'''
+    return compile_both(
+        "class Main { function int g(int y) { return y + 1; } "
+        "function int f(int x) { var Array a; "
+        f"return {expression}; }} }}",
+        optimizations
+    )
+
+# Parentheses
+vm, xml = compile_return("(" * DEPTH + "x" + ")" * DEPTH)
+assert vm[-2:] == ["push argument 0", "return"]
+assert xml.count("<expression>") == DEPTH + 2
+assert xml.count("</term>") == DEPTH + 3
+
+# Unary chains
+vm, xml = compile_return("-" * DEPTH + "x")
+assert vm[-DEPTH - 2:] == ["push argument 0"] + ["neg"] * DEPTH + ["return"]
+assert xml.count("<term>") == DEPTH + 3
+vm, xml = compile_return("~" * DEPTH + "7", frozenset({"fold"}))
+assert vm[-2:] == ["push constant 7", "return"]
+
+# Array indices
+vm, xml = compile_return("a[" * DEPTH + "0" + "]" * DEPTH)
+assert vm.count("pop pointer 1") == DEPTH
+assert xml.count("<symbol> [ </symbol>") == DEPTH
+
+# Call arguments
+vm, xml = compile_return("Main.g(" * DEPTH + "x" + ")" * DEPTH)
+assert vm.count("call Main.g 1") == DEPTH
+assert xml.count("<expressionList>") == DEPTH
+
+# Long operator chains, and a deep condition
+vm, xml = compile_both(
+    "class Main { function int f(int x) { "
+    f"if ({'(' * DEPTH}x{' = 0)' * DEPTH}) {{ return {' + '.join(['x'] * DEPTH)}; }} "
+    "return 0; } }",
+    frozenset({"peephole", "fold", "strength", "branch"})
+)
+assert vm.count("add") == DEPTH - 1
+emulator = VMEmulator()
+emulator.load("\n".join(vm))
+assert emulator.run("Main.f", 3) == 3 * DEPTH
+assert emulator.run("Main.f", 0) == 0
+
+# A source ending within an expression is an error, not a loop
+for end in ("-", "~", "(", "- ~ (", "a[", "g(1,"):
+    try:
+        compile_both(f"class A {{ function void f() {{ let x = {end}")
+    except SyntaxError as e:
+        assert e.msg.startswith("Unexpected end of file"), e.msg
+    else:
+        raise AssertionError(f"no error for a source ending in {end!r}")
+
+print("All assertions are True!")
@@ -0,0 +1,167 @@
+# Peephole optimization of the VM instructions of one subroutine
+from vm_ir import Opcode, Instruction
+from vm_writer import SegmentType, ArithmeticCType
+
+def is_push(instruction, segment=None, index=None):
+    '''true for a push, optionally of a given location'''
+    return instruction.op == Opcode.PUSH \
+        and (segment is None or instruction.arg1 == segment) \
+        and (index is None or instruction.arg2 == index)
+
+def is_pop(instruction, segment, index):
+    '''true for a pop into a given location'''
+    return instruction.op == Opcode.POP \
+        and instruction.arg1 == segment \
+        and instruction.arg2 == index
+
+def is_arithmetic(instruction, command):
+    '''true for the given arithmetic-logical command'''
+    return instruction.op == Opcode.ARITHMETIC \
+        and instruction.arg1 == command
+
+# Each rule looks at `code[i:]` and returns how many
+# instructions it replaces and with what, or None
+
+def double_not(code, i):
+    # not, not => nothing
+    if code[i].arg1 == ArithmeticCType.NOT and i + 1 < len(code) \
+        and is_arithmetic(code[i + 1], ArithmeticCType.NOT):
+        return (2, [])
+
+def double_neg(code, i):
+    # neg, neg => nothing
+    if code[i].arg1 == ArithmeticCType.NEG and i + 1 < len(code) \
+        and is_arithmetic(code[i + 1], ArithmeticCType.NEG):
+        return (2, [])
+
+def false_of_true(code, i):
+    # push constant 1, neg, not => push constant 0
+    if code[i].arg1 == SegmentType.CONST and code[i].arg2 == 1 \
+        and i + 2 < len(code) \
+        and is_arithmetic(code[i + 1], ArithmeticCType.NEG) \
+        and is_arithmetic(code[i + 2], ArithmeticCType.NOT):
+        return (3, [Instruction(Opcode.PUSH, SegmentType.CONST, 0)])
+
+def constant_branch(code, i):
+    # push constant c, if-goto L => goto L, or nothing for c = 0
+    if code[i].arg1 != SegmentType.CONST:
+        return None
+
+    # true is written as push constant 1, neg
+    length = 1
+    if i + 1 < len(code) and code[i].arg2 == 1 \
+        and is_arithmetic(code[i + 1], ArithmeticCType.NEG):
+        length = 2
+
+    if i + length < len(code) and code[i + length].op == Opcode.IF:
+        if code[i].arg2 == 0:
+            return (length + 1, [])
+        return (length + 1, [Instruction(Opcode.GOTO, code[i + length].arg1)])
+
+def nonzero_branch(code, i):
+    # push constant 0, eq, not, if-goto L => if-goto L
+    if is_push(code[i], SegmentType.CONST, 0) and i + 3 < len(code) \
+        and is_arithmetic(code[i + 1], ArithmeticCType.EQ) \
+        and is_arithmetic(code[i + 2], ArithmeticCType.NOT) \
+        and code[i + 3].op == Opcode.IF:
+        return (4, [code[i + 3]])
+
+# Operations which leave their left operand unchanged
+identity_operands = {
+    ArithmeticCType.ADD:  0,
+    ArithmeticCType.SUB:  0,
+    ArithmeticCType.OR:   0,
+    ArithmeticCType.MULT: 1,
+    ArithmeticCType.DIV:  1
+}
+
+def identity_operation(code, i):
+    # push constant 0, add => nothing, and alike
+    if code[i].arg1 == SegmentType.CONST and i + 1 < len(code) \
+        and code[i + 1].op == Opcode.ARITHMETIC \
+        and identity_operands.get(code[i + 1].arg1) == code[i].arg2:
+        return (2, [])
+
+def push_pop(code, i):
+    # push s i, pop s i => nothing
+    if i + 1 < len(code) and is_pop(code[i + 1], code[i].arg1, code[i].arg2):
+        return (2, [])
+
+def array_store(code, i):
+    # push s i, pop temp 0, pop pointer 1, push temp 0, pop that 0
+    # => pop pointer 1, push s i, pop that 0, for s i which
+    # does not change with pointer 1
+    value = code[i]
+    if value.arg1 in (SegmentType.THAT, SegmentType.POINTER, SegmentType.TEMP):
+        return None
+
+    if i + 4 < len(code) \
+        and is_pop(code[i + 1], SegmentType.TEMP, 0) \
+        and is_pop(code[i + 2], SegmentType.POINTER, 1) \
+        and is_push(code[i + 3], SegmentType.TEMP, 0) \
+        and is_pop(code[i + 4], SegmentType.THAT, 0):
+        return (5, [code[i + 2], value, code[i + 4]])
+
+def goto_next(code, i):
+    # goto L, label ... L => label ... L
+    target = code[i].arg1
+    j = i + 1
+    while j < len(code) and code[j].op == Opcode.LABEL:
+        if code[j].arg1 == target:
+            return (1, [])
+        j += 1
+
+# Rule name -> rule, grouped by the opcode they start with
+rules = {
+    Opcode.ARITHMETIC: {
+        "double-not": double_not,
+        "double-neg": double_neg
+    },
+    Opcode.PUSH: {
+        "false-of-true": false_of_true,
+        "constant-branch": constant_branch,
+        "nonzero-branch": nonzero_branch,
+        "identity-operation": identity_operation,
+        "push-pop": push_pop,
+        "array-store": array_store
+    },
+    Opcode.GOTO: {
+        "goto-next": goto_next
+    }
+}
+
+# Instructions to look back after a rewrite,
+# longer than the window of any rule
+LOOKBACK = 5
+
+class PeepholeOptimizer:
+    '''Rewrites wasteful instruction sequences with a
+    sliding window, until no rule applies anymore'''
+    def __init__(self) -> None:
+        # Rule name -> number of rewrites
+        self.hits = {
+            name: 0 for group in rules.values() for name in group
+        }
+
+    def optimize(self, code: list) -> list:
+        '''optimizes the instructions of one subroutine in place'''
+        changed = True
+        while changed:
+            changed = False
+            i = 0
+            while i < len(code):
+                for name, rule in rules.get(code[i].op, {}).items():
+                    rewrite = rule(code, i)
+                    if rewrite is not None:
+                        length, replacement = rewrite
+                        code[i:i + length] = replacement
+                        self.hits[name] += 1
+                        changed = True
+
+                        # The rewrite may complete an earlier window
+                        i = max(0, i - LOOKBACK)
+                        break
+                else:
+                    i += 1
+
+        return code
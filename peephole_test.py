@@ -0,0 +1,85 @@
+from peephole import PeepholeOptimizer
+from vm_ir import Opcode, Instruction
+from vm_writer import SegmentType, ArithmeticCType
+
+def push(segment, index):
+    return Instruction(Opcode.PUSH, segment, index)
+
+def pop(segment, index):
+    return Instruction(Opcode.POP, segment, index)
+
+def op(command):
+    return Instruction(Opcode.ARITHMETIC, command)
+
+CONST = SegmentType.CONST
+LOCAL = SegmentType.LOCAL
+NOT = ArithmeticCType.NOT
+NEG = ArithmeticCType.NEG
+
+optimizer = PeepholeOptimizer()
+
+# while (true): the condition disappears entirely
+code = optimizer.optimize([
+    Instruction(Opcode.LABEL, "W1"),
+    push(CONST, 1), op(NEG), op(NOT),
+    Instruction(Opcode.IF, "W2"),
+    Instruction(Opcode.GOTO, "W1"),
+    Instruction(Opcode.LABEL, "W2")
+])
+assert code == [
+    Instruction(Opcode.LABEL, "W1"),
+    Instruction(Opcode.GOTO, "W1"),
+    Instruction(Opcode.LABEL, "W2")
+]
+assert optimizer.hits["false-of-true"] == 1
+assert optimizer.hits["constant-branch"] == 1
+
+# Rewrites which enable each other run to a fixed point
+code = optimizer.optimize([
+    push(LOCAL, 0), op(NOT), op(NEG), op(NEG), op(NOT),
+    push(CONST, 0), op(ArithmeticCType.ADD),
+    pop(LOCAL, 0)
+])
+assert code == [], code
+assert optimizer.hits["double-neg"] == 1
+assert optimizer.hits["double-not"] == 1
+assert optimizer.hits["identity-operation"] == 1
+assert optimizer.hits["push-pop"] == 1
+
+# x != 0 branches on x itself
+code = optimizer.optimize([
+    push(LOCAL, 1), push(CONST, 0), op(ArithmeticCType.EQ), op(NOT),
+    Instruction(Opcode.IF, "L")
+])
+assert code == [push(LOCAL, 1), Instruction(Opcode.IF, "L")]
+
+# a[i] = x stores x without going through temp 0
+code = optimizer.optimize([
+    push(LOCAL, 0), push(LOCAL, 1), op(ArithmeticCType.ADD),
+    push(SegmentType.ARG, 2), pop(SegmentType.TEMP, 0),
+    pop(SegmentType.POINTER, 1), push(SegmentType.TEMP, 0),
+    pop(SegmentType.THAT, 0)
+])
+assert code == [
+    push(LOCAL, 0), push(LOCAL, 1), op(ArithmeticCType.ADD),
+    pop(SegmentType.POINTER, 1), push(SegmentType.ARG, 2),
+    pop(SegmentType.THAT, 0)
+]
+
+# ... but not a[i] = b[j], which reads through pointer 1
+load = [
+    pop(SegmentType.POINTER, 1), push(SegmentType.THAT, 0),
+    pop(SegmentType.TEMP, 0), pop(SegmentType.POINTER, 1),
+    push(SegmentType.TEMP, 0), pop(SegmentType.THAT, 0)
+]
+assert optimizer.optimize(list(load)) == load
+
+# goto over the labels it jumps to
+code = optimizer.optimize([
+    Instruction(Opcode.GOTO, "B"),
+    Instruction(Opcode.LABEL, "A"),
+    Instruction(Opcode.LABEL, "B")
+])
+assert code == [Instruction(Opcode.LABEL, "A"), Instruction(Opcode.LABEL, "B")]
+
+print("All assertions are True!")
@@ -0,0 +1,43 @@
+# Multiplication by a constant as additions
+from vm_ir import Opcode, Instruction
+from vm_writer import SegmentType, ArithmeticCType
+
+# Longest inline code to replace a Math.multiply call
+MAX_MULTIPLY_CODE = 40
+
+def multiply_code(factor: int, operand: Instruction = None) -> list:
+    '''returns the code multiplying a value by `factor`, with
+    shifts and adds through temp 1. The value is on the stack,
+    or pushed by `operand`, a push which may be repeated'''
+    code = []
+    temp = Instruction(Opcode.PUSH, SegmentType.TEMP, 1)
+    add = Instruction(Opcode.ARITHMETIC, ArithmeticCType.ADD)
+
+    # Pushes operand * 2^i, for the current bit i
+    if operand is None:
+        code.append(Instruction(Opcode.POP, SegmentType.TEMP, 1))
+        operand = temp
+
+    top = abs(factor).bit_length() - 1
+    started = False
+    for i in range(top):
+        if abs(factor) >> i & 1:
+            code.append(operand)
+            if started:
+                code.append(add)
+            started = True
+
+        # Double, keeping the last one on the stack
+        code += [operand, operand, add]
+        if i + 1 < top:
+            code.append(Instruction(Opcode.POP, SegmentType.TEMP, 1))
+            operand = temp
+        elif started:
+            code.append(add)
+
+    if top == 0:
+        code.append(operand)
+
+    if factor < 0:
+        code.append(Instruction(Opcode.ARITHMETIC, ArithmeticCType.NEG))
+    return code
@@ -0,0 +1,346 @@
+# Compact typed arrays for the token columns
+from array import array
+
+# For finding tokens by source offset
+from bisect import bisect_left
+
+# For the binary table format
+import struct
+
+from typing import NamedTuple
+
+# Token type constants
+from type_enums import TokenType, KeywordType
+
+# Lexeme splitting and classification
+from jack_tokenizer import lexeme_re, classify_lexeme, lexical_error
+
+# Enum members by their stored code
+token_types = list(TokenType)
+keyword_types = list(KeywordType)
+
+# Keyword code of tokens which are not keywords
+NO_KEYWORD = 255
+
+# Binary table format: magic, token count,
+# pool size, pool text length in bytes
+table_header = struct.Struct("<4sIII")
+TABLE_MAGIC = b"JTT1"
+
+class TokenTable:
+    '''Tokens of one source file as parallel arrays,
+    with all token text interned in a shared pool'''
+    def __init__(self) -> None:
+        # TokenType code of each token
+        self.types = array('B')
+        # KeywordType code, or NO_KEYWORD
+        self.keywords = array('B')
+        # Source offsets [start, end) of each token
+        self.starts = array('I')
+        self.ends = array('I')
+        # Index of the token text in the pool
+        self.values = array('I')
+
+        # Interned token text
+        self.pool = []
+        self.pool_index = {}
+
+        # (type, keyword, value) codes of each distinct lexeme
+        self.codes = {}
+
+        # Source the tokens were read from
+        self.source = ""
+        self.source_name = "<string>"
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def intern(self, text: str) -> int:
+        '''returns the pool index of `text`, adding it if new'''
+        index = self.pool_index.get(text)
+        if index is None:
+            index = len(self.pool)
+            self.pool.append(text)
+            self.pool_index[text] = index
+        return index
+
+    def lexeme_codes(self, lexeme: str) -> tuple:
+        '''returns (type, keyword, value) codes of a lexeme,
+        None if it is an unterminated string or comment'''
+        classified = classify_lexeme(lexeme)
+        if classified is None:
+            return None
+
+        token_type, ident, symbol, intval, strconst = classified
+
+        keyword = NO_KEYWORD
+        if token_type == TokenType.KEYWORD:
+            keyword = KeywordType[ident.upper()].value
+
+        text = ident or symbol or intval or strconst
+        return (token_type.value, keyword, self.intern(text))
+
+    def append_match(self, match) -> None:
+        '''appends the token of a lexeme_re match'''
+        lexeme = match.group(1)
+
+        lexeme_codes = self.codes.get(lexeme)
+        if lexeme_codes is None:
+            lexeme_codes = self.lexeme_codes(lexeme)
+            if lexeme_codes is None:
+                raise lexical_error(
+                    self.source, match.start(1), self.source_name
+                )
+            self.codes[lexeme] = lexeme_codes
+
+        self.types.append(lexeme_codes[0])
+        self.keywords.append(lexeme_codes[1])
+        self.values.append(lexeme_codes[2])
+        self.starts.append(match.start(1))
+        self.ends.append(match.end(1))
+
+    def append_tokens(self, start: int = 0, end: int = None) -> None:
+        '''appends the tokens found in source[start:end]'''
+        if end is None:
+            end = len(self.source)
+
+        for match in lexeme_re.finditer(self.source, start, end):
+            if match.group(1):
+                self.append_match(match)
+
+    def to_bytes(self) -> bytes:
+        '''returns the table in the binary table format'''
+        text = [value.encode("utf-8") for value in self.pool]
+        lengths = array('I', map(len, text))
+        pool_text = b"".join(text)
+
+        return b"".join((
+            table_header.pack(
+                TABLE_MAGIC, len(self), len(self.pool), len(pool_text)
+            ),
+            self.types.tobytes(),
+            self.keywords.tobytes(),
+            self.starts.tobytes(),
+            self.ends.tobytes(),
+            self.values.tobytes(),
+            lengths.tobytes(),
+            pool_text
+        ))
+
+def table_from_bytes(data: bytes, source: str,
+    source_name: str = "<string>") -> TokenTable:
+    '''rebuilds a table written by TokenTable.to_bytes()
+    for the given source. Raises ValueError unless `data`
+    is exactly one whole table'''
+    if len(data) < table_header.size:
+        raise ValueError("Not a token table")
+    magic, count, pool_count, pool_size = \
+        table_header.unpack_from(data)
+    if magic != TABLE_MAGIC:
+        raise ValueError("Not a token table")
+
+    # Two byte columns, three int columns, the pool
+    # lengths and the pool text
+    expected_size = table_header.size + count * 2 \
+        + (count * 3 + pool_count) * array('I').itemsize + pool_size
+    if len(data) != expected_size:
+        raise ValueError(
+            f"Token table of {len(data)} bytes, {expected_size} expected"
+        )
+
+    table = TokenTable()
+    table.source = source
+    table.source_name = source_name
+
+    # Read each column in turn
+    pos = table_header.size
+    for column, length in (
+        (table.types, count),
+        (table.keywords, count),
+        (table.starts, count),
+        (table.ends, count),
+        (table.values, count)
+    ):
+        size = length * column.itemsize
+        column.frombytes(data[pos:pos + size])
+        pos += size
+
+    lengths = array('I')
+    size = pool_count * lengths.itemsize
+    lengths.frombytes(data[pos:pos + size])
+    pos += size
+    if sum(lengths) != pool_size:
+        raise ValueError("Token pool lengths do not match its size")
+
+    for length in lengths:
+        table.intern(data[pos:pos + length].decode("utf-8"))
+        pos += length
+
+    return table
+
+def tokenize_source(source: str,
+    source_name: str = "<string>") -> TokenTable:
+    '''builds the token table of a source string'''
+    table = TokenTable()
+    table.source = source
+    table.source_name = source_name
+    table.append_tokens()
+    return table
+
+def tokenize_file(in_path) -> TokenTable:
+    '''builds the token table of a source file'''
+    with in_path.open('r', encoding="utf-8") as in_stream:
+        return tokenize_source(in_stream.read(), str(in_path))
+
+class RetokenizeResult(NamedTuple):
+    table: TokenTable
+    reused: int
+    rescanned: int
+
+def retokenize(table: TokenTable, offset: int, removed: int,
+    inserted: str) -> RetokenizeResult:
+    '''returns the tokens of table.source after replacing `removed`
+    characters at `offset` with `inserted`. Only the damaged region
+    is scanned again; tokens before it are copied and tokens after it
+    are shifted once scanning meets an old token boundary'''
+    old = table
+    source = old.source[:offset] + inserted + old.source[offset + removed:]
+    delta = len(inserted) - removed
+    edit_end = offset + removed
+
+    # The pool only grows, so old and new tables share it
+    new = TokenTable()
+    new.pool = old.pool
+    new.pool_index = old.pool_index
+    new.codes = old.codes
+    new.source = source
+    new.source_name = old.source_name
+
+    # Tokens ending before the edit are untouched.
+    # One ending right at it may grow, so it is scanned again
+    first = bisect_left(old.ends, offset)
+    new.types = old.types[:first]
+    new.keywords = old.keywords[:first]
+    new.values = old.values[:first]
+    new.starts = old.starts[:first]
+    new.ends = old.ends[:first]
+    scan_from = old.ends[first - 1] if first > 0 else 0
+
+    # Next old token which scanning could meet again
+    resync = first
+    count = len(old)
+    rescanned = 0
+
+    for match in lexeme_re.finditer(source, scan_from):
+        if not match.group(1):
+            continue
+
+        token_start = match.start(1)
+
+        # Old tokens inside the edit can never be reused
+        while resync < count and (
+            old.starts[resync] < edit_end
+            or old.starts[resync] + delta < token_start
+        ):
+            resync += 1
+
+        # Same text follows from here on, so the
+        # rest of the old tokens are still valid
+        if resync < count and old.starts[resync] + delta == token_start:
+            break
+
+        new.append_match(match)
+        rescanned += 1
+    else:
+        resync = count
+
+    # Copy the reused tail, shifted by the edit
+    new.types.extend(old.types[resync:])
+    new.keywords.extend(old.keywords[resync:])
+    new.values.extend(old.values[resync:])
+    new.starts.extend(start + delta for start in old.starts[resync:])
+    new.ends.extend(end + delta for end in old.ends[resync:])
+
+    return RetokenizeResult(new, first + count - resync, rescanned)
+
+class TokenCursor:
+    '''Walks a TokenTable with the JackTokenizer API.
+    Past the last token there is no current token'''
+    def __init__(self, table: TokenTable) -> None:
+        self.table = table
+
+        # Index of the current token
+        self.cur = -1
+
+    # Are there more tokens?
+    # Also, moves to the next token
+    def has_more_tokens(self):
+        if self.cur + 1 >= len(self.table):
+            self.cur = len(self.table)
+            return False
+        self.cur += 1
+        return True
+
+    # True if there is a current token
+    def in_table(self):
+        return 0 <= self.cur < len(self.table)
+
+    # Moves back to the given token index,
+    # the next has_more_tokens() reads it
+    def seek(self, index):
+        self.cur = index - 1
+
+    # Returns the type of the token
+    # `offset` tokens ahead, None past the end
+    def peek_token_type(self, offset=1):
+        index = self.cur + offset
+        if 0 <= index < len(self.table):
+            return token_types[self.table.types[index]]
+        return None
+
+    # Returns the type of token,
+    # None past the end
+    def get_token_type(self):
+        if not self.in_table():
+            return None
+        return token_types[self.table.types[self.cur]]
+
+    # Returns the keyword which in current token
+    def get_keyword_type(self):
+        if not self.in_table():
+            return None
+        code = self.table.keywords[self.cur]
+        if code == NO_KEYWORD:
+            return None
+        return keyword_types[code]
+
+    # Returns the text of the current token
+    # if it has type `token_type`, else ""
+    def get_text(self, token_type):
+        table = self.table
+        if not self.in_table() or table.types[self.cur] != token_type.value:
+            return ""
+        return table.pool[table.values[self.cur]]
+
+    # Returns the character which
+    # is the current token
+    def get_symbol(self):
+        return self.get_text(TokenType.SYMBOL)
+
+    # Returns the integer value
+    # of the current token
+    def get_int_val(self):
+        return int(self.get_text(TokenType.INT_CONST))
+
+    # Returns the string value
+    # of the current token
+    def get_string_val(self):
+        return self.get_text(TokenType.STRING_CONST)
+
+    def get_cur_ident(self):
+        table = self.table
+        if self.in_table() and table.types[self.cur] in (
+            TokenType.IDENTIFIER.value, TokenType.KEYWORD.value
+        ):
+            return table.pool[table.values[self.cur]]
+        return ""
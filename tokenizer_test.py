@@ -0,0 +1,170 @@
+import random
+import tempfile
+from pathlib import Path
+
+import jack_tokenizer
+from jack_tokenizer import JackTokenizer
+from mapped_tokenizer import MappedJackTokenizer
+from token_table import TokenCursor, tokenize_file, tokenize_source, retokenize
+from token_table import table_from_bytes
+from type_enums import TokenType
+
+# Directory holding this test file
+here = Path(__file__).resolve().parent
+
+def token_stream(path, mode):
+    '''returns every token of `path` as (type, value) pairs'''
+    if mode == "mmap":
+        tz = MappedJackTokenizer(path)
+    elif mode == "table":
+        tz = TokenCursor(tokenize_file(path))
+    else:
+        tz = JackTokenizer(path, mode)
+    tokens = []
+    while tz.has_more_tokens():
+        t = tz.get_token_type()
+        if t == TokenType.KEYWORD:
+            tokens.append((t, tz.get_keyword_type()))
+        elif t == TokenType.IDENTIFIER:
+            tokens.append((t, tz.get_cur_ident()))
+        elif t == TokenType.SYMBOL:
+            tokens.append((t, tz.get_symbol()))
+        elif t == TokenType.INT_CONST:
+            tokens.append((t, tz.get_int_val()))
+        else:
+            tokens.append((t, tz.get_string_val()))
+    return tokens
+
+sources = sorted(here.glob("tests/*.jack")) + [here / "test.jack"]
+
+# Every other scanner must match the character loop
+for source in sources:
+    expected = token_stream(source, "stream")
+    assert len(expected) > 0
+    assert token_stream(source, "buffer") == expected, source
+    assert token_stream(source, "mmap") == expected, source
+    assert token_stream(source, "table") == expected, source
+
+# The table allows going back to any token
+cursor = TokenCursor(tokenize_file(sources[0]))
+cursor.has_more_tokens()
+first = cursor.get_cur_ident()
+while cursor.has_more_tokens():
+    pass
+# Past the end, no stale token stays current
+assert cursor.get_token_type() is None
+assert cursor.get_keyword_type() is None
+assert cursor.get_symbol() == "" and cursor.get_cur_ident() == ""
+assert not cursor.has_more_tokens() and cursor.get_token_type() is None
+cursor.seek(0)
+assert cursor.has_more_tokens()
+assert cursor.get_cur_ident() == first
+assert cursor.peek_token_type() == TokenType.IDENTIFIER
+
+scanners = ("stream", "buffer", "mmap", "table")
+
+# Comments, tabs and carriage returns in every position
+tricky = (
+    "class\tA {\r\n/* a\n * b */ /**/ /*/ still comment */"
+    "// x\n//\n  field int x; // to the end\n"
+    "let s = \"a // b /* c\"; x/y; /***/}\n// no newline"
+)
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = Path(tmp) / "Tricky.jack"
+    path.write_text(tricky)
+    expected = token_stream(path, "buffer")
+    assert (TokenType.STRING_CONST, "a // b /* c") in expected
+    for mode in scanners:
+        assert token_stream(path, mode) == expected, mode
+
+    # Identifiers beyond ASCII, on bytes as on str
+    path.write_text(
+        "class Ünï { field int café, a1é, _x, 1é, x→y; "
+        "method int classé() { return 12; } }"
+    )
+    unicode_tokens = token_stream(path, "buffer")
+    assert (TokenType.IDENTIFIER, "classé") in unicode_tokens
+    for mode in scanners:
+        assert token_stream(path, mode) == unicode_tokens, mode
+    path.write_text(tricky)
+
+    # Stream mode across every possible chunk boundary
+    default_size = jack_tokenizer.chunk_size
+    for size in range(1, 8):
+        jack_tokenizer.chunk_size = size
+        assert token_stream(path, "stream") == expected, size
+    jack_tokenizer.chunk_size = default_size
+
+    # Unterminated comments and strings are positioned errors
+    for text, message, line, column in (
+        ("class A {\n  /* open\n\n", "Unterminated comment", 2, 3),
+        ("class A {\n let s = \"open;\n}", "Unterminated string", 2, 10),
+    ):
+        path.write_text(text)
+        for mode in scanners:
+            for size in (1, 3, default_size):
+                jack_tokenizer.chunk_size = size
+                try:
+                    token_stream(path, mode)
+                except SyntaxError as e:
+                    assert e.msg == message, (mode, e.msg)
+                    assert (e.lineno, e.offset) == (line, column), \
+                        (mode, size, e.lineno, e.offset)
+                else:
+                    raise AssertionError(f"{mode}: no error for {text!r}")
+        jack_tokenizer.chunk_size = default_size
+
+def table_tokens(table):
+    '''returns every token of a table with its text and offsets'''
+    return [
+        (table.types[i], table.keywords[i], table.pool[table.values[i]],
+         table.starts[i], table.ends[i])
+        for i in range(len(table))
+    ]
+
+# Incremental re-tokenization matches a full scan
+rng = random.Random(2021)
+table = tokenize_file(here / "tests" / "Square.jack")
+snippets = ("x", " ", "1", "//", "\n", "/* c */", "let", "(", "\"s\"", "")
+for _ in range(300):
+    offset = rng.randrange(len(table.source) + 1)
+    removed = rng.randrange(min(6, len(table.source) - offset) + 1)
+    inserted = rng.choice(snippets)
+    source = table.source[:offset] + inserted + table.source[offset + removed:]
+    try:
+        expected = tokenize_source(source)
+    except SyntaxError:
+        # Edits opening a comment or string fail the same way
+        try:
+            retokenize(table, offset, removed, inserted)
+        except SyntaxError:
+            continue
+        raise AssertionError("unterminated edit was accepted")
+
+    result = retokenize(table, offset, removed, inserted)
+    assert table_tokens(result.table) == table_tokens(expected)
+    assert result.reused + result.rescanned == len(expected)
+    table = result.table
+
+# A one character edit rescans only a few tokens
+table = tokenize_file(here / "tests" / "Square.jack")
+offset = table.source.index("moveUp")
+result = retokenize(table, offset, 0, "x")
+assert result.rescanned == 1
+assert result.reused == len(table) - 1
+
+# The binary table format keeps every column
+table = tokenize_file(here / "tests" / "SquareGame.jack")
+loaded = table_from_bytes(table.to_bytes(), table.source)
+assert table_tokens(loaded) == table_tokens(table)
+
+# A truncated or padded table is not loaded
+for data in (table.to_bytes()[:-4], table.to_bytes() + b"\0", b"JTT1"):
+    try:
+        table_from_bytes(data, table.source)
+        assert False
+    except ValueError:
+        pass
+
+print("All assertions are True!")
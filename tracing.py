@@ -0,0 +1,93 @@
+# For writing trace events
+import json
+from enum import Enum
+from pathlib import Path
+
+# VMWriter methods which emit a VM command
+traced_vm_methods = (
+    "write_push",
+    "write_pop",
+    "write_arithmetic",
+    "write_label",
+    "write_goto",
+    "write_if",
+    "write_call",
+    "write_function",
+    "write_return"
+)
+
+def encode_value(value):
+    '''JSON encoding of values the compiler passes around'''
+    if isinstance(value, Enum):
+        return value.name
+    raise TypeError(f"Cannot trace {type(value).__name__}")
+
+class Tracer:
+    '''Writes compiler trace events as JSON lines'''
+    def __init__(self, out_path: Path) -> None:
+        self.out_stream = out_path.open("w")
+
+    def emit(self, event: str, **fields) -> None:
+        '''writes one trace event'''
+        self.out_stream.write(
+            json.dumps({"event": event, **fields}, default=encode_value)
+            + "\n"
+        )
+
+    def close(self) -> None:
+        self.out_stream.close()
+
+def trace_engine(engine, tracer: Tracer, source_name: str) -> None:
+    '''traces symbol lookups, declarations and VM commands
+    of a CompilationEngine by wrapping its methods on the
+    instance. Engines which are not traced keep the plain
+    methods, so tracing costs nothing unless enabled'''
+    tracer.emit("file", source=source_name)
+
+    def where():
+        return {
+            "class": engine.class_name,
+            "subroutine": engine.func_name
+        }
+
+    lookup_st = engine.lookup_st
+
+    def traced_lookup_st(v_name):
+        v_props = lookup_st(v_name)
+        tracer.emit("lookup", name=v_name, found=v_props or None, **where())
+        return v_props
+
+    engine.lookup_st = traced_lookup_st
+
+    for scope, table in (
+        ("class", engine.class_level_st),
+        ("subroutine", engine.subroutine_level_st)
+    ):
+        trace_declarations(tracer, scope, table, where)
+
+    for method in traced_vm_methods:
+        trace_vm_method(tracer, engine.vm_writer, method, where)
+
+def trace_declarations(tracer, scope, table, where):
+    '''traces every define() of a symbol table'''
+    define = table.define
+
+    def traced_define(name, type, kind):
+        define(name, type, kind)
+        tracer.emit(
+            "declare", scope=scope, name=name, type=type, kind=kind,
+            index=table.get_index_of(name), **where()
+        )
+
+    table.define = traced_define
+
+def trace_vm_method(tracer, vm_writer, method, where):
+    '''traces every call of one VMWriter command method'''
+    write = getattr(vm_writer, method)
+    command = method[len("write_"):]
+
+    def traced_write(*args):
+        write(*args)
+        tracer.emit("vm", command=command, args=list(args), **where())
+
+    setattr(vm_writer, method, traced_write)
@@ -0,0 +1,104 @@
+import io
+import json
+import tempfile
+from argparse import Namespace
+from pathlib import Path
+
+from compilation_engine import CompilationEngine
+from SyntaxAnalyzer import compile_file
+from token_table import TokenCursor, tokenize_source
+from tracing import Tracer, trace_engine, traced_vm_methods
+
+point = """class Point {
+    field int x;
+    method int getX(int d) {
+        var int y;
+        let y = x + d;
+        do Math.abs(y);
+        return y;
+    }
+}"""
+args = Namespace(emit="vm", readable_vm=False, scanner="buffer")
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = Path(tmp) / "Point.jack"
+    path.write_text(point)
+
+    trace_path = Path(tmp) / "trace.jsonl"
+    tracer = Tracer(trace_path)
+    compile_file(path, args, frozenset(), tracer=tracer)
+    tracer.close()
+    traced_vm = path.with_suffix(".vm").read_text()
+    events = [json.loads(line) for line in trace_path.read_text().splitlines()]
+
+    assert events[0] == {"event": "file", "source": str(path)}
+    where = {"class": "Point", "subroutine": "getX"}
+
+    # Declarations of both scopes, with their indexes
+    declarations = [event for event in events if event["event"] == "declare"]
+    assert declarations[0] == {
+        "event": "declare", "scope": "class", "name": "x", "type": "int",
+        "kind": "FEILD", "index": 0, "class": "Point", "subroutine": None
+    }
+    assert [(event["name"], event["kind"], event["index"])
+        for event in declarations[1:]] == [
+        ("this", "ARG", 0), ("d", "ARG", 1), ("y", "VAR", 0)
+    ]
+    assert all(event["scope"] == "subroutine" for event in declarations[1:])
+
+    # Lookups, found or not
+    lookups = [event for event in events if event["event"] == "lookup"]
+    assert lookups[:3] == [
+        {"event": "lookup", "name": "y",
+         "found": {"kind": "VAR", "type": "int", "index": 0}, **where},
+        {"event": "lookup", "name": "x",
+         "found": {"kind": "FEILD", "type": "int", "index": 0}, **where},
+        {"event": "lookup", "name": "d",
+         "found": {"kind": "ARG", "type": "int", "index": 1}, **where}
+    ]
+    assert {"event": "lookup", "name": "Math", "found": None, **where} \
+        in lookups
+
+    # One event per VM command, in the order written
+    commands = [
+        (event["command"], event["args"])
+        for event in events if event["event"] == "vm"
+    ]
+    assert commands[:2] == [
+        ("function", ["Point.getX", 1]), ("push", ["ARG", 0])
+    ]
+    assert ("arithmetic", ["ADD"]) in commands
+    assert ("call", ["Math.abs", 1]) in commands
+    assert commands[-1] == ("return", [])
+    assert len(commands) == len(traced_vm.splitlines())
+    assert all(
+        event["class"] == "Point" and event["subroutine"] == "getX"
+        for event in events if event["event"] == "vm"
+    )
+
+    # Nothing is traced when disabled, and the output is the same
+    tracer = Tracer(trace_path)
+    compile_file(path, args, frozenset())
+    tracer.close()
+    assert trace_path.read_text() == ""
+    assert path.with_suffix(".vm").read_text() == traced_vm
+
+# Only traced engines have their methods wrapped
+engines = [
+    CompilationEngine(
+        TokenCursor(tokenize_source(point, "Point.jack")), None, "vm",
+        vm_stream=io.StringIO()
+    )
+    for _ in range(2)
+]
+with tempfile.TemporaryDirectory() as tmp:
+    tracer = Tracer(Path(tmp) / "trace.jsonl")
+    trace_engine(engines[1], tracer, "Point.jack")
+    tracer.close()
+for engine, traced in zip(engines, (False, True)):
+    assert ("lookup_st" in vars(engine)) == traced
+    assert ("define" in vars(engine.class_level_st)) == traced
+    assert all((method in vars(engine.vm_writer)) == traced
+        for method in traced_vm_methods)
+
+print("All assertions are True!")
@@ -0,0 +1,3 @@
+# Version of the compiler, part of every cache key.
+# Bump it whenever the generated output changes
+COMPILER_VERSION = "1.3.1"
@@ -0,0 +1,280 @@
+# Runs VM code and estimates its cost on the Hack platform
+from pathlib import Path
+
+from compilation_engine import to_word
+
+# RAM addresses of the VM registers
+SP, LCL, ARG, THIS, THAT = 0, 1, 2, 3, 4
+TEMP_BASE = 5
+STATIC_BASE = 16
+STACK_BASE = 256
+HEAP_BASE = 2048
+
+# Segment name -> register holding its base address
+based_segments = {
+    "local": LCL,
+    "argument": ARG,
+    "this": THIS,
+    "that": THAT
+}
+
+# Hack instructions of each VM command, as written
+# by a straightforward VM translator
+hack_cycles = {
+    "push constant": 7,
+    "push based": 10,
+    "push fixed": 7,
+    "pop based": 13,
+    "pop fixed": 5,
+    "add": 5, "sub": 5, "and": 5, "or": 5,
+    "neg": 3, "not": 3,
+    "eq": 13, "gt": 13, "lt": 13,
+    "goto": 2,
+    "if-goto": 5,
+    "call": 44,
+    "function": 2,
+    "function local": 7,
+    "return": 40
+}
+
+# Guessed cost of an OS routine run natively
+NATIVE_CYCLES = 100
+
+class VMEmulator:
+    '''Executes the VM code of a set of .vm files. Counts
+    executed commands and estimated Hack cycles. OS routines
+    not given as VM code run natively, see `natives`'''
+    def __init__(self) -> None:
+        self.ram = [0] * 0x8000
+        self.ram[SP] = STACK_BASE
+
+        # Loaded code as (command, arg1, arg2)
+        self.code = []
+        # Function name -> index of its first command
+        self.functions = {}
+        # Next free static address
+        self.next_static = STATIC_BASE
+        # Next free heap address
+        self.heap = HEAP_BASE
+
+        # Statistics
+        self.steps = 0
+        self.cycles = 0
+        self.calls = {}
+
+        # OS routines run natively: name -> routine
+        self.natives = {
+            "Memory.alloc": self.alloc,
+            "Memory.deAlloc": lambda address: 0,
+            "Array.new": self.alloc,
+            "Array.dispose": lambda array: 0,
+            "Sys.wait": lambda duration: 0,
+            "String.new": self.new_string,
+            "String.appendChar": self.append_char,
+            "String.dispose": lambda string: 0,
+            "Output.printString": lambda string: 0,
+            "Output.printInt": lambda value: 0,
+            "Output.println": lambda: 0
+        }
+
+    def load(self, text: str) -> None:
+        '''loads the VM code of one .vm file'''
+        statics = {}
+        labels = {}
+        jumps = []
+        function = None
+
+        for line in text.splitlines():
+            words = line.split("//")[0].split()
+            if not words or words[0].startswith("-"):
+                continue
+
+            command = words[0]
+            if command == "function":
+                function = words[1]
+                self.functions[function] = len(self.code)
+                self.code.append((command, int(words[2]), None))
+            elif command == "label":
+                labels[(function, words[1])] = len(self.code)
+            elif command in ("goto", "if-goto"):
+                jumps.append(len(self.code))
+                self.code.append((command, (function, words[1]), None))
+            elif command in ("push", "pop"):
+                segment, index = words[1], int(words[2])
+                if segment == "static":
+                    if index not in statics:
+                        statics[index] = self.next_static
+                        self.next_static += 1
+                    segment, index = "fixed", statics[index]
+                elif segment == "temp":
+                    segment, index = "fixed", TEMP_BASE + index
+                elif segment == "pointer":
+                    segment, index = "fixed", THIS + index
+                self.code.append((command, segment, index))
+            elif command == "call":
+                self.code.append((command, words[1], int(words[2])))
+            else:
+                self.code.append((command, None, None))
+
+        # Labels are local to their function
+        for index in jumps:
+            command, label, _ = self.code[index]
+            if label not in labels:
+                raise ValueError(f"Unknown label {label[1]} in {label[0]}")
+            self.code[index] = (command, labels[label], None)
+
+    def load_dir(self, directory: Path) -> None:
+        '''loads every .vm file of a directory'''
+        for path in sorted(directory.glob("*.vm")):
+            self.load(path.read_text())
+
+    def alloc(self, size):
+        '''Memory.alloc, never freeing'''
+        address = self.heap
+        self.heap += size
+        return address
+
+    def new_string(self, max_length):
+        '''String.new, as the length and then the characters'''
+        string = self.alloc(max_length + 1)
+        self.ram[string] = 0
+        return string
+
+    def append_char(self, string, char):
+        '''String.appendChar'''
+        self.ram[string] += 1
+        self.ram[string + self.ram[string]] = char
+        return string
+
+    def string_at(self, string: int) -> str:
+        '''returns the text of a String made by String.new'''
+        length = self.ram[string]
+        return "".join(map(chr, self.ram[string + 1:string + 1 + length]))
+
+    def push(self, value):
+        ram = self.ram
+        ram[ram[SP]] = value
+        ram[SP] += 1
+
+    def pop(self):
+        ram = self.ram
+        ram[SP] -= 1
+        return ram[ram[SP]]
+
+    def run(self, name: str, *args, max_steps: int = 10 ** 8) -> int:
+        '''calls a function and returns its result'''
+        ram = self.ram
+        code = self.code
+
+        for arg in args:
+            self.push(to_word(arg))
+
+        # Return into nowhere, ending the run
+        pc = self.call(name, len(args), -1)
+        while pc >= 0:
+            command, arg1, arg2 = code[pc]
+            pc += 1
+            self.steps += 1
+            if self.steps > max_steps:
+                raise RuntimeError(f"No return after {max_steps} steps")
+
+            if command == "push":
+                if arg1 == "constant":
+                    value = arg2
+                elif arg1 == "fixed":
+                    value = ram[arg2]
+                else:
+                    value = ram[ram[based_segments[arg1]] + arg2]
+                ram[ram[SP]] = value
+                ram[SP] += 1
+                self.cycles += hack_cycles[
+                    "push constant" if arg1 == "constant"
+                    else f"push {'fixed' if arg1 == 'fixed' else 'based'}"
+                ]
+            elif command == "pop":
+                ram[SP] -= 1
+                if arg1 == "fixed":
+                    ram[arg2] = ram[ram[SP]]
+                    self.cycles += hack_cycles["pop fixed"]
+                else:
+                    ram[ram[based_segments[arg1]] + arg2] = ram[ram[SP]]
+                    self.cycles += hack_cycles["pop based"]
+            elif command == "goto":
+                pc = arg1
+                self.cycles += hack_cycles["goto"]
+            elif command == "if-goto":
+                if self.pop() != 0:
+                    pc = arg1
+                self.cycles += hack_cycles["if-goto"]
+            elif command == "call":
+                pc = self.call(arg1, arg2, pc)
+            elif command == "function":
+                for _ in range(arg1):
+                    self.push(0)
+                self.cycles += hack_cycles["function"] \
+                    + arg1 * hack_cycles["function local"]
+            elif command == "return":
+                frame = ram[LCL]
+                return_to = ram[frame - 5]
+                ram[ram[ARG]] = ram[ram[SP] - 1]
+                ram[SP] = ram[ARG] + 1
+                ram[THAT] = ram[frame - 1]
+                ram[THIS] = ram[frame - 2]
+                ram[ARG] = ram[frame - 3]
+                ram[LCL] = ram[frame - 4]
+                pc = return_to
+                self.cycles += hack_cycles["return"]
+            else:
+                self.arithmetic(command)
+
+        return self.pop()
+
+    def call(self, name, nArgs, return_to):
+        '''calls a function, returns where to continue'''
+        ram = self.ram
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+        if name not in self.functions:
+            if name not in self.natives:
+                raise ValueError(f"Unknown function {name}")
+            args = [self.pop() for _ in range(nArgs)][::-1]
+            self.push(to_word(self.natives[name](*args)))
+            self.cycles += NATIVE_CYCLES
+            return return_to
+
+        self.push(return_to)
+        for register in (LCL, ARG, THIS, THAT):
+            self.push(ram[register])
+        ram[ARG] = ram[SP] - nArgs - 5
+        ram[LCL] = ram[SP]
+        self.cycles += hack_cycles["call"]
+        return self.functions[name]
+
+    def arithmetic(self, command):
+        '''runs an arithmetic-logical command'''
+        self.cycles += hack_cycles[command]
+        if command == "neg":
+            self.push(to_word(-self.pop()))
+            return
+        if command == "not":
+            self.push(to_word(~self.pop()))
+            return
+
+        y = self.pop()
+        x = self.pop()
+        if command == "add":
+            self.push(to_word(x + y))
+        elif command == "sub":
+            self.push(to_word(x - y))
+        elif command == "and":
+            self.push(to_word(x & y))
+        elif command == "or":
+            self.push(to_word(x | y))
+        elif command == "eq":
+            self.push(-1 if x == y else 0)
+        elif command == "gt":
+            self.push(-1 if x > y else 0)
+        elif command == "lt":
+            self.push(-1 if x < y else 0)
+        else:
+            raise ValueError(f"Unknown command {command}")
@@ -0,0 +1,35 @@
+from enum import Enum
+
+class Opcode(Enum):
+    '''VM Command Enumeration'''
+    PUSH       = 0
+    POP        = 1
+    ARITHMETIC = 2
+    LABEL      = 3
+    GOTO       = 4
+    IF         = 5
+    CALL       = 6
+    FUNCTION   = 7
+    RETURN     = 8
+    COMMENT    = 9
+
+class Instruction:
+    '''One VM command held in memory. `arg1` is the
+    segment, arithmetic type, label, name or comment
+    text and `arg2` the index or count, if any'''
+    __slots__ = ("op", "arg1", "arg2")
+
+    def __init__(self, op: Opcode, arg1=None, arg2=None) -> None:
+        self.op = op
+        self.arg1 = arg1
+        self.arg2 = arg2
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Instruction) \
+            and self.op == other.op \
+            and self.arg1 == other.arg1 \
+            and self.arg2 == other.arg2
+
+    def __repr__(self) -> str:
+        args = [a for a in (self.arg1, self.arg2) if a is not None]
+        return f"Instruction({', '.join(map(repr, [self.op, *args]))})"
@@ -1,6 +1,8 @@
 from enum import Enum # for creating enum classes 
 from pathlib import Path
 
+from vm_ir import Opcode, Instruction
+
 class SegmentType(Enum):
     '''Memory Segment Type Enumeration'''
     CONST   = 0
@@ -12,23 +14,20 @@ class SegmentType(Enum):
     POINTER = 6
     TEMP    = 7
 
+# VM name of each memory segment
+segment_names = {
+    SegmentType.CONST:   "constant",
+    SegmentType.ARG:     "argument",
+    SegmentType.LOCAL:   "local",
+    SegmentType.STATIC:  "static",
+    SegmentType.THIS:    "this",
+    SegmentType.THAT:    "that",
+    SegmentType.POINTER: "pointer",
+    SegmentType.TEMP:    "temp"
+}
+
 def segment_type_to_string(st: SegmentType) -> str:
-    if st == SegmentType.CONST:
-        return "constant"
-    if st == SegmentType.ARG:
-        return "argument"
-    if st == SegmentType.LOCAL:
-        return "local"
-    if st == SegmentType.STATIC:
-        return "static"
-    if st == SegmentType.THIS:
-        return "this"
-    if st == SegmentType.THAT:
-        return "that"
-    if st == SegmentType.POINTER:
-        return "pointer"
-    if st == SegmentType.TEMP:
-        return "temp"
+    return segment_names.get(st)
 
 class ArithmeticCType(Enum):
     ADD = 0
@@ -43,103 +42,180 @@ class ArithmeticCType(Enum):
     MULT = 9
     DIV = 10
 
+# VM command of each arithmetic-logical operation
+arithmetic_commands = {
+    ArithmeticCType.ADD:  "add",
+    ArithmeticCType.SUB:  "sub",
+    ArithmeticCType.NEG:  "neg",
+    ArithmeticCType.EQ:   "eq",
+    ArithmeticCType.GT:   "gt",
+    ArithmeticCType.LT:   "lt",
+    ArithmeticCType.AND:  "and",
+    ArithmeticCType.OR:   "or",
+    ArithmeticCType.NOT:  "not",
+    ArithmeticCType.MULT: "call Math.multiply 2",
+    ArithmeticCType.DIV:  "call Math.divide 2"
+}
+
 def arithmetic_ct_to_string(t: ArithmeticCType) -> str:
-    if t == ArithmeticCType.ADD:
-        return "add"
-    if t == ArithmeticCType.SUB:
-        return "sub"
-    if t == ArithmeticCType.NEG:
-        return "neg"
-    if t == ArithmeticCType.EQ:
-        return "eq"
-    if t == ArithmeticCType.GT:
-        return "gt"
-    if t == ArithmeticCType.LT:
-        return "lt"
-    if t == ArithmeticCType.AND:
-        return "and"
-    if t == ArithmeticCType.OR:
-        return "or"
-    if t == ArithmeticCType.NOT:
-        return "not"
-    if t == ArithmeticCType.MULT:
-        return "call Math.multiply 2"
-    if t == ArithmeticCType.DIV:
-        return "call Math.divide 2"
+    return arithmetic_commands.get(t)
+
+# Preformatted command lines and prefixes
+push_prefixes = {
+    st: f"push {name} " for st, name in segment_names.items()
+}
+pop_prefixes = {
+    st: f"pop {name} " for st, name in segment_names.items()
+}
+arithmetic_lines = {
+    t: f"{command}\n" for t, command in arithmetic_commands.items()
+}
+
+# Text of each command, from its instruction
+line_formats = {
+    Opcode.PUSH:       lambda i: f"{push_prefixes[i.arg1]}{i.arg2}\n",
+    Opcode.POP:        lambda i: f"{pop_prefixes[i.arg1]}{i.arg2}\n",
+    Opcode.ARITHMETIC: lambda i: arithmetic_lines[i.arg1],
+    Opcode.LABEL:      lambda i: f"label {i.arg1}\n",
+    Opcode.GOTO:       lambda i: f"goto {i.arg1}\n",
+    Opcode.IF:         lambda i: f"if-goto {i.arg1}\n",
+    Opcode.CALL:       lambda i: f"call {i.arg1} {i.arg2}\n",
+    Opcode.FUNCTION:   lambda i: f"function {i.arg1} {i.arg2}\n",
+    Opcode.RETURN:     lambda i: "return\n",
+    Opcode.COMMENT:    lambda i: f"// {i.arg1}\n"
+}
+
+def format_instruction(instruction: Instruction) -> str:
+    '''returns the VM text of an instruction'''
+    return line_formats[instruction.op](instruction)
+
+# Characters buffered before a write to the file
+DEFAULT_BUFFER_SIZE = 1 << 16
 
 class VMWriter:
-    def __init__(self, file_path: Path) -> None:
-        '''creates a new ouput vm file'''
-        self.out_stream = file_path.open("w")
+    def __init__(self, file_path: Path,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        readable: bool = False, passes: tuple = (),
+        ir: list = None) -> None:
+        '''creates a new ouput vm file, discarding
+        all output if `file_path` is None. `file_path` may
+        also be an open text stream, left open by close().
+        Output is written in blocks of about `buffer_size`
+        characters, `readable` separates functions with a
+        line. Each of `passes` rewrites the instructions of
+        a subroutine before they are written, and the
+        written instructions are added to `ir` if given'''
+        self.owns_stream = True
+        if file_path is None:
+            # Nothing to open, or to leave open
+            self.out_stream = None
+        elif hasattr(file_path, "write"):
+            self.out_stream = file_path
+            self.owns_stream = False
+        else:
+            self.out_stream = file_path.open("w")
+
+        # Lines not yet written to the file
+        self.buffer = []
+        self.buffered = 0
+        self.buffer_size = buffer_size
+        self.readable = readable
+        self.passes = passes
+        self.ir = ir
+
+        # Instructions of the subroutine being compiled
+        self.function = []
 
     def write_push(self, segment: SegmentType, index: int) -> None:
-        '''writes a VM push command'''
-        self.write_command(
-            "push",
-            segment_type_to_string(segment),
-            str(index)
-        )
+        '''adds a VM push command'''
+        self.function.append(Instruction(Opcode.PUSH, segment, index))
     
     def write_pop(self, segment: SegmentType, index: int) -> None:
-        '''writes a VM pop command'''
+        '''adds a VM pop command'''
         if segment == SegmentType.CONST:
             raise AssertionError("cannot pop into CONST segment")
         
-        self.write_command(
-            "pop",
-            segment_type_to_string(segment),
-            str(index)
-        )
+        self.function.append(Instruction(Opcode.POP, segment, index))
     
     def write_arithmetic(self, command: ArithmeticCType) -> None:
-        '''writes a VM arithmetic-logical command'''
-        self.write_command(
-            arithmetic_ct_to_string(command)
-        )
+        '''adds a VM arithmetic-logical command'''
+        self.function.append(Instruction(Opcode.ARITHMETIC, command))
 
     def write_label(self, label: str) -> None:
-        '''writes a VM `label` command'''
-        self.write_command("label", label)
+        '''adds a VM `label` command'''
+        self.function.append(Instruction(Opcode.LABEL, label))
 
     def write_goto(self, label: str) -> None:
-        '''writes a VM `goto` command'''
-        self.write_command("goto", label)
+        '''adds a VM `goto` command'''
+        self.function.append(Instruction(Opcode.GOTO, label))
 
     def write_if(self, label: str) -> None:
-        '''writes a VM `if-goto` command'''
-        self.write_command("if-goto", label)
+        '''adds a VM `if-goto` command'''
+        self.function.append(Instruction(Opcode.IF, label))
 
     def write_call(self, name: str, nArgs: int) -> None:
-        '''writes a VM `call` command'''
-        self.write_command(
-            "call",
-            name,
-            str(nArgs)
-        )
+        '''adds a VM `call` command'''
+        self.function.append(Instruction(Opcode.CALL, name, nArgs))
 
     def write_function(self, name: str, nLocals: int) -> None:
-        '''writes a VM `function` command'''
-        self.write_command(
-            "function",
-            name,
-            str(nLocals)
-        )
+        '''adds a VM `function` command'''
+        self.function.append(Instruction(Opcode.FUNCTION, name, nLocals))
 
     def write_return(self) -> None:
-        '''writes a VM `return` command'''
-        self.write_command("return")
-        self.out_stream.write("\n--------------\n")
-    
-    def write_command(self, *words) -> None:
-        '''helper method to write command to vm file'''
-        for word in words:
-            self.out_stream.write(word + " ")
-        # add a newline
-        self.out_stream.write("\n")
+        '''adds a VM `return` command'''
+        self.function.append(Instruction(Opcode.RETURN))
     
     def write_comment(self, comment: str) -> None:
-        '''writes a line comment to the VM file'''
-        self.write_command("//", comment)
+        '''adds a line comment'''
+        self.function.append(Instruction(Opcode.COMMENT, comment))
+
+    def end_function(self) -> None:
+        '''writes out the instructions of the
+        subroutine compiled last'''
+        code = self.function
+        for optimize in self.passes:
+            code = optimize(code)
+        if self.ir is not None:
+            self.ir.extend(code)
+        self.write_instructions(code)
+        self.function = []
+
+    def write_instructions(self, instructions: list) -> None:
+        '''formats and buffers a list of instructions'''
+        if self.readable:
+            for instruction in instructions:
+                self.write_line(format_instruction(instruction))
+                if instruction.op == Opcode.RETURN:
+                    self.write_line("\n--------------\n")
+            return
+
+        self.write_line("".join([
+            line_formats[instruction.op](instruction)
+            for instruction in instructions
+        ]))
+
+    def write_line(self, line: str) -> None:
+        '''buffers a formatted line, writing the
+        buffer out once it is full'''
+        self.buffer.append(line)
+        self.buffered += len(line)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        '''writes all buffered lines to the file'''
+        if self.buffer:
+            if self.out_stream is not None:
+                self.out_stream.write("".join(self.buffer))
+            self.buffer.clear()
+            self.buffered = 0
+
+    def close(self) -> None:
+        '''writes what is left and closes the vm file'''
+        self.end_function()
+        self.flush()
+        if self.owns_stream and self.out_stream is not None:
+            self.out_stream.close()
 
 # TESTING ===========================================
 if __name__ == "__main__":    
@@ -178,3 +254,4 @@ if __name__ == "__main__":
     writer.write_call("alloc", 1)
     writer.write_call("free", 2)
     writer.write_return()
+    writer.close()
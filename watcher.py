@@ -0,0 +1,160 @@
+# Polls a directory tree for changed .jack files and
+# recompiles them, and the classes using a changed
+# interface, in one warm process
+import os
+from pathlib import Path
+from time import perf_counter, sleep, time_ns
+
+from build_manifest import class_interface, referenced_names
+from token_table import tokenize_source
+
+# Seconds between polls of the tree
+DEFAULT_INTERVAL = 0.01
+
+# Seconds a burst of changes must be quiet before compiling,
+# and the longest wait for a burst to end
+DEFAULT_SETTLE = 0.01
+MAX_SETTLE = 1.0
+
+def scan_tree(root: Path) -> dict:
+    '''returns the (mtime, size) of each .jack file under `root`'''
+    snapshot = {}
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    pending.append(entry.path)
+                elif entry.name.endswith(".jack"):
+                    stat = entry.stat()
+                    snapshot[Path(entry.path)] = (
+                        stat.st_mtime_ns, stat.st_size
+                    )
+    return snapshot
+
+class Watcher:
+    '''Compiles the .jack files under `root` with
+    `compile_path`, a function of a path, then again
+    as they change. Token tables read for finding the
+    changed interfaces go to `cache`, for the compile'''
+    def __init__(self, root: Path, compile_path, cache=None,
+        interval: float = DEFAULT_INTERVAL,
+        settle: float = DEFAULT_SETTLE) -> None:
+        self.root = root
+        self.compile_path = compile_path
+        self.cache = cache
+        self.interval = interval
+        self.settle = settle
+
+        # Path -> (mtime, size) at the last poll
+        self.snapshot = {}
+        # Path -> interface and referenced names of its class
+        self.interfaces = {}
+        self.references = {}
+
+    def poll(self) -> tuple:
+        '''returns the files changed or added and the files
+        removed since the last poll'''
+        snapshot = scan_tree(self.root)
+        changed = {
+            path for path, stat in snapshot.items()
+            if self.snapshot.get(path) != stat
+        }
+        removed = self.snapshot.keys() - snapshot.keys()
+        self.snapshot = snapshot
+        return changed, removed
+
+    def wait_for_changes(self) -> tuple:
+        '''polls until files change, then until the burst of
+        changes is quiet. Returns the changed and removed files'''
+        changed, removed = self.poll()
+        while not changed and not removed:
+            sleep(self.interval)
+            changed, removed = self.poll()
+
+        quiet_by = perf_counter() + MAX_SETTLE
+        while perf_counter() < quiet_by:
+            sleep(self.settle)
+            more_changed, more_removed = self.poll()
+            if not more_changed and not more_removed:
+                break
+            changed = (changed | more_changed) - more_removed
+            removed = (removed | more_removed) - more_changed
+        return changed, removed
+
+    def affected(self, changed: set, removed: set) -> list:
+        '''returns the files to compile for a set of changes:
+        the changed files, and the files of the same directory
+        which use a class whose interface changed'''
+        changed_classes = set()
+        for path in removed:
+            changed_classes.add((path.parent, path.stem))
+            self.interfaces.pop(path, None)
+            self.references.pop(path, None)
+
+        for path in changed:
+            try:
+                source = path.read_bytes()
+                table = tokenize_source(source.decode("utf-8"), str(path))
+                if self.cache is not None:
+                    self.cache.store_tokens(self.cache.key(source), table)
+                interface = class_interface(table)
+                self.references[path] = set(referenced_names(table))
+            except (OSError, SyntaxError, UnicodeDecodeError):
+                # Reported when the file is compiled
+                interface = None
+                self.references[path] = set()
+            if self.interfaces.get(path) != interface \
+                or path not in self.interfaces:
+                changed_classes.add((path.parent, path.stem))
+            self.interfaces[path] = interface
+
+        affected = set(changed)
+        for path, names in self.references.items():
+            if any(directory == path.parent and name in names
+                for directory, name in changed_classes):
+                affected.add(path)
+        return sorted(affected)
+
+    def build(self, paths: list) -> list:
+        '''compiles `paths`, returns the error of each file
+        which failed'''
+        errors = []
+        for path in paths:
+            try:
+                self.compile_path(path)
+            except Exception as error:
+                errors.append(f"{path}: {type(error).__name__}: {error}")
+        return errors
+
+    def check(self) -> tuple:
+        '''waits for changes and compiles the affected files.
+        Returns them, their errors and the milliseconds from
+        the last save to the written outputs'''
+        changed, removed = self.wait_for_changes()
+        paths = self.affected(changed, removed)
+        errors = self.build(paths)
+
+        last_save = max(
+            (self.snapshot[path][0] for path in changed), default=time_ns()
+        )
+        return paths, errors, (time_ns() - last_save) / 1e6
+
+    def run(self, report=print) -> None:
+        '''compiles every file, then watches until interrupted'''
+        start = perf_counter()
+        changed, _ = self.poll()
+        paths = self.affected(changed, set())
+        for error in self.build(paths):
+            report(f"error: {error}")
+        report(
+            f"watch: compiled {len(paths)} files in "
+            f"{(perf_counter() - start) * 1e3:.1f} ms, watching {self.root}"
+        )
+
+        while True:
+            paths, errors, latency = self.check()
+            for error in errors:
+                report(f"error: {error}")
+            names = ", ".join(path.name for path in paths) or "nothing"
+            report(f"watch: compiled {names}, {latency:.1f} ms after save")
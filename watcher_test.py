@@ -0,0 +1,50 @@
+import tempfile
+from pathlib import Path
+
+from watcher import Watcher
+
+point = "class Point { method int getX() { return 1; } }"
+main = "class Main { function void main() { do Point.getX(); return; } }"
+
+with tempfile.TemporaryDirectory() as tmp:
+    root = Path(tmp)
+    (root / "game").mkdir()
+    (root / "game" / "Point.jack").write_text(point)
+    (root / "game" / "Main.jack").write_text(main)
+    # Same class name in another directory of the tree
+    (root / "Point.jack").write_text(point)
+
+    compiled = []
+    watcher = Watcher(root, compiled.append, settle=0)
+    changed, removed = watcher.poll()
+    assert len(watcher.affected(changed, removed)) == 3
+    assert watcher.poll() == (set(), set())
+
+    # A new body compiles its own class only
+    (root / "game" / "Point.jack").write_text(point.replace("1", "2"))
+    paths, errors, latency = watcher.check()
+    assert [path.name for path in paths] == ["Point.jack"] and not errors
+    assert latency >= 0
+
+    # A new interface compiles the classes of the directory using it
+    (root / "game" / "Point.jack").write_text(point.replace("()", "(int y)"))
+    paths, _, _ = watcher.check()
+    assert paths == [root / "game" / "Main.jack", root / "game" / "Point.jack"]
+
+    # Removing a class compiles its users
+    (root / "game" / "Point.jack").unlink()
+    paths, _, _ = watcher.check()
+    assert paths == [root / "game" / "Main.jack"]
+
+def failing(path):
+    raise AssertionError("Invalid Syntax!")
+
+with tempfile.TemporaryDirectory() as tmp:
+    (Path(tmp) / "Main.jack").write_text(main)
+    watcher = Watcher(Path(tmp), failing)
+    paths = watcher.affected(*watcher.poll())
+    assert watcher.build(paths) == [
+        f"{Path(tmp) / 'Main.jack'}: AssertionError: Invalid Syntax!"
+    ]
+
+print("All assertions are True!")
@@ -0,0 +1,317 @@
+# Writes the XML parse tree of a syntax tree
+from jack_ast import (
+    LetStatement, IfStatement, WhileStatement, DoStatement, ReturnStatement,
+    Expression, IntegerConstant, StringConstant, KeywordConstant,
+    VarTerm, ArrayTerm, SubroutineCall, ParenTerm, UnaryTerm
+)
+from symbol_table import SymbolKind, SymbolTable
+
+# Type names which are keywords
+keyword_types = {"int", "char", "boolean", "void"}
+
+# Symbol kind of each class variable keyword
+class_var_kinds = {
+    "static": SymbolKind.STATIC,
+    "field": SymbolKind.FEILD
+}
+
+def keyword_tag(v):
+    return f"<keyword> {v} </keyword>\n"
+
+def identifier_tag(v):
+    return f"<identifier> {v} </identifier>\n"
+
+def symbol_tag(v):
+    return f"<symbol> {v} </symbol>\n"
+
+class Term:
+    '''a term node waiting to be written within term tags'''
+    __slots__ = ("node",)
+
+    def __init__(self, node) -> None:
+        self.node = node
+
+class XMLGenerator:
+    '''Visits a syntax tree, writing its XML parse tree
+    through `write`. Keeps its own symbol tables for the
+    declared and used variable notes'''
+    def __init__(self, write) -> None:
+        self.write = write
+        self.class_name = None
+        self.class_level_st = SymbolTable()
+        self.subroutine_level_st = SymbolTable()
+
+        # Statement type -> method writing it
+        self.statement_writers = {
+            LetStatement: self.write_let,
+            IfStatement: self.write_if,
+            WhileStatement: self.write_while,
+            DoStatement: self.write_do,
+            ReturnStatement: self.write_return
+        }
+
+        # Term type -> method listing its parts
+        self.term_writers = {
+            IntegerConstant: self.integer_constant_parts,
+            StringConstant: self.string_constant_parts,
+            KeywordConstant: self.keyword_constant_parts,
+            VarTerm: self.var_term_parts,
+            ArrayTerm: self.array_term_parts,
+            SubroutineCall: self.call_parts,
+            ParenTerm: self.paren_term_parts,
+            UnaryTerm: self.unary_term_parts
+        }
+
+    def keyword(self, v):
+        self.write(keyword_tag(v))
+
+    def identifier(self, v):
+        self.write(identifier_tag(v))
+
+    def symbol(self, v):
+        self.write(symbol_tag(v))
+
+    def type_name(self, v):
+        '''writes a type, a keyword for built-in types'''
+        if v in keyword_types:
+            self.keyword(v)
+        else:
+            self.identifier(v)
+
+    def declared(self, table, name, var_type, var_kind):
+        '''defines a variable and writes its properties'''
+        table.define(name, var_type, var_kind)
+        self.write(
+            f"\n===DECLARED===\nkind: {var_kind}, type: {var_type}, "
+            f"index: {table.get_index_of(name)}\n======="
+        )
+
+    def write_class(self, node):
+        self.class_name = node.name
+        self.write("<class>\n")
+        self.keyword("class")
+        self.identifier(node.name)
+        self.write("\n===DECLARED===\nclass name\n=======")
+        self.symbol("{")
+
+        for var_dec in node.var_decs:
+            self.write_class_var_dec(var_dec)
+        for subroutine in node.subroutines:
+            self.write_subroutine(subroutine)
+
+        self.symbol("}")
+        self.write("</class>\n")
+
+    def write_class_var_dec(self, node):
+        self.write("<classVarDec>\n")
+        self.keyword(node.kind)
+        self.type_name(node.type)
+        self.write_names(
+            node.names, self.class_level_st, node.type,
+            class_var_kinds[node.kind]
+        )
+        self.symbol(";")
+        self.write("</classVarDec>\n")
+
+    def write_names(self, names, table, var_type, var_kind):
+        '''writes varName (',' varName)* of a declaration'''
+        for i, name in enumerate(names):
+            if i > 0:
+                self.symbol(",")
+            self.identifier(name)
+            self.declared(table, name, var_type, var_kind)
+
+    def write_subroutine(self, node):
+        self.subroutine_level_st.reset_table()
+        if node.kind == "method":
+            self.subroutine_level_st.define(
+                "this", self.class_name, SymbolKind.ARG
+            )
+
+        self.write("<subroutineDec>\n")
+        self.keyword(node.kind)
+        self.type_name(node.return_type)
+        self.identifier(node.name)
+        self.symbol("(")
+
+        self.write("<parameterList>\n")
+        for i, (var_type, name) in enumerate(node.parameters):
+            if i > 0:
+                self.symbol(",")
+            self.type_name(var_type)
+            self.identifier(name)
+            self.declared(
+                self.subroutine_level_st, name, var_type, SymbolKind.ARG
+            )
+        self.write("</parameterList>\n")
+        self.symbol(")")
+
+        self.write("<subroutineBody>\n")
+        self.symbol("{")
+        for var_dec in node.var_decs:
+            self.write("<varDec>\n")
+            self.keyword("var")
+            self.type_name(var_dec.type)
+            self.write_names(
+                var_dec.names, self.subroutine_level_st, var_dec.type,
+                SymbolKind.VAR
+            )
+            self.symbol(";")
+            self.write("</varDec>\n")
+
+        self.write_statements(node.statements)
+        self.symbol("}")
+        self.write("</subroutineBody>\n")
+        self.write("</subroutineDec>\n")
+
+    def write_statements(self, statements):
+        self.write("<statements>\n")
+        for statement in statements:
+            self.statement_writers[type(statement)](statement)
+        self.write("</statements>\n")
+
+    def write_let(self, node):
+        self.write("<letStatement>\n")
+        self.keyword("let")
+        self.identifier(node.name)
+
+        # Write variable properties
+        table = self.subroutine_level_st
+        if table.get_kind_of(node.name) == SymbolKind.NONE:
+            table = self.class_level_st
+        if table.get_kind_of(node.name) == SymbolKind.NONE:
+            raise AssertionError(f"Undeclared variable: {node.name}")
+        self.write(
+            f"\n===USED===\nkind: {table.get_kind_of(node.name)}, "
+            f"type: {table.get_type_of(node.name)}, "
+            f"index: {table.get_index_of(node.name)}\n======="
+        )
+
+        if node.index is not None:
+            self.symbol("[")
+            self.write_expression(node.index)
+            self.symbol("]")
+
+        self.symbol("=")
+        self.write_expression(node.value)
+        self.symbol(";")
+        self.write("</letStatement>\n")
+
+    def write_if(self, node):
+        self.write("<ifStatement>\n")
+        self.keyword("if")
+        self.write_block(node.condition, node.statements)
+
+        if node.else_statements is not None:
+            self.keyword("else")
+            self.symbol("{")
+            self.write_statements(node.else_statements)
+            self.symbol("}")
+
+        self.write("</ifStatement>\n")
+
+    def write_while(self, node):
+        self.write("<whileStatement>\n")
+        self.keyword("while")
+        self.write_block(node.condition, node.statements)
+        self.write("</whileStatement>\n")
+
+    def write_block(self, condition, statements):
+        '''writes '(' expression ')' '{' statements '}' '''
+        self.symbol("(")
+        self.write_expression(condition)
+        self.symbol(")")
+        self.symbol("{")
+        self.write_statements(statements)
+        self.symbol("}")
+
+    def write_do(self, node):
+        self.write("<doStatement>\n")
+        self.keyword("do")
+        self.write_call(node.call)
+        self.symbol(";")
+        self.write("</doStatement>\n")
+
+    def write_return(self, node):
+        self.write("<returnStatement>\n")
+        self.keyword("return")
+        if node.value is not None:
+            self.write_expression(node.value)
+        self.symbol(";")
+        self.write("</returnStatement>\n")
+
+    def write_expression(self, node):
+        '''writes an expression, or a call without term tags.
+        Parts of nested expressions wait on an explicit stack
+        of tags and nodes, so any nesting depth writes'''
+        stack = [node]
+        while stack:
+            part = stack.pop()
+            if type(part) is str:
+                self.write(part)
+            elif type(part) is Expression:
+                stack.extend(reversed(self.expression_parts(part)))
+            else:
+                stack.extend(reversed(self.term_parts(part)))
+
+    def write_call(self, node):
+        '''writes a subroutine call, without the term tags'''
+        self.write_expression(node)
+
+    def expression_parts(self, node):
+        parts = ["<expression>\n", Term(node.terms[0])]
+        for op, term in zip(node.ops, node.terms[1:]):
+            parts.append(symbol_tag(op))
+            parts.append(Term(term))
+        parts.append("</expression>\n")
+        return parts
+
+    def term_parts(self, node):
+        if type(node) is Term:
+            return [
+                "<term>\n", *self.term_writers[type(node.node)](node.node),
+                "</term>\n"
+            ]
+        return self.call_parts(node)
+
+    def integer_constant_parts(self, node):
+        return [f"<integerConstant> {node.value} </integerConstant>\n"]
+
+    def string_constant_parts(self, node):
+        return [f"<stringConstant> {node.value} </stringConstant>\n"]
+
+    def keyword_constant_parts(self, node):
+        return [keyword_tag(node.keyword)]
+
+    def var_term_parts(self, node):
+        return [identifier_tag(node.name)]
+
+    def array_term_parts(self, node):
+        return [
+            identifier_tag(node.name), symbol_tag("["),
+            node.index, symbol_tag("]")
+        ]
+
+    def call_parts(self, node):
+        parts = []
+        if node.receiver is not None:
+            parts.append(identifier_tag(node.receiver))
+            parts.append(symbol_tag("."))
+        parts.append(identifier_tag(node.name))
+        parts.append(symbol_tag("("))
+
+        parts.append("<expressionList>\n")
+        for i, arg in enumerate(node.args):
+            if i > 0:
+                parts.append(symbol_tag(","))
+            parts.append(arg)
+        parts.append("</expressionList>\n")
+
+        parts.append(symbol_tag(")"))
+        return parts
+
+    def paren_term_parts(self, node):
+        return [symbol_tag("("), node.expression, symbol_tag(")")]
+
+    def unary_term_parts(self, node):
+        return [symbol_tag(node.op), Term(node.term)]